@@ -0,0 +1,40 @@
+"""image meta
+
+Revision ID: 3b7c2e91d4a6
+Revises: 9f41d8e03a5c
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c2e91d4a6'
+down_revision: Union[str, Sequence[str], None] = '9f41d8e03a5c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+META_COLUMNS = [
+    ('about_us_images', 'image_meta'),
+    ('news', 'image_meta'),
+    ('company', 'logo_meta'),
+    ('projects', 'gallery_meta'),
+    ('partner', 'logo_meta'),
+    ('vacancy', 'logo_meta'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in META_COLUMNS:
+        op.add_column(table, sa.Column(column, postgresql.JSONB(astext_type=sa.Text()), server_default='{}', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in reversed(META_COLUMNS):
+        op.drop_column(table, column)
@@ -0,0 +1,34 @@
+"""upload redirects
+
+Revision ID: a1c5e9f2d7b3
+Revises: f3b8d1c6a9e4
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c5e9f2d7b3'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d1c6a9e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'upload_redirects',
+        sa.Column('old_path', sa.String(), nullable=False),
+        sa.Column('new_path', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('old_path'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('upload_redirects')
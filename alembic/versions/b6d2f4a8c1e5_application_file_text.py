@@ -0,0 +1,48 @@
+"""application file text
+
+Revision ID: b6d2f4a8c1e5
+Revises: a1c5e9f2d7b3
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d2f4a8c1e5'
+down_revision: Union[str, Sequence[str], None] = 'a1c5e9f2d7b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # уже загруженные файлы получают pending — фоновый воркер извлечёт из них текст
+    op.add_column('application_files', sa.Column('text_status', sa.String(length=16), server_default='pending', nullable=False))
+    op.add_column('application_files', sa.Column('text_content', sa.Text(), nullable=True))
+    op.add_column('application_files', sa.Column('page_count', sa.Integer(), nullable=True))
+    op.add_column('application_files', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(text_content, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_application_files_search_vector', 'application_files', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index(
+        'ix_application_files_text_pending', 'application_files', ['id'], unique=False,
+        postgresql_where=sa.text("text_status = 'pending'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_application_files_text_pending', table_name='application_files')
+    op.drop_index('ix_application_files_search_vector', table_name='application_files')
+    op.drop_column('application_files', 'search_vector')
+    op.drop_column('application_files', 'page_count')
+    op.drop_column('application_files', 'text_content')
+    op.drop_column('application_files', 'text_status')
@@ -0,0 +1,56 @@
+"""stored files
+
+Revision ID: c4e8a1f2b9d7
+Revises: 3b7c2e91d4a6
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f2b9d7'
+down_revision: Union[str, Sequence[str], None] = '3b7c2e91d4a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stored_files',
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=True),
+        sa.Column('size', sa.BigInteger(), nullable=True),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('path'),
+    )
+    op.create_index(op.f('ix_stored_files_sha256'), 'stored_files', ['sha256'], unique=False)
+
+    # счётчики для уже загруженных файлов (старые имена — unix-время, без sha256)
+    op.execute("""
+        INSERT INTO stored_files (path, ref_count)
+        SELECT path, count(*)
+        FROM (
+            SELECT image_path AS path FROM news
+            UNION ALL SELECT logo_path FROM company
+            UNION ALL SELECT logo_path FROM partner
+            UNION ALL SELECT logo_path FROM vacancy
+            UNION ALL SELECT image_path FROM about_us_images
+            UNION ALL SELECT file_url FROM application_files
+            UNION ALL SELECT jsonb_array_elements_text(gallery) FROM projects
+        ) refs
+        WHERE path IS NOT NULL AND path <> ''
+        GROUP BY path
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_stored_files_sha256'), table_name='stored_files')
+    op.drop_table('stored_files')
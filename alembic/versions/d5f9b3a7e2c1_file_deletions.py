@@ -0,0 +1,46 @@
+"""file deletions
+
+Revision ID: d5f9b3a7e2c1
+Revises: c4e8a1f2b9d7
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f9b3a7e2c1'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f2b9d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'file_deletions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('path'),
+    )
+    op.create_index(op.f('ix_file_deletions_next_attempt_at'), 'file_deletions', ['next_attempt_at'], unique=False)
+
+    # файлы, освобождённые до появления очереди, но так и не удалённые (процесс упал до удаления)
+    op.execute("""
+        INSERT INTO file_deletions (path)
+        SELECT path FROM stored_files WHERE ref_count <= 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_file_deletions_next_attempt_at'), table_name='file_deletions')
+    op.drop_table('file_deletions')
@@ -0,0 +1,34 @@
+"""maintenance cursors
+
+Revision ID: e7a2c4d6f8b0
+Revises: d5f9b3a7e2c1
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a2c4d6f8b0'
+down_revision: Union[str, Sequence[str], None] = 'd5f9b3a7e2c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'maintenance_cursors',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('value', sa.Text(), server_default='', nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('name'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('maintenance_cursors')
@@ -0,0 +1,28 @@
+"""stored files crc32
+
+Revision ID: f3b8d1c6a9e4
+Revises: e7a2c4d6f8b0
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d1c6a9e4'
+down_revision: Union[str, Sequence[str], None] = 'e7a2c4d6f8b0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('stored_files', sa.Column('crc32', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('stored_files', 'crc32')
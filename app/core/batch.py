@@ -0,0 +1,127 @@
+import asyncio
+import json
+from typing import List, Optional, Tuple, Any
+from urllib.parse import urlsplit
+
+from fastapi import Query, HTTPException, status
+from sqlalchemy import Integer, any_, literal
+from sqlalchemy.dialects.postgresql import ARRAY
+
+# ---------------- КОНФИГУРАЦИЯ ----------------
+MAX_BATCH_IDS = 100          # максимум id в одном ?ids=
+BATCH_MAX_REQUESTS = 20      # максимум под-запросов в одном /batch
+BATCH_CONCURRENCY = 8        # сколько под-запросов выполняется одновременно (≈ размер пула БД)
+
+# Заголовки родительского запроса, которые передаются в под-запросы
+FORWARDED_HEADERS = {b"authorization", b"cookie", b"accept-language"}
+
+
+# ---------------- ?ids=1,2,3 ----------------
+def parse_ids(
+    ids: Optional[str] = Query(None, description="Список ID через запятую, например 1,2,3")
+) -> Optional[List[int]]:
+    """Разбирает параметр ?ids= в список уникальных int (порядок сохраняется)."""
+    if ids is None:
+        return None
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Параметр ids должен быть списком целых чисел через запятую")
+    if not parsed:
+        return None
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"Не больше {MAX_BATCH_IDS} id за один запрос")
+    return list(dict.fromkeys(parsed))
+
+
+def id_in(column, ids: List[int]):
+    """
+    Условие `column = ANY(:ids)` с одним параметром-массивом.
+    В отличие от IN (...) план запроса не зависит от количества id.
+    """
+    return column == any_(literal(ids, type_=ARRAY(Integer)))
+
+
+# ---------------- /batch ----------------
+def _validate_subrequest_path(path: str) -> Tuple[str, str]:
+    """Проверяет путь под-запроса и возвращает (path, query_string)."""
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+        raise HTTPException(status_code=400, detail=f"Недопустимый путь под-запроса: {path}")
+    if parts.path.rstrip("/") == "/batch":
+        raise HTTPException(status_code=400, detail="Вложенный /batch запрещён")
+    return parts.path, parts.query
+
+
+async def dispatch_subrequest(parent_scope: dict, path: str) -> Tuple[int, Any]:
+    """
+    Выполняет GET под-запрос внутри процесса через ASGI-приложение,
+    без сетевого round-trip. Возвращает (status_code, тело ответа).
+    """
+    sub_path, query_string = _validate_subrequest_path(path)
+
+    headers = [(k, v) for k, v in parent_scope.get("headers", []) if k in FORWARDED_HEADERS]
+    headers.append((b"accept", b"application/json"))
+
+    scope = {
+        "type": "http",
+        "asgi": parent_scope.get("asgi", {"version": "3.0"}),
+        "http_version": parent_scope.get("http_version", "1.1"),
+        "method": "GET",
+        "scheme": parent_scope.get("scheme", "http"),
+        "path": sub_path,
+        "raw_path": sub_path.encode(),
+        "root_path": parent_scope.get("root_path", ""),
+        "query_string": query_string.encode(),
+        "headers": headers,
+        "client": parent_scope.get("client"),
+        "server": parent_scope.get("server"),
+        "state": {},
+    }
+
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.disconnect"}
+
+    status_code = 500
+    content_type = b""
+    chunks: List[bytes] = []
+
+    async def send(message):
+        nonlocal status_code, content_type
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for key, value in message.get("headers", []):
+                if key.lower() == b"content-type":
+                    content_type = value
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await parent_scope["app"](scope, receive, send)
+
+    raw = b"".join(chunks)
+    if content_type.startswith(b"application/json") and raw:
+        return status_code, json.loads(raw)
+    return status_code, raw.decode("utf-8", errors="replace") or None
+
+
+async def dispatch_batch(parent_scope: dict, paths: List[str]) -> List[Tuple[int, Any]]:
+    """Выполняет под-запросы конкурентно, но не больше BATCH_CONCURRENCY одновременно."""
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(path: str) -> Tuple[int, Any]:
+        async with semaphore:
+            try:
+                return await dispatch_subrequest(parent_scope, path)
+            except HTTPException as e:
+                return e.status_code, {"detail": e.detail}
+            except Exception as e:
+                print(f"[batch] Ошибка под-запроса {path}: {type(e).__name__} → {e}")
+                return status.HTTP_500_INTERNAL_SERVER_ERROR, {"detail": "Internal Server Error"}
+
+    return await asyncio.gather(*(run(p) for p in paths))
@@ -0,0 +1,54 @@
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_METHODS_WITH_BODY = {"POST", "PUT", "PATCH"}
+
+
+# ---------------- ОГРАНИЧЕНИЕ ТЕЛА ЗАПРОСА ----------------
+class BodySizeLimitMiddleware:
+    """
+    Обрывает запрос с телом больше max_bytes, не дожидаясь, пока Starlette сохранит
+    его целиком во временные файлы: по Content-Length — сразу, без чтения тела;
+    для chunked-запросов — на первом блоке, превысившем лимит.
+    Лимиты отдельных файлов проверяются при сохранении (app.core.uploads).
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    def _reject(self) -> JSONResponse:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"Запрос слишком большой. Максимум {self.max_bytes // (1024 * 1024)} МБ"},
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in _METHODS_WITH_BODY:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    if int(value) > self.max_bytes:
+                        await self._reject()(scope, receive, send)
+                        return
+                except ValueError:
+                    pass
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # HTTPException проходит через разбор формы FastAPI как есть и превращается в 413
+                    raise HTTPException(status_code=413, detail="Запрос слишком большой")
+            return message
+
+        await self.app(scope, limited_receive, send)
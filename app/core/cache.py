@@ -0,0 +1,135 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_MISSING = object()
+
+
+# ---------------- TTL-КЭШ ----------------
+class TTLCache:
+    """
+    Простой in-process LRU-кэш с TTL и ограничением по количеству записей.
+
+    Кэш живёт в памяти одного процесса: в нескольких воркерах у каждого своя копия,
+    поэтому TTL ограничивает, насколько долго другой воркер может отдавать устаревшие данные.
+    """
+
+    def __init__(self, maxsize: int = 128, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._generation = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+        # значения, которые сейчас строятся, уже могут быть устаревшими — не сохраняем их
+        self._generation += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    async def get_or_create(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Возвращает значение из кэша или строит его через factory.
+        Одновременные промахи по одному ключу ждут одно и то же построение (single-flight).
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            value = await factory()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # помечаем исключение как полученное, если никто не ждал
+            raise
+        else:
+            if generation == self._generation:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+
+# ---------------- ИНВАЛИДАЦИЯ ПО COMMIT ----------------
+_invalidation_rules: list[tuple[Callable[[], None], frozenset[str]]] = []
+
+
+def invalidate_on_commit(cache_or_callback, *models) -> None:
+    """
+    Сбрасывает кэш после успешного commit любой сессии, изменившей таблицы указанных моделей.
+    Вместо кэша можно передать функцию без аргументов.
+    """
+    callback = cache_or_callback.clear if hasattr(cache_or_callback, "clear") else cache_or_callback
+    tables = frozenset(model.__table__.name for model in models)
+    _invalidation_rules.append((callback, tables))
+
+
+def _changed_tables(session: Session) -> set:
+    return session.info.setdefault("cache_changed_tables", set())
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    changed = _changed_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(obj), "__table__", None)
+        if table is not None:
+            changed.add(table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    # bulk update()/delete() минуют flush — учитываем их отдельно
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    changed = session.info.pop("cache_changed_tables", None)
+    if not changed:
+        return
+    for callback, tables in _invalidation_rules:
+        if tables & changed:
+            callback()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop("cache_changed_tables", None)
@@ -0,0 +1,232 @@
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём только gzip
+    brotli = None
+
+# Типы, которые имеет смысл сжимать. Изображения, PDF и архивы уже сжаты.
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+# ---------------- СОГЛАСОВАНИЕ КОДИРОВКИ ----------------
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Выбирает "br" или "gzip" по заголовку Accept-Encoding с учётом q-значений.
+    При равном приоритете предпочитается brotli. None — сжимать не нужно.
+    """
+    if not accept_encoding:
+        return None
+    prefs = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[name.strip().lower()] = q
+
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    wildcard = prefs.get("*", 0.0)
+    best = max(candidates, key=lambda enc: prefs.get(enc, wildcard))
+    return best if prefs.get(best, wildcard) > 0 else None
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = 6, brotli_quality: int = 4) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class _StreamCompressor:
+    """Потоковое сжатие: каждый chunk сбрасывается сразу, чтобы не задерживать стрим."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+# ---------------- MIDDLEWARE ----------------
+class CompressionMiddleware:
+    """
+    ASGI-middleware: gzip/brotli по Accept-Encoding.
+
+    - ответы меньше minimum_size и несжимаемые типы отдаются как есть;
+    - ответы с уже выставленным Content-Encoding (например, PrecompressedPayload) не трогаются;
+    - StreamingResponse сжимается потоково, без буферизации всего тела.
+    """
+
+    def __init__(self, app, minimum_size: int = 500, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.send = send
+        self.start_message = None
+        self.passthrough = False
+        self.compressor: Optional[_StreamCompressor] = None
+
+    async def __call__(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message.get("headers", []))
+            self.passthrough = (
+                "content-encoding" in headers
+                or "content-range" in headers
+                or message["status"] in (204, 206, 304)
+                or not is_compressible(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+
+            if not more_body:
+                # Тело целиком в одном сообщении
+                if len(body) < self.middleware.minimum_size:
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+                body = compress(body, self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+                self._mark_encoded(headers)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+            # Стрим: длина заранее неизвестна
+            self.compressor = _StreamCompressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            self._mark_encoded(headers)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            await self.send(self.start_message)
+
+        data = self.compressor.chunk(body) if body else b""
+        if not more_body:
+            data += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _mark_encoded(self, headers: MutableHeaders) -> None:
+        headers["Content-Encoding"] = self.encoding
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # сжатое представление уже не байт-в-байт равно исходному
+            headers["ETag"] = f"W/{etag}"
+
+
+# ---------------- ПРЕДВАРИТЕЛЬНО СЖАТЫЕ ОТВЕТЫ ----------------
+class PrecompressedPayload:
+    """
+    Неизменяемое тело ответа для кэша.
+
+    Все кодировки вычисляются один раз при построении (PrecompressedPayload.build) в пуле потоков
+    и хранятся рядом с исходными байтами: CPU на сжатие тратится один раз на версию содержимого
+    и не в event loop, а ответ на запрос только выбирает готовые байты.
+    Уровни и минимальный размер по умолчанию берутся из настроек (COMPRESSION_*).
+    """
+
+    def __init__(
+        self,
+        body: bytes,
+        media_type: str = "application/json",
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.minimum_size = settings.COMPRESSION_MINIMUM_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = settings.COMPRESSION_PRECOMPRESS_GZIP_LEVEL if gzip_level is None else gzip_level
+        self.brotli_quality = (
+            settings.COMPRESSION_PRECOMPRESS_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+        )
+        self._encoded: dict[str, bytes] = {}
+
+    @classmethod
+    async def build(cls, body: bytes, media_type: str = "application/json", **kwargs) -> "PrecompressedPayload":
+        """Создаёт payload и сразу сжимает его во всех кодировках в пуле потоков."""
+        payload = cls(body, media_type, **kwargs)
+        if len(body) >= payload.minimum_size:
+            await run_in_threadpool(payload._compress_all)
+        return payload
+
+    def _compress_all(self) -> None:
+        for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+            self._encoded[encoding] = compress(self.body, encoding, self.gzip_level, self.brotli_quality)
+
+    def response(self, request: Request, status_code: int = 200) -> Response:
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = None
+        if len(self.body) >= self.minimum_size:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        data = self._encoded.get(encoding) if encoding else None
+        if data is None:
+            # не сжат заранее (создан не через build) — отдаём как есть, но не сжимаем в event loop
+            return Response(content=self.body, status_code=status_code, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(content=data, status_code=status_code, media_type=self.media_type, headers=headers)
@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -6,6 +8,91 @@ class Settings(BaseSettings):
     ALGORITHM: str = Field(..., env="ALGORITHM")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(60, env="ACCESS_TOKEN_EXPIRE_MINUTES")
 
+    # Сжатие ответов
+    COMPRESSION_MINIMUM_SIZE: int = Field(500, env="COMPRESSION_MINIMUM_SIZE")
+    COMPRESSION_GZIP_LEVEL: int = Field(6, env="COMPRESSION_GZIP_LEVEL")
+    COMPRESSION_BROTLI_QUALITY: int = Field(4, env="COMPRESSION_BROTLI_QUALITY")
+    # Кэшируемые ответы (PrecompressedPayload) сжимаются один раз в пуле потоков — можно сильнее
+    COMPRESSION_PRECOMPRESS_GZIP_LEVEL: int = Field(9, env="COMPRESSION_PRECOMPRESS_GZIP_LEVEL")
+    COMPRESSION_PRECOMPRESS_BROTLI_QUALITY: int = Field(11, env="COMPRESSION_PRECOMPRESS_BROTLI_QUALITY")
+
+    # Раздача загруженных файлов (/media)
+    MEDIA_CACHE_MAX_AGE: int = Field(3600, env="MEDIA_CACHE_MAX_AGE")  # для имён без хэша содержимого
+    MEDIA_X_ACCEL_REDIRECT: bool = Field(False, env="MEDIA_X_ACCEL_REDIRECT")  # отдавать через nginx
+    MEDIA_X_ACCEL_PREFIX: str = Field("/_protected_uploads/", env="MEDIA_X_ACCEL_PREFIX")  # internal location в nginx
+    MEDIA_SIGNED_URL_TTL: int = Field(900, env="MEDIA_SIGNED_URL_TTL")  # срок подписанных ссылок на файлы откликов, сек
+
+    # Ресайз на лету (/media/...?w=&h=&fmt=): разрешённые размеры и дисковый кэш
+    MEDIA_RESIZE_WIDTHS: List[int] = Field([64, 128, 256, 320, 480, 640, 960, 1280, 1920], env="MEDIA_RESIZE_WIDTHS")
+    MEDIA_RESIZE_HEIGHTS: List[int] = Field([64, 128, 256, 320, 480, 640, 960, 1280], env="MEDIA_RESIZE_HEIGHTS")
+    MEDIA_RESIZE_CACHE_DIR: str = Field("cache/media", env="MEDIA_RESIZE_CACHE_DIR")  # относительно корня проекта, вне uploads
+    MEDIA_RESIZE_CACHE_MAX_MB: int = Field(512, env="MEDIA_RESIZE_CACHE_MAX_MB")
+
+    # Файлы форм пишутся сразу в uploads/.staging и переносятся жёсткой ссылкой (без SpooledTemporaryFile)
+    DIRECT_UPLOADS: bool = Field(True, env="DIRECT_UPLOADS")
+
+    # Сколько файлов одного запроса сохраняется одновременно (save_uploaded_files / save_uploaded_images)
+    UPLOAD_CONCURRENCY: int = Field(4, env="UPLOAD_CONCURRENCY")
+
+    # Фоновое удаление файлов (очередь file_deletions): размер пачки, опрос и задержки повторов
+    FILE_DELETION_BATCH_SIZE: int = Field(100, env="FILE_DELETION_BATCH_SIZE")
+    FILE_DELETION_POLL_SECONDS: float = Field(30, env="FILE_DELETION_POLL_SECONDS")
+    FILE_DELETION_RETRY_BASE_SECONDS: float = Field(10, env="FILE_DELETION_RETRY_BASE_SECONDS")
+    FILE_DELETION_RETRY_MAX_SECONDS: float = Field(3600, env="FILE_DELETION_RETRY_MAX_SECONDS")
+
+    # Сборщик мусора uploads (scripts/gc_uploads.py): файлы без ссылок моложе этого срока не трогаем
+    UPLOAD_GC_GRACE_HOURS: float = Field(24, env="UPLOAD_GC_GRACE_HOURS")
+
+    # Хранилище загруженных файлов: "local" (каталог uploads) или "s3" (S3-совместимое, в т.ч. MinIO)
+    STORAGE_BACKEND: str = Field("local", env="STORAGE_BACKEND")
+    S3_BUCKET: str = Field("", env="S3_BUCKET")
+    S3_ENDPOINT_URL: Optional[str] = Field(None, env="S3_ENDPOINT_URL")  # для MinIO: http://localhost:9000
+    S3_REGION: str = Field("us-east-1", env="S3_REGION")
+    S3_ACCESS_KEY_ID: Optional[str] = Field(None, env="S3_ACCESS_KEY_ID")
+    S3_SECRET_ACCESS_KEY: Optional[str] = Field(None, env="S3_SECRET_ACCESS_KEY")
+    S3_MULTIPART_CHUNK_MB: int = Field(8, env="S3_MULTIPART_CHUNK_MB")  # размер части (минимум S3 — 5 МБ)
+    S3_MULTIPART_CONCURRENCY: int = Field(4, env="S3_MULTIPART_CONCURRENCY")
+    S3_MAX_POOL_CONNECTIONS: int = Field(32, env="S3_MAX_POOL_CONNECTIONS")
+
+    # Докачиваемые загрузки (/uploads/, протокол в стиле tus): максимальный размер файла
+    # и сколько незавершённая или неиспользованная загрузка хранится на диске
+    RESUMABLE_UPLOAD_MAX_MB: int = Field(50, env="RESUMABLE_UPLOAD_MAX_MB")
+    RESUMABLE_UPLOAD_EXPIRY_HOURS: float = Field(24, env="RESUMABLE_UPLOAD_EXPIRY_HOURS")
+
+    # Оптимизация изображений при загрузке (политики по подкаталогам — IMAGE_OPTIMIZATION_POLICIES в app.core.images):
+    # метаданные убираются всегда, пережатие с потерями — при IMAGE_RECOMPRESS,
+    # исходник хранится рядом с оптимизированным файлом (<имя>.original.<расширение>) — при IMAGE_KEEP_ORIGINALS
+    IMAGE_OPTIMIZATION: bool = Field(True, env="IMAGE_OPTIMIZATION")
+    IMAGE_RECOMPRESS: bool = Field(True, env="IMAGE_RECOMPRESS")
+    IMAGE_KEEP_ORIGINALS: bool = Field(False, env="IMAGE_KEEP_ORIGINALS")
+
+    # Текст PDF из откликов для поиска (фоновый разбор, app.core.pdf_text): лимиты на файл и опрос очереди
+    PDF_TEXT_MAX_MB: int = Field(10, env="PDF_TEXT_MAX_MB")
+    PDF_TEXT_MAX_PAGES: int = Field(30, env="PDF_TEXT_MAX_PAGES")
+    PDF_TEXT_MAX_CHARS: int = Field(200_000, env="PDF_TEXT_MAX_CHARS")
+    PDF_TEXT_BATCH_SIZE: int = Field(4, env="PDF_TEXT_BATCH_SIZE")
+    PDF_TEXT_POLL_SECONDS: float = Field(60, env="PDF_TEXT_POLL_SECONDS")
+    # Разбор идёт в отдельном небольшом пуле процессов; файл, разбираемый дольше таймаута, помечается failed
+    PDF_TEXT_WORKERS: int = Field(1, env="PDF_TEXT_WORKERS")
+    PDF_TEXT_TIMEOUT_SECONDS: float = Field(60, env="PDF_TEXT_TIMEOUT_SECONDS")
+
+    # Параметры argon2id для новых хэшей (подбираются под сервер: python -m scripts.calibrate_argon2).
+    # Хэши со старыми параметрами пересчитываются при следующем успешном входе
+    ARGON2_TIME_COST: int = Field(3, env="ARGON2_TIME_COST")  # число проходов
+    ARGON2_MEMORY_COST_KIB: int = Field(65536, env="ARGON2_MEMORY_COST_KIB")  # память на один хэш
+    ARGON2_PARALLELISM: int = Field(4, env="ARGON2_PARALLELISM")  # потоков на один хэш
+
+    # Хэширование паролей (argon2) в пуле потоков: сколько хэшей считается одновременно
+    # и сколько запросов может ждать в очереди (сверх этого — 503)
+    PASSWORD_HASH_CONCURRENCY: int = Field(4, env="PASSWORD_HASH_CONCURRENCY")
+    PASSWORD_HASH_MAX_QUEUE: int = Field(64, env="PASSWORD_HASH_MAX_QUEUE")
+
+    # Максимальный размер тела запроса (все файлы формы вместе)
+    MAX_REQUEST_BODY_MB: int = Field(50, env="MAX_REQUEST_BODY_MB")
+
+    # Пул процессов для CPU-тяжёлой работы (0 — по числу CPU)
+    PROCESS_POOL_WORKERS: int = Field(0, env="PROCESS_POOL_WORKERS")
+
     class Config:
         env_file = ".env"
 
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_db  
 from app.core.jwt_token import decode_token
-from app.services.user_service import get_user_by_username
+from app.services.user_service import get_current_user_cached
 from app.schemas.schemas import TokenData  
 from app.core.config import settings
 
@@ -25,9 +25,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         token_data = TokenData(sub=username)
     except JWTError:
         raise credentials_exception
-    
-    user = await get_user_by_username(db, token_data.sub)
-    if user is None:
+
+    # кэш по sub: страницы админки не ходят в БД за пользователем на каждый запрос
+    user = await get_current_user_cached(db, token_data.sub)
+    # токен, выданный до смены пароля или роли (токены без ver — версия 0)
+    if user is None or payload.get("ver", 0) != user.token_version:
         raise credentials_exception
     return user
 
@@ -0,0 +1,84 @@
+from typing import Callable
+
+from fastapi import HTTPException
+from fastapi.routing import APIRoute
+from starlette.datastructures import FormData
+from starlette.formparsers import MultiPartException, MultiPartParser
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.uploads import StagedUploadFile
+
+try:
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import parse_options_header
+
+
+# ---------------- РАЗБОР MULTIPART ----------------
+class StagingMultiPartParser(MultiPartParser):
+    """
+    MultiPartParser, который пишет файлы формы сразу в staging-каталог на ФС uploads
+    (StagedUploadFile) вместо SpooledTemporaryFile. Каждый байт файла пишется на диск один раз:
+    при сохранении файл переносится жёсткой ссылкой.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._staged: list[StagedUploadFile] = []
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        part = self._current_part
+        if part.file is None:
+            return
+        spooled = part.file.file
+        self._files_to_close_on_error.remove(spooled)
+        spooled.close()
+
+        staged = StagedUploadFile(filename=part.file.filename, headers=part.file.headers)
+        self._files_to_close_on_error.append(staged.file)
+        self._staged.append(staged)
+        part.file = staged
+
+    async def parse(self) -> FormData:
+        try:
+            return await super().parse()
+        except BaseException:
+            # ошибка разбора или обрыв соединения — staging-файлы больше никому не нужны
+            for staged in self._staged:
+                await staged.close()
+            raise
+
+
+class DirectUploadRequest(Request):
+    async def _get_form(self, **kwargs) -> FormData:
+        if self._form is None:
+            content_type, _ = parse_options_header(self.headers.get("Content-Type"))
+            if content_type == b"multipart/form-data":
+                try:
+                    self._form = await StagingMultiPartParser(self.headers, self.stream(), **kwargs).parse()
+                except MultiPartException as exc:
+                    raise HTTPException(status_code=400, detail=exc.message)
+                return self._form
+        return await super()._get_form(**kwargs)
+
+
+# ---------------- МАРШРУТ ----------------
+class DirectUploadRoute(APIRoute):
+    """
+    Маршрут, у которого файлы multipart-форм пишутся прямо в staging на ФС uploads.
+    Подключается к роутеру: APIRouter(route_class=DirectUploadRoute). Выключается
+    настройкой DIRECT_UPLOADS — тогда работает обычный разбор Starlette.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not settings.DIRECT_UPLOADS:
+            return handler
+
+        async def direct_upload_handler(request: Request) -> Response:
+            return await handler(DirectUploadRequest(request.scope, request.receive))
+
+        return direct_upload_handler
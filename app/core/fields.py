@@ -0,0 +1,109 @@
+from functools import lru_cache
+from typing import Any, FrozenSet, Iterable, Optional, Sequence
+
+from fastapi import Query, HTTPException
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import load_only, selectinload, noload
+
+
+# ---------------- ?fields= ----------------
+class SparseFields:
+    """
+    Зависимость для параметра ?fields=id,title,date.
+
+    Проверяет имена по схеме ответа и возвращает frozenset выбранных полей
+    (или None, если параметр не передан — тогда отдаётся полная схема).
+    """
+
+    def __init__(self, schema: type[BaseModel]):
+        self.schema = schema
+
+    def __call__(
+        self,
+        fields: Optional[str] = Query(None, description="Поля ответа через запятую, например id,title,date"),
+    ) -> Optional[FrozenSet[str]]:
+        if fields is None:
+            return None
+        requested = frozenset(part.strip() for part in fields.split(",") if part.strip())
+        if not requested:
+            return None
+        allowed = set(self.schema.model_fields)
+        unknown = requested - allowed
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Неизвестные поля: {', '.join(sorted(unknown))}. Доступны: {', '.join(sorted(allowed))}",
+            )
+        return requested
+
+
+# ---------------- SQL ----------------
+def load_options(model, fields: Optional[Iterable[str]], default: Sequence = ()) -> list:
+    """
+    Опции загрузки для select(model) под выбранные поля.
+
+    Без fields возвращает default (обычные опции сервиса). С fields загружаются только
+    запрошенные колонки (плюс первичный ключ и внешние ключи запрошенных связей),
+    запрошенные связи — через selectinload, остальные связи не загружаются вовсе,
+    даже если в модели указан lazy="selectin".
+    """
+    if not fields:
+        return list(default)
+
+    fields = set(fields)
+    mapper = sa_inspect(model)
+    column_keys = {attr.key for attr in mapper.column_attrs}
+
+    columns = {mapper.get_property_by_column(col).key for col in mapper.primary_key}
+    columns |= fields & column_keys
+
+    options = []
+    for rel in mapper.relationships:
+        attr = getattr(model, rel.key)
+        if rel.key in fields:
+            options.append(selectinload(attr))
+            columns |= {mapper.get_property_by_column(col).key for col in rel.local_columns}
+        else:
+            options.append(noload(attr))
+
+    options.insert(0, load_only(*(getattr(model, key) for key in sorted(columns))))
+    return options
+
+
+# ---------------- СЕРИАЛИЗАЦИЯ ----------------
+@lru_cache(maxsize=None)
+def _field_adapter(schema: type[BaseModel], name: str) -> TypeAdapter:
+    return TypeAdapter(schema.model_fields[name].annotation)
+
+
+def dump_fields(obj: Any, schema: type[BaseModel], fields: Iterable[str]) -> dict:
+    """
+    Сериализует только выбранные поля объекта по правилам схемы.
+    Незапрошенные атрибуты не читаются, поэтому не вызывают ленивых загрузок.
+    """
+    data = {}
+    for name in schema.model_fields:
+        if name not in fields:
+            continue
+        adapter = _field_adapter(schema, name)
+        if hasattr(type(obj), name):
+            value = adapter.validate_python(getattr(obj, name), from_attributes=True)
+        else:
+            # поле есть только в схеме (например, recommendations у NewsRead)
+            value = schema.model_fields[name].get_default(call_default_factory=True)
+        data[name] = adapter.dump_python(value, mode="json")
+    return data
+
+
+def sparse_response(data: Any, schema: type[BaseModel], fields: Optional[Iterable[str]]):
+    """
+    Если поля не выбраны — возвращает data как есть (валидирует response_model).
+    Иначе — JSONResponse только с выбранными полями для объекта или списка объектов.
+    """
+    if not fields:
+        return data
+    if isinstance(data, (list, tuple)):
+        return JSONResponse(content=[dump_fields(item, schema, fields) for item in data])
+    return JSONResponse(content=dump_fields(data, schema, fields))
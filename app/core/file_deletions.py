@@ -0,0 +1,154 @@
+"""
+Очередь удаления файлов с диска (таблица file_deletions, outbox).
+
+Путь попадает в очередь в той же транзакции, где его счётчик ссылок дошёл до нуля
+(app.core.file_refs), поэтому запрос на удаление завершается сразу после commit, а удаление
+не теряется при падении процесса. Фоновый воркер забирает пачки строк (FOR UPDATE SKIP LOCKED —
+несколько процессов uvicorn не мешают друг другу), ещё раз проверяет счётчик, удаляет файлы
+пачкой через хранилище (app.core.storage: локально — одним заходом в пул потоков, в S3 — DeleteObjects)
+и при ошибке откладывает повтор с экспоненциальной задержкой.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.storage import storage
+from app.core.uploads import remove_uploaded_files
+from app.models.models import FileDeletion, StoredFile
+
+logger = logging.getLogger(__name__)
+
+# Файл, которого недавно коснулась повторная загрузка того же содержимого, удаляем не сразу:
+# ссылка на него ещё может быть не записана. Удаление откладывается до конца этого окна.
+RELEASE_GRACE_SECONDS = 60
+
+_wakeup = asyncio.Event()
+_worker: Optional[asyncio.Task] = None
+
+
+def notify_file_deletions() -> None:
+    """Будит воркер после commit, добавившего пути в очередь (иначе он проснётся по таймеру)."""
+    _wakeup.set()
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(
+        settings.FILE_DELETION_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.FILE_DELETION_RETRY_MAX_SECONDS,
+    )
+
+
+async def _delete_batch(paths: list[str]) -> dict[str, Union[None, float, Exception]]:
+    """
+    Удаляет файлы пачки. Для каждого пути: None — удалён (или его уже нет),
+    float — время, до которого удаление отложено (окно RELEASE_GRACE_SECONDS), Exception — ошибка.
+    """
+    threshold = time.time() - RELEASE_GRACE_SECONDS
+    results: dict[str, Union[None, float, Exception]] = {}
+    to_delete = []
+    stored = await asyncio.gather(*(storage.stat(path) for path in paths), return_exceptions=True)
+    for path, obj in zip(paths, stored):
+        if isinstance(obj, Exception):
+            results[path] = obj
+        elif obj is not None and obj.mtime > threshold:
+            results[path] = obj.mtime + RELEASE_GRACE_SECONDS
+        else:
+            to_delete.append(path)  # файла может уже не быть, но производные могли остаться — чистим
+    if to_delete:
+        try:
+            results.update(await remove_uploaded_files(to_delete))
+        except Exception as e:
+            results.update({path: e for path in to_delete})
+    return results
+
+
+async def process_file_deletions(batch_size: Optional[int] = None) -> int:
+    """Обрабатывает одну пачку готовых к удалению путей. Возвращает число взятых строк."""
+    batch_size = batch_size or settings.FILE_DELETION_BATCH_SIZE
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(FileDeletion)
+            .where(FileDeletion.next_attempt_at <= func.now())
+            .order_by(FileDeletion.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not rows:
+            return 0
+
+        paths = [row.path for row in rows]
+        # записи счётчика с нулём больше не нужны; путь, на который снова сослались, из очереди просто убираем
+        await session.execute(
+            delete(StoredFile).where(StoredFile.path.in_(paths), StoredFile.ref_count <= 0)
+        )
+        referenced = set((await session.execute(
+            select(StoredFile.path).where(StoredFile.path.in_(paths))
+        )).scalars())
+        results = await _delete_batch([p for p in paths if p not in referenced])
+
+        now = datetime.now(timezone.utc)
+        for row in rows:
+            if row.path in referenced:
+                metrics.inc("file_deletions_referenced")
+                await session.delete(row)
+                continue
+            outcome = results[row.path]
+            if outcome is None:
+                metrics.inc("file_deletions_unlinked")
+                await session.delete(row)
+            elif isinstance(outcome, float):
+                metrics.inc("file_deletions_deferred")
+                row.next_attempt_at = datetime.fromtimestamp(outcome, timezone.utc)
+            else:
+                metrics.inc("file_deletions_failed")
+                row.attempts += 1
+                row.last_error = str(outcome)
+                row.next_attempt_at = now + timedelta(seconds=_retry_delay(row.attempts))
+                logger.warning(
+                    "Не удалось удалить файл %s (попытка %d): %s", row.path, row.attempts, outcome
+                )
+        await session.commit()
+    return len(rows)
+
+
+async def _run_worker() -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            taken = await process_file_deletions()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Ошибка обработки очереди удаления файлов")
+            taken = 0
+        if taken >= settings.FILE_DELETION_BATCH_SIZE:
+            continue  # очередь не разобрана — следующая пачка сразу
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.FILE_DELETION_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_file_deletion_worker() -> None:
+    global _worker
+    if _worker is None or _worker.done():
+        _worker = asyncio.get_running_loop().create_task(_run_worker())
+
+
+async def stop_file_deletion_worker() -> None:
+    global _worker
+    if _worker is None:
+        return
+    _worker.cancel()
+    try:
+        await _worker
+    except asyncio.CancelledError:
+        pass
+    _worker = None
@@ -0,0 +1,159 @@
+"""
+Счётчик ссылок на загруженные файлы (таблица stored_files).
+
+Модели перечисляют поля с путями в __file_fields__. После каждого flush изменения этих
+полей (новые записи, замена пути, удаление записи) превращаются в +1/-1 по путям и
+применяются одним upsert в той же транзакции. Пути, у которых счётчик дошёл до нуля,
+в той же транзакции ставятся в очередь удаления (app.core.file_deletions): фоновый воркер
+ещё раз проверяет счётчик — между commit и удалением на тот же файл могла сослаться новая загрузка.
+
+Обратная сторона — файлы, сохранённые с db=... (app.core.uploads): они числятся в сессии
+как незакоммиченные; commit оставляет их на месте, а откат транзакции удаляет.
+"""
+import asyncio
+import os
+from collections import Counter
+from typing import Iterable
+
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Mapper, Session, attributes
+from sqlalchemy.orm.base import PASSIVE_NO_INITIALIZE
+
+from app.core.file_deletions import notify_file_deletions
+from app.core.storage import storage
+from app.core.uploads import UNCOMMITTED_FILES_KEY, discard_created_files, sha256_from_path
+from app.models.models import FileDeletion, StoredFile
+
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _paths(values: Iterable) -> Iterable[str]:
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            yield from (item for item in value if isinstance(item, str) and item)
+        elif isinstance(value, str) and value:
+            yield value
+
+
+def _collect_deltas(session: Session) -> Counter:
+    deltas: Counter = Counter()
+    for obj in session.new:
+        for field in getattr(type(obj), "__file_fields__", ()):
+            for path in _paths([getattr(obj, field, None)]):
+                deltas[path] += 1
+    for obj in session.dirty:
+        for field in getattr(type(obj), "__file_fields__", ()):
+            history = attributes.get_history(obj, field, passive=PASSIVE_NO_INITIALIZE)
+            if not history.has_changes():
+                continue
+            for path in _paths(history.added):
+                deltas[path] += 1
+            for path in _paths(history.deleted):
+                deltas[path] -= 1
+    for obj in session.deleted:
+        for field in getattr(type(obj), "__file_fields__", ()):
+            history = attributes.get_history(obj, field, passive=PASSIVE_NO_INITIALIZE)
+            for path in _paths(history.non_added()):
+                deltas[path] -= 1
+    return deltas
+
+
+def _file_size(path: str):
+    local_path = storage.local_path(path)
+    if local_path is None:
+        return None  # удалённое хранилище: синхронно внутри flush размер не узнать
+    try:
+        return os.stat(local_path).st_size
+    except OSError:
+        return None
+
+
+@event.listens_for(Mapper, "mapper_configured")
+def _track_old_values(mapper, class_):
+    # active_history: при присваивании старое значение подгружается, даже если атрибут был expired,
+    # иначе освобождаемый путь не попал бы в историю изменений
+    for field in getattr(class_, "__file_fields__", ()):
+        event.listen(getattr(class_, field), "set", _noop_set, active_history=True)
+
+
+def _noop_set(target, value, oldvalue, initiator):
+    return value
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_paths(session, flush_context, instances):
+    # после DELETE строку уже не прочитать — подгружаем пути удаляемых объектов заранее
+    for obj in session.deleted:
+        for field in getattr(type(obj), "__file_fields__", ()):
+            getattr(obj, field, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_file_refs(session, flush_context):
+    deltas = {path: delta for path, delta in _collect_deltas(session).items() if delta}
+    if not deltas:
+        return
+
+    stmt = pg_insert(StoredFile).values([
+        {
+            "path": path,
+            "sha256": sha256_from_path(path),
+            "size": _file_size(path) if delta > 0 else None,
+            "ref_count": delta,
+        }
+        for path, delta in sorted(deltas.items())  # один порядок блокировок строк во всех транзакциях
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StoredFile.path],
+        set_={
+            "ref_count": StoredFile.ref_count + stmt.excluded.ref_count,
+            "size": func.coalesce(StoredFile.size, stmt.excluded.size),
+            "updated_at": func.now(),
+        },
+    ).returning(StoredFile.path, StoredFile.ref_count)
+
+    connection = session.connection()
+    released = [path for path, ref_count in connection.execute(stmt) if ref_count <= 0]
+    if released:
+        connection.execute(
+            pg_insert(FileDeletion)
+            .values([{"path": path} for path in released])
+            .on_conflict_do_nothing(index_elements=[FileDeletion.path])
+        )
+        session.info["file_deletions_queued"] = True
+
+
+def _spawn(coro) -> None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        coro.close()
+        return  # синхронный контекст (скрипты) — файлы подберёт сборщик мусора
+    task = loop.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    # новые файлы закоммичены вместе со ссылками на них
+    session.info.pop(UNCOMMITTED_FILES_KEY, None)
+    if session.info.pop("file_deletions_queued", None):
+        notify_file_deletions()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_queued(session, previous_transaction):
+    session.info.pop("file_deletions_queued", None)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_uncommitted(session, transaction):
+    # после commit список уже пуст; здесь остаётся то, что сохранили в откаченной транзакции
+    if transaction.parent is not None:
+        return  # SAVEPOINT: решает внешняя транзакция
+    created = session.info.pop(UNCOMMITTED_FILES_KEY, None)
+    if created:
+        _spawn(discard_created_files(created))
+
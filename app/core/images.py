@@ -0,0 +1,402 @@
+"""
+Обработка изображений. Функции модуля выполняются в пуле процессов (app.core.workers),
+поэтому принимают и возвращают только простые типы.
+"""
+import hashlib
+import io
+import math
+import os
+import re
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from PIL import Image, ImageCms, ImageOps, features
+
+# Ширины производных изображений по подкаталогам загрузок
+IMAGE_DERIVATIVE_WIDTHS = {
+    "about_us_gallery": [320, 640, 1280],
+    "news_images": [320, 640, 1280],
+    "news_files": [320, 640, 1280],
+    "projects": [320, 640, 1280],
+    "company_logos": [64, 128, 256],
+    "partners": [64, 128, 256],
+    "logos": [64, 128, 256],
+}
+IMAGE_DERIVATIVE_FORMATS = ["avif", "webp"]
+
+# Оптимизация оригинала при загрузке по подкаталогам: quality — цель пережатия с потерями
+# (None — только без потерь: метаданные убираются, пиксели не меняются), max_side — до какой
+# наибольшей стороны уменьшать при пережатии. Фото с камер — пережатие, логотипы — без потерь.
+IMAGE_OPTIMIZATION_POLICIES = {
+    "news_images": {"quality": 82, "max_side": 2560},
+    "news_files": {"quality": 82, "max_side": 2560},
+    "projects": {"quality": 82, "max_side": 2560},
+    "about_us_gallery": {"quality": 82, "max_side": 2560},
+    "company_logos": {"quality": None, "max_side": None},
+    "partners": {"quality": None, "max_side": None},
+    "logos": {"quality": None, "max_side": None},
+}
+
+# Производные рядом с оригиналом: <имя>.<ширина>w.<формат> и сохранённый исходник <имя>.original.<расширение>
+DERIVATIVE_NAME_RE = re.compile(r"^(.+)\.(?:\d+w|original)\.[a-z0-9]+$")
+
+_SAVE_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+
+def derivative_name(original_name: str, width: int, fmt: str) -> str:
+    """Имя производного файла рядом с оригиналом: <имя оригинала>.<ширина>w.<формат>."""
+    return f"{original_name}.{width}w.{fmt}"
+
+
+def original_copy_name(name: str) -> str:
+    """Имя исходника (до оптимизации), который хранится рядом с оптимизированным файлом."""
+    return f"{name}.original{PurePosixPath(name).suffix}"
+
+
+def is_original_copy(path: str) -> bool:
+    return re.search(r"\.original\.[a-z0-9]+$", PurePosixPath(path).name) is not None
+
+
+def is_derivative_of(original_name: str, name: str) -> bool:
+    """Файл name — производная (или сохранённый исходник) файла original_name."""
+    match = DERIVATIVE_NAME_RE.match(name)
+    return match is not None and match.group(1) == original_name
+
+
+def supported_formats(formats: list[str]) -> list[str]:
+    return [fmt for fmt in formats if features.check(fmt)]
+
+
+def _prepare(image: Image.Image) -> Image.Image:
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "P") else "RGB")
+    return image
+
+
+def _build_derivatives(image: Image.Image, source_path: Path, widths: list[int], formats: list[str]) -> list[dict]:
+    """
+    Уменьшенные копии для каждой ширины и формата; ширины больше оригинала пропускаются.
+    Возвращает [{"name", "width", "height", "format"}] — имена файлов в каталоге оригинала.
+    """
+    variants = []
+    for width in sorted(set(widths)):
+        if width >= image.width:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for fmt in formats:
+            name = derivative_name(source_path.name, width, fmt)
+            target = source_path.with_name(name)
+            # имя оригинала — хэш содержимого: готовая производная от повторной загрузки уже верна
+            if not target.exists():
+                tmp = target.with_name(f".{name}.{os.getpid()}.tmp")
+                resized.save(tmp, **_SAVE_OPTIONS[fmt])
+                os.replace(tmp, target)
+            variants.append({"name": name, "width": width, "height": height, "format": fmt})
+    return variants
+
+
+def process_image(source: str, widths: list[int], formats: list[str]) -> dict:
+    """
+    Одна задача пула на загруженное изображение: файл декодируется один раз,
+    из него извлекаются метаданные и строятся производные.
+    Возвращает {"width", "height", "format", "bytes", "dominant_color", "blurhash", "variants"}.
+    """
+    source_path = Path(source)
+    with Image.open(source_path) as original:
+        image_format = (original.format or "").lower()
+        image = _prepare(original)
+        return {
+            "width": image.width,  # после поворота по EXIF — как изображение покажет браузер
+            "height": image.height,
+            "format": image_format,
+            "bytes": os.path.getsize(source_path),
+            "dominant_color": dominant_color(image),
+            "blurhash": blurhash(image),
+            "variants": _build_derivatives(image, source_path, widths, supported_formats(formats)),
+        }
+
+
+# ---------------- ОПТИМИЗАЦИЯ ----------------
+_ORIENTATION = 0x0112
+
+# Сегменты JPEG с метаданными: APP1 (EXIF, XMP), APP13 (Photoshop, IPTC), COM.
+# APP2 (ICC) и APP14 (Adobe) остаются: без них меняются цвета или не декодируется CMYK.
+_JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+_PNG_METADATA_CHUNKS = {b"eXIf", b"tEXt", b"zTXt", b"iTXt", b"tIME"}
+_WEBP_METADATA_CHUNKS = {b"EXIF", b"XMP "}
+
+# Пережатие должно дать хотя бы 10% — иначе повторная потеря качества того не стоит
+_MIN_RECOMPRESS_GAIN = 0.9
+
+_RECOMPRESS_SAVE_OPTIONS = {
+    "JPEG": lambda quality: {"format": "JPEG", "quality": quality, "optimize": True, "progressive": True},
+    "WEBP": lambda quality: {"format": "WEBP", "quality": quality, "method": 4},
+    "PNG": lambda quality: {"format": "PNG", "optimize": True},
+}
+
+_srgb_profile = None
+
+
+def _orientation_tiff(orientation: int) -> bytes:
+    """EXIF (TIFF без заголовка Exif) только с ориентацией — без неё фото с телефона ляжет на бок."""
+    exif = Image.Exif()
+    exif[_ORIENTATION] = orientation
+    return exif.tobytes()[6:]
+
+
+def _strip_jpeg(data: bytes, orientation: int) -> Optional[bytes]:
+    """Убирает сегменты метаданных до начала сжатых данных; пиксели не трогаются. Неразборчивый файл — None."""
+    out = bytearray(data[:2])
+    pos = 2
+    orientation_written = orientation == 1
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # байты-заполнители
+            pos += 1
+            continue
+        if marker in (0xDA, 0xD9):  # SOS / EOI: дальше только сжатые данные
+            out += data[pos:]
+            return bytes(out)
+        length = int.from_bytes(data[pos + 2:pos + 4], "big")
+        if marker not in _JPEG_METADATA_MARKERS:
+            out += data[pos:pos + 2 + length]
+        elif marker == 0xE1 and not orientation_written:
+            payload = b"Exif\0\0" + _orientation_tiff(orientation)
+            out += b"\xff\xe1" + (len(payload) + 2).to_bytes(2, "big") + payload
+            orientation_written = True
+        pos += 2 + length
+    return None
+
+
+def _png_chunk(chunk_type: bytes, payload: bytes) -> bytes:
+    return (
+        len(payload).to_bytes(4, "big") + chunk_type + payload
+        + zlib.crc32(chunk_type + payload).to_bytes(4, "big")
+    )
+
+
+def _strip_png(data: bytes, orientation: int) -> Optional[bytes]:
+    out = bytearray(data[:8])
+    pos = 8
+    while pos + 12 <= len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        chunk_type = data[pos + 4:pos + 8]
+        end = pos + 12 + length
+        if chunk_type not in _PNG_METADATA_CHUNKS:
+            if chunk_type == b"IDAT" and orientation != 1:
+                out += _png_chunk(b"eXIf", _orientation_tiff(orientation))
+                orientation = 1
+            out += data[pos:end]
+        pos = end
+        if chunk_type == b"IEND":
+            return bytes(out)
+    return None
+
+
+def _strip_webp(data: bytes, orientation: int) -> Optional[bytes]:
+    chunks = []
+    pos = 12
+    while pos + 8 <= len(data):
+        fourcc = data[pos:pos + 4]
+        length = int.from_bytes(data[pos + 4:pos + 8], "little")
+        end = pos + 8 + length + (length & 1)
+        if fourcc not in _WEBP_METADATA_CHUNKS:
+            chunks.append(bytearray(data[pos:end]))
+        pos = end
+    if pos != len(data) or not chunks:
+        return None
+    if chunks[0][:4] == b"VP8X":
+        chunks[0][8] &= ~0x0C  # флаги EXIF и XMP
+        if orientation != 1:
+            chunks[0][8] |= 0x08
+            tiff = _orientation_tiff(orientation)
+            chunks.append(bytearray(b"EXIF" + len(tiff).to_bytes(4, "little") + tiff + b"\0" * (len(tiff) & 1)))
+    body = b"WEBP" + b"".join(chunks)
+    return b"RIFF" + len(body).to_bytes(4, "little") + body
+
+
+_METADATA_STRIPPERS = {"JPEG": _strip_jpeg, "PNG": _strip_png, "WEBP": _strip_webp}
+
+
+def _to_srgb(image: Image.Image, icc: bytes) -> Optional[Image.Image]:
+    """Перевод в sRGB по встроенному профилю (после этого профиль не нужен); не вышло — None."""
+    global _srgb_profile
+    try:
+        if _srgb_profile is None:
+            _srgb_profile = ImageCms.createProfile("sRGB")
+        return ImageCms.profileToProfile(
+            image, ImageCms.ImageCmsProfile(io.BytesIO(icc)), _srgb_profile, outputMode="RGB"
+        )
+    except (ImageCms.PyCMSError, OSError, ValueError):
+        return None
+
+
+def _recompress(image: Image.Image, quality: int, max_side: Optional[int]) -> Optional[tuple[bytes, bool]]:
+    """Пережатие в том же формате с уменьшением до max_side. Возвращает (байты, уменьшено ли)."""
+    save_options = _RECOMPRESS_SAVE_OPTIONS.get(image.format)
+    if save_options is None or getattr(image, "n_frames", 1) > 1:
+        return None
+    image_format = image.format
+    icc = image.info.get("icc_profile")
+    image = ImageOps.exif_transpose(image)  # до перевода цвета: у его результата нет EXIF
+    if icc and image.mode in ("RGB", "CMYK"):
+        converted = _to_srgb(image, icc)
+        if converted is not None:
+            image, icc = converted, None
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    resized = bool(max_side) and max(image.size) > max_side
+    if resized:
+        if image.mode in ("1", "P"):
+            image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, icc_profile=icc, **save_options(quality))
+    return buffer.getvalue(), resized
+
+
+def optimize_image(source: str, destination: str, quality: Optional[int], max_side: Optional[int]) -> dict:
+    """
+    Оптимизация оригинала перед сохранением: метаданные (EXIF с геометкой и моделью камеры, XMP,
+    IPTC, комментарии) убираются без перекодирования — остаётся только ориентация; с quality файл
+    ещё и пережимается (с уменьшением до max_side), если это даёт заметный выигрыш.
+    Результат пишется в destination, только если он отличается от исходника.
+    Возвращает {"bytes_before", "bytes_after", "recompressed", "sha256"} (sha256 None — файл не изменился).
+    """
+    data = Path(source).read_bytes()
+    with Image.open(io.BytesIO(data)) as image:
+        strip = _METADATA_STRIPPERS.get(image.format)
+        result = (strip(data, image.getexif().get(_ORIENTATION, 1)) if strip else None) or data
+        recompressed = False
+        if quality is not None:
+            candidate = _recompress(image, quality, max_side)
+            if candidate is not None:
+                candidate_bytes, resized = candidate
+                if resized or len(candidate_bytes) < len(result) * _MIN_RECOMPRESS_GAIN:
+                    result, recompressed = candidate_bytes, True
+
+    report = {"bytes_before": len(data), "bytes_after": len(result), "recompressed": recompressed, "sha256": None}
+    if result != data:
+        Path(destination).write_bytes(result)
+        report["sha256"] = hashlib.sha256(result).hexdigest()
+    return report
+
+
+# ---------------- ПЛЕЙСХОЛДЕРЫ ----------------
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB-версия изображения; прозрачные области — на белом фоне."""
+    if image.mode == "RGBA":
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB")
+
+
+def dominant_color(image: Image.Image) -> str:
+    """Преобладающий цвет (#rrggbb): самый частый цвет палитры из 5 цветов по уменьшенной копии."""
+    small = _flatten(image).resize((64, 64), Image.Resampling.BILINEAR)
+    quantized = small.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette()
+    _, index = max(quantized.getcolors())
+    r, g, b = palette[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _base83(value: int, length: int) -> str:
+    return "".join(_BASE83[(value // 83 ** (length - i - 1)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(value: int) -> float:
+    v = value / 255
+    return v / 12.92 if v <= 0.04045 else ((v + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    v = max(0.0, min(1.0, value))
+    return round(v * 12.92 * 255) if v <= 0.0031308 else round((1.055 * v ** (1 / 2.4) - 0.055) * 255)
+
+
+def blurhash(image: Image.Image, x_components: int = 4, y_components: int = 3) -> str:
+    """
+    BlurHash (https://blurha.sh) изображения. Считается по копии ~32px —
+    на качество плейсхолдера это не влияет, а время кодирования падает в сотни раз.
+    """
+    small = _flatten(image)
+    small.thumbnail((32, 32), Image.Resampling.BILINEAR)
+    width, height = small.size
+    pixels = [tuple(_srgb_to_linear(c) for c in px) for px in small.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            normalisation = 1 if i == 0 and j == 0 else 2
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pr, pg, pb = pixels[row + x]
+                    r += basis * pr
+                    g += basis * pg
+                    b += basis * pb
+            scale = normalisation / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(c) for factor in ac for c in factor)
+        quantised_max = max(0, min(82, int(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _base83(0, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (
+            max(0, min(18, int(math.floor(math.copysign(abs(c / max_value) ** 0.5, c) * 9 + 9.5))))
+            for c in factor
+        )
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+# Форматы ответа ресайза: имя -> (формат Pillow, опции)
+_RESIZE_SAVE_OPTIONS = {
+    "avif": {"format": "AVIF", "quality": 60},
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def resize_image(source: str, destination: str, width: int | None, height: int | None, fmt: str) -> None:
+    """
+    Вписывает изображение в рамку width x height (любая из сторон может отсутствовать)
+    без увеличения и записывает результат в destination в формате fmt.
+    """
+    with Image.open(source) as original:
+        image = _prepare(original)
+        box_width = width or image.width
+        box_height = height or image.height
+        scale = min(box_width / image.width, box_height / image.height, 1)
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        if fmt == "jpeg":
+            image = _flatten(image)
+        image.save(destination, **_RESIZE_SAVE_OPTIONS[fmt])
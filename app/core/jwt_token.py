@@ -9,10 +9,11 @@ from app.core.config import settings
 # ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, version: int = 0) -> str:
+    """JWT с именем пользователя (sub) и версией его учётных данных (ver, см. User.token_version)."""
     to_encode: Dict[str, Any] = {}
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"sub": str(subject), "exp": expire})
+    to_encode.update({"sub": str(subject), "exp": expire, "ver": version})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
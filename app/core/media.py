@@ -0,0 +1,375 @@
+import base64
+import hashlib
+import hmac
+import mimetypes
+import os
+import re
+import stat
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from app.core.config import settings
+from app.core.storage import UPLOAD_ROOT, StoredObject, storage
+
+mimetypes.add_type("image/avif", ".avif")  # нет в старых таблицах mimetypes
+mimetypes.add_type("image/webp", ".webp")
+
+MEDIA_PREFIX = "/media"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Имя файла вида <sha256>.<ext> (или производная <sha256>.<...>.<ext>) — содержимое по этому имени не меняется
+_CONTENT_ADDRESSED_RE = re.compile(r"^[0-9a-f]{64}(\.|$)")
+
+
+# ---------------- ПУТИ ----------------
+def media_url(stored_path: Optional[str]) -> Optional[str]:
+    """Преобразует путь из БД ("uploads/news_images/x.jpg") в URL ("/media/news_images/x.jpg")."""
+    if not stored_path:
+        return None
+    relative = PurePosixPath(stored_path)
+    if relative.parts and relative.parts[0] == UPLOAD_ROOT.name:
+        relative = PurePosixPath(*relative.parts[1:])
+    return f"{MEDIA_PREFIX}/{relative}"
+
+
+def media_key(relative_path: str) -> str:
+    """
+    Ключ файла в хранилище для пути из URL ("news_images/x.jpg" -> "uploads/news_images/x.jpg").
+    Запрещает выход за пределы каталога и служебные каталоги (начинающиеся с точки).
+    Сегменты проверяются до нормализации: PurePosixPath превращает ведущий "/" в отдельную часть
+    и молча выбрасывает "." — "/applications/x" и "./applications/x" обошли бы проверку закрытых каталогов.
+    """
+    parts = relative_path.split("/")
+    if any(part in ("", ".", "..") or part.startswith(".") for part in parts):
+        raise HTTPException(status_code=404, detail="File not found")
+    return str(PurePosixPath(UPLOAD_ROOT.name, *parts))
+
+
+def resolve_media_path(relative_path: str) -> Path:
+    """Возвращает абсолютный путь файла внутри UPLOAD_ROOT (только для локального хранилища)."""
+    parts = PurePosixPath(media_key(relative_path)).parts[1:]
+    path = UPLOAD_ROOT.joinpath(*parts)
+    if not path.resolve().is_relative_to(UPLOAD_ROOT.resolve()):
+        raise HTTPException(status_code=404, detail="File not found")
+    return path
+
+
+# ---------------- ПОДПИСАННЫЕ ССЫЛКИ ----------------
+# Отдельный ключ, производный от SECRET_KEY: подпись ссылки нельзя выдать за подпись JWT и наоборот
+_SIGNING_KEY = hmac.new(settings.SECRET_KEY.encode(), b"media-signed-url", hashlib.sha256).digest()
+
+
+def _signature(relative_path: str, expires: int) -> str:
+    digest = hmac.new(_SIGNING_KEY, f"{relative_path}\n{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).rstrip(b"=").decode()
+
+
+def signed_media_url(stored_path: Optional[str], ttl: Optional[int] = None) -> Optional[str]:
+    """
+    Ссылка на закрытый файл с подписью и сроком действия: "/media/applications/...pdf?exp=...&sig=...".
+    Обычный срок (ttl не передан) округляется вверх до минуты, чтобы повторные ответы в течение
+    минуты давали ту же ссылку (и браузер брал файл из кэша). Явный ttl не округляется: им
+    переподписывают ссылку с оставшимся сроком, и он не должен выходить за исходный exp.
+    """
+    url = media_url(stored_path)
+    if url is None:
+        return None
+    if ttl is None:
+        expires = -(-(int(time.time()) + settings.MEDIA_SIGNED_URL_TTL) // 60) * 60
+    else:
+        expires = int(time.time()) + ttl
+    relative_path = url[len(MEDIA_PREFIX) + 1:]
+    return f"{url}?exp={expires}&sig={_signature(relative_path, expires)}"
+
+
+def verify_media_signature(relative_path: str, expires: Optional[int], signature: Optional[str]) -> int:
+    """Проверяет подпись без обращения к БД. Возвращает оставшийся срок в секундах; неверная или истёкшая — 403."""
+    remaining = (expires or 0) - int(time.time())
+    # байты, а не str: compare_digest на строках с не-ASCII символами падает с TypeError (500 вместо 403)
+    if (
+        signature is None
+        or remaining <= 0
+        or not hmac.compare_digest(signature.encode(), _signature(relative_path, expires).encode())
+    ):
+        raise HTTPException(status_code=403, detail="Invalid or expired link")
+    return remaining
+
+
+def is_content_addressed(name: str) -> bool:
+    return bool(_CONTENT_ADDRESSED_RE.match(name))
+
+
+# ---------------- ЗАГОЛОВКИ ----------------
+def make_etag(stat_result: os.stat_result) -> str:
+    """Сильный ETag из метаданных файла: размер + mtime в наносекундах."""
+    return f'"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range для одного диапазона байт. Возвращает (start, end) включительно
+    или None, если заголовка нет или он не поддерживается (тогда отдаётся весь файл).
+    Неудовлетворимый диапазон — 416.
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None  # несколько диапазонов не поддерживаем — отдаём целиком, это допустимо по RFC 9110
+    start_s, _, end_s = spec.partition("-")
+    try:
+        if start_s == "":
+            suffix = int(end_s)
+            if suffix <= 0:
+                raise ValueError
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(start_s)
+            end = int(end_s) if end_s else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested Range Not Satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, min(end, size - 1)
+
+
+# ---------------- ОТВЕТ ----------------
+class MediaFileResponse(Response):
+    """
+    Отдаёт файл или его диапазон.
+
+    Если сервер поддерживает ASGI-расширение http.response.zerocopysend, передаёт ему
+    дескриптор файла — сервер отправляет данные через sendfile без копирования в userspace.
+    Если поддерживается http.response.pathsend — передаёт путь (только целый файл).
+    Иначе читает файл кусками в пуле потоков.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: dict, send_body: bool = True):
+        super().__init__(status_code=status_code, headers=headers)
+        self.path = path
+        self.start = start
+        self.length = length
+        self.send_body = send_body
+        self.is_full_file = start == 0 and status_code == 200
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if not self.send_body or self.length == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        extensions = scope.get("extensions") or {}
+        if "http.response.zerocopysend" in extensions:
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.start,
+                    "count": self.length,
+                })
+            return
+        if "http.response.pathsend" in extensions and self.is_full_file:
+            await send({"type": "http.response.pathsend", "path": str(self.path)})
+            return
+
+        remaining = self.length
+        async with await anyio.open_file(self.path, "rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        if remaining > 0:
+            # файл укоротился во время отдачи — закрываем ответ
+            await send({"type": "http.response.body", "body": b""})
+
+
+def media_cache_control(path: PurePosixPath) -> str:
+    if is_content_addressed(path.name):
+        return IMMUTABLE_CACHE_CONTROL
+    return f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+
+async def stat_media_file(path: Path) -> os.stat_result:
+    """stat обычного файла в пуле потоков; отсутствующий файл или каталог — 404."""
+    try:
+        stat_result = await run_in_threadpool(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    return stat_result
+
+
+async def build_media_response(request: Request, relative_path: str, cache_control: Optional[str] = None) -> Response:
+    """
+    Полный ответ для загруженного файла: условные запросы (ETag / If-Modified-Since),
+    Range, кэширование и, при включённом MEDIA_X_ACCEL_REDIRECT, передача отдачи nginx.
+    Из удалённого хранилища файл (или диапазон) передаётся потоком.
+    """
+    if not storage.is_local:
+        key = media_key(relative_path)
+        obj = await storage.stat(key)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        return build_object_response(request, key, obj, cache_control or media_cache_control(PurePosixPath(key)))
+
+    path = resolve_media_path(relative_path)
+    stat_result = await stat_media_file(path)
+    accel_path = None
+    if settings.MEDIA_X_ACCEL_REDIRECT:
+        internal = path.relative_to(UPLOAD_ROOT).as_posix()
+        accel_path = f"{settings.MEDIA_X_ACCEL_PREFIX.rstrip('/')}/{internal}"
+    return build_file_response(request, path, stat_result, cache_control or media_cache_control(path), accel_path=accel_path)
+
+
+def _prepare_response(
+    request: Request,
+    name: str,
+    etag: str,
+    mtime: float,
+    size: int,
+    cache_control: str,
+    accel_path: Optional[str],
+    extra_headers: Optional[dict],
+) -> Tuple[Optional[Response], dict, Optional[Tuple[int, int]]]:
+    """
+    Общая часть отдачи: заголовки, условные запросы, X-Accel-Redirect и Range.
+    Возвращает (готовый ответ или None, заголовки, диапазон или None — весь файл).
+    """
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+        **(extra_headers or {}),
+    }
+
+    # --- условные запросы ---
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers), headers, None
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"]).timestamp()
+            if int(mtime) <= since:
+                return Response(status_code=304, headers=headers), headers, None
+        except (TypeError, ValueError):
+            pass
+
+    # --- nginx отдаёт сам (sendfile, Range, keepalive) ---
+    if accel_path:
+        headers["X-Accel-Redirect"] = accel_path
+        return Response(status_code=200, headers=headers), headers, None
+
+    content_type, _ = mimetypes.guess_type(name)
+    headers["Content-Type"] = content_type or "application/octet-stream"
+
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if if_range is None or if_range.strip() == etag:
+        byte_range = parse_range(request.headers.get("range"), size)
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+    else:
+        start, end = byte_range
+        headers["Content-Length"] = str(end - start + 1)
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return None, headers, byte_range
+
+
+def build_file_response(
+    request: Request,
+    path: Path,
+    stat_result: os.stat_result,
+    cache_control: str,
+    accel_path: Optional[str] = None,
+    extra_headers: Optional[dict] = None,
+) -> Response:
+    """Ответ для уже проверенного файла: условные запросы, Range, HEAD, X-Accel-Redirect."""
+    size = stat_result.st_size
+    response, headers, byte_range = _prepare_response(
+        request, path.name, make_etag(stat_result), stat_result.st_mtime, size,
+        cache_control, accel_path, extra_headers,
+    )
+    if response is not None:
+        return response
+
+    send_body = request.method != "HEAD"
+    if byte_range is None:
+        return MediaFileResponse(path, 0, size, 200, headers, send_body)
+    start, end = byte_range
+    return MediaFileResponse(path, start, end - start + 1, 206, headers, send_body)
+
+
+def build_object_response(
+    request: Request,
+    key: str,
+    obj: StoredObject,
+    cache_control: str,
+    extra_headers: Optional[dict] = None,
+) -> Response:
+    """То же для объекта удалённого хранилища: тело (или диапазон) читается из него потоком."""
+    return build_stream_response(
+        request,
+        PurePosixPath(key).name,
+        obj.etag,
+        obj.mtime,
+        obj.size,
+        cache_control,
+        lambda start, length: storage.open_range(key, start, length),
+        extra_headers,
+    )
+
+
+def build_stream_response(
+    request: Request,
+    name: str,
+    etag: str,
+    mtime: float,
+    size: int,
+    cache_control: str,
+    open_range: Callable[[int, int], AsyncIterator[bytes]],
+    extra_headers: Optional[dict] = None,
+) -> Response:
+    """
+    Ответ с телом, которое отдаёт open_range(start, length) (объект хранилища, собираемый архив):
+    условные запросы, Range и HEAD — как для файлов.
+    """
+    response, headers, byte_range = _prepare_response(
+        request, name, etag, mtime, size, cache_control, None, extra_headers,
+    )
+    if response is not None:
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    status_code = 200 if byte_range is None else 206
+    if request.method == "HEAD" or size == 0:
+        return Response(status_code=status_code, headers=headers)
+    return StreamingResponse(open_range(start, end - start + 1), status_code=status_code, headers=headers)
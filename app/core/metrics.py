@@ -0,0 +1,40 @@
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+# ---------------- МЕТРИКИ ----------------
+class Metrics:
+    """
+    Простые счётчики процесса (попадания в кэш, ошибки, байты и т.п.).
+    Значения живут в памяти воркера; /metrics отдаёт снимок текущего процесса.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+
+    def set(self, name: str, value: float) -> None:
+        """Для величин-состояний (размер кэша и т.п.)."""
+        with self._lock:
+            self._counters[name] = value
+
+    def max(self, name: str, value: float) -> None:
+        """Наибольшее наблюдавшееся значение (время ожидания в очереди и т.п.)."""
+        with self._lock:
+            if value > self._counters.get(name, 0):
+                self._counters[name] = value
+
+    def get(self, name: str) -> float:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+
+metrics = Metrics()
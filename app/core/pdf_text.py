@@ -0,0 +1,175 @@
+"""
+Текст PDF из откликов для поиска по резюме (application_files.search_vector, индекс GIN).
+
+PDF разбирается не в запросе на отклик, а в фоне. Воркер забирает файлы со статусом pending
+(FOR UPDATE SKIP LOCKED — несколько процессов uvicorn не мешают друг другу) и разбирает их
+в отдельном небольшом пуле процессов (app.core.workers.PDF_POOL), не занимая пул изображений.
+Размер файла, число страниц, длина текста и время разбора (PDF_TEXT_TIMEOUT_SECONDS) ограничены.
+Сохраняются текст и число страниц, tsvector по тексту PostgreSQL считает сам
+(сгенерированная колонка). Поиск (application_service.search_applications) идёт только
+по индексу и файлы не читает.
+"""
+import asyncio
+import itertools
+import logging
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import PurePosixPath
+from typing import Optional
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.core.storage import storage
+from app.core.workers import PDF_POOL, run_in_pool
+from app.models.models import ApplicationFile
+
+logger = logging.getLogger(__name__)
+
+# Конфигурация текстового поиска: резюме на разных языках — без стемминга и стоп-слов
+SEARCH_CONFIG = "simple"
+# Границы совпадений в ts_headline: управляющие символы вместо <b>, чтобы текст из PDF можно было
+# экранировать целиком (в тексте их нет — extract_pdf_text их вырезает)
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_STOP = "\x03"
+
+_wakeup = asyncio.Event()
+# не больше задач, чем процессов в пуле: таймаут считается от начала разбора, а не от постановки в очередь
+_slots = asyncio.Semaphore(max(1, settings.PDF_TEXT_WORKERS))
+_worker: Optional[asyncio.Task] = None
+
+
+def notify_pdf_text() -> None:
+    """Будит воркер после commit, добавившего файлы откликов (иначе он проснётся по таймеру)."""
+    _wakeup.set()
+
+
+# ---------------- РАЗБОР ----------------
+def extract_pdf_text(source: str, max_pages: int, max_chars: int) -> dict:
+    """
+    Текст первых max_pages страниц (не больше max_chars символов) и общее число страниц.
+    Выполняется в пуле процессов: pypdf написан на Python и на больших файлах долго занимает CPU.
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise RuntimeError("Извлечение текста из PDF требует пакет pypdf")
+
+    reader = PdfReader(source)
+    if reader.is_encrypted:
+        reader.decrypt("")  # защищённые только от редактирования открываются пустым паролем
+    parts = []
+    length = 0
+    for page in itertools.islice(reader.pages, max_pages):
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    # NUL в text PostgreSQL не принимает, маркеры подсветки не должны встречаться в самом тексте
+    text = "\n".join(parts)[:max_chars]
+    for char in ("\x00", HIGHLIGHT_START, HIGHLIGHT_STOP):
+        text = text.replace(char, "")
+    return {"text": text, "pages": len(reader.pages)}
+
+
+async def _extract(file_url: str) -> tuple[str, Optional[dict]]:
+    """(статус, результат): done — текст извлечён, skipped — не PDF или слишком большой файл."""
+    if PurePosixPath(file_url).suffix.lower() != ".pdf":
+        return "skipped", None
+    stored = await storage.stat(file_url)
+    if stored is None:
+        raise FileNotFoundError(file_url)
+    if stored.size > settings.PDF_TEXT_MAX_MB * 1024 * 1024:
+        return "skipped", None
+    async with storage.materialize(file_url) as path, _slots:
+        result = await run_in_pool(
+            PDF_POOL,
+            extract_pdf_text,
+            str(path),
+            settings.PDF_TEXT_MAX_PAGES,
+            settings.PDF_TEXT_MAX_CHARS,
+            timeout=settings.PDF_TEXT_TIMEOUT_SECONDS,
+        )
+    return "done", result
+
+
+# ---------------- ВОРКЕР ----------------
+async def process_pdf_text(batch_size: Optional[int] = None) -> int:
+    """Разбирает одну пачку файлов со статусом pending. Возвращает число взятых строк."""
+    batch_size = batch_size or settings.PDF_TEXT_BATCH_SIZE
+    async with AsyncSessionLocal() as session:
+        rows = (await session.execute(
+            select(ApplicationFile)
+            .where(ApplicationFile.text_status == "pending")
+            .order_by(ApplicationFile.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )).scalars().all()
+        if not rows:
+            return 0
+
+        outcomes = await asyncio.gather(*(_extract(row.file_url) for row in rows), return_exceptions=True)
+        # по таймауту процессы пула завершаются, и соседние файлы падают с BrokenProcessPool не по своей вине
+        timed_out = any(isinstance(outcome, asyncio.TimeoutError) for outcome in outcomes)
+        for row, outcome in zip(rows, outcomes):
+            if timed_out and isinstance(outcome, BrokenProcessPool):
+                continue  # остаётся pending, разберётся со следующей пачкой
+            if isinstance(outcome, asyncio.TimeoutError):
+                metrics.inc("pdf_text_timeouts")
+                row.text_status = "failed"
+                logger.warning("Разбор %s не уложился в %s с", row.file_url, settings.PDF_TEXT_TIMEOUT_SECONDS)
+                continue
+            if isinstance(outcome, Exception):
+                # битый или нестандартный PDF повторный разбор не починит
+                metrics.inc("pdf_text_failed")
+                row.text_status = "failed"
+                logger.warning("Не удалось извлечь текст из %s: %s", row.file_url, outcome)
+                continue
+            row.text_status, result = outcome
+            if result is None:
+                metrics.inc("pdf_text_skipped")
+                continue
+            metrics.inc("pdf_text_extracted")
+            metrics.inc("pdf_text_pages", result["pages"])
+            row.text_content = result["text"]
+            row.page_count = result["pages"]
+        await session.commit()
+    return len(rows)
+
+
+async def _run_worker() -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            taken = await process_pdf_text()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Ошибка разбора PDF откликов")
+            taken = 0
+        if taken >= settings.PDF_TEXT_BATCH_SIZE:
+            continue  # очередь не разобрана — следующая пачка сразу
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.PDF_TEXT_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_pdf_text_worker() -> None:
+    global _worker
+    if _worker is None or _worker.done():
+        _worker = asyncio.get_running_loop().create_task(_run_worker())
+
+
+async def stop_pdf_text_worker() -> None:
+    global _worker
+    if _worker is None:
+        return
+    _worker.cancel()
+    try:
+        await _worker
+    except asyncio.CancelledError:
+        pass
+    _worker = None
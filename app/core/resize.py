@@ -0,0 +1,242 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import mimetypes
+import os
+import uuid
+from collections import OrderedDict
+from pathlib import Path, PurePosixPath
+from typing import Awaitable, Callable, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.images import resize_image, supported_formats
+from app.core.media import build_file_response, media_cache_control, media_key
+from app.core.metrics import metrics
+from app.core.storage import BASE_DIR, storage
+from app.core.uploads import ALLOWED_IMAGE_TYPES
+from app.core.workers import run_in_process
+
+logger = logging.getLogger(__name__)
+
+# Форматы в порядке предпочтения при согласовании по Accept; jpeg — запасной вариант для всех
+RESIZE_FORMATS = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+# ---------------- ФОРМАТ ----------------
+def _accepted_types(accept: str) -> set[str]:
+    accepted = set()
+    for item in accept.split(","):
+        media_type, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(media_type.strip().lower())
+    return accepted
+
+
+@functools.lru_cache(maxsize=None)
+def _available_formats() -> tuple[str, ...]:
+    """Форматы из RESIZE_FORMATS, которые умеет установленный Pillow (AVIF — с 11.3). Проверяется один раз."""
+    available = tuple(fmt for fmt in RESIZE_FORMATS if fmt == "jpeg" or supported_formats([fmt]))
+    missing = set(RESIZE_FORMATS) - set(available)
+    if missing:
+        logger.warning("Pillow не поддерживает %s: ресайз в этих форматах недоступен", ", ".join(sorted(missing)))
+    return available
+
+
+def negotiate_image_format(accept: Optional[str], requested: Optional[str]) -> str:
+    """Явный ?fmt= или лучший формат из Accept, который умеет Pillow."""
+    if requested:
+        if requested not in _available_formats():
+            raise HTTPException(status_code=400, detail=f"Unsupported format: {requested}")
+        return requested
+    accepted = _accepted_types(accept or "")
+    for fmt in _available_formats():
+        if RESIZE_FORMATS[fmt] in accepted:
+            return fmt
+    return "jpeg"
+
+
+# ---------------- ДИСКОВЫЙ КЭШ ----------------
+class DiskLRUCache:
+    """
+    Кэш готовых файлов на диске с ограничением по суммарному размеру (LRU).
+
+    Индекс (имя -> размер) хранится в памяти и при первом обращении восстанавливается
+    по каталогу в порядке mtime. Одновременные промахи по одному ключу ждут одну генерацию.
+    Несколько воркеров могут делить каталог: файл, созданный соседом, подхватывается,
+    а вытесненный соседом — генерируется заново.
+    """
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _scan(self) -> list[tuple[float, str, int]]:
+        found = []
+        if not self.root.exists():
+            return found
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                st = entry.stat()
+                found.append((st.st_mtime, f"{shard.name}/{entry.name}", st.st_size))
+        return sorted(found)
+
+    async def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        for _, name, size in await run_in_threadpool(self._scan):
+            self._add(name, size)
+        await self._evict()
+
+    def _add(self, name: str, size: int) -> None:
+        self._total += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+        metrics.set("media_resize_cache_bytes", self._total)
+
+    def discard(self, name: str) -> None:
+        self._total -= self._entries.pop(name, 0)
+        metrics.set("media_resize_cache_bytes", self._total)
+
+    async def _evict(self) -> None:
+        victims = []
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self._total -= size
+            victims.append(self.root / name)
+        if victims:
+            metrics.inc("media_resize_cache_evictions", len(victims))
+            metrics.set("media_resize_cache_bytes", self._total)
+            await run_in_threadpool(lambda: [p.unlink(missing_ok=True) for p in victims])
+
+    async def get_or_create(
+        self, key: str, suffix: str, render: Callable[[Path], Awaitable[None]]
+    ) -> Tuple[Path, os.stat_result]:
+        """
+        Возвращает (путь, stat) файла кэша для key; при промахе вызывает render(tmp_path),
+        после чего файл атомарно переименовывается на место.
+        """
+        await self._ensure_loaded()
+        name = f"{key[:2]}/{key}.{suffix}"
+        path = self.root / name
+
+        if name in self._entries:
+            try:
+                stat_result = await run_in_threadpool(os.stat, path)
+                self._entries.move_to_end(name)
+                metrics.inc("media_resize_cache_hits")
+                return path, stat_result
+            except FileNotFoundError:
+                self.discard(name)  # вытеснен другим воркером
+
+        inflight = self._inflight.get(name)
+        if inflight is not None:
+            metrics.inc("media_resize_cache_coalesced")
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[name] = future
+        try:
+            try:
+                stat_result = await run_in_threadpool(os.stat, path)  # создан соседним воркером
+                metrics.inc("media_resize_cache_hits")
+            except FileNotFoundError:
+                metrics.inc("media_resize_cache_misses")
+                stat_result = await self._render(path, render)
+            self._add(name, stat_result.st_size)
+            result = (path, stat_result)
+            future.set_result(result)
+            await self._evict()
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # помечаем исключение как полученное, если никто не ждал
+            raise
+        finally:
+            self._inflight.pop(name, None)
+
+    async def _render(self, path: Path, render: Callable[[Path], Awaitable[None]]) -> os.stat_result:
+        await run_in_threadpool(path.parent.mkdir, parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            await render(tmp_path)
+            await run_in_threadpool(os.replace, tmp_path, path)
+        except BaseException:
+            await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+            raise
+        return await run_in_threadpool(os.stat, path)
+
+
+resize_cache = DiskLRUCache(
+    BASE_DIR / settings.MEDIA_RESIZE_CACHE_DIR,
+    settings.MEDIA_RESIZE_CACHE_MAX_MB * 1024 * 1024,
+)
+
+
+# ---------------- ОТВЕТ ----------------
+async def build_resized_response(
+    request: Request,
+    relative_path: str,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: Optional[str],
+) -> Response:
+    """
+    Уменьшенная копия загруженного изображения. Размеры — только из разрешённых списков,
+    иначе любой клиент мог бы заполнить кэш бесконечным числом вариантов.
+    Кэш копий локальный на каждом узле; оригинал из удалённого хранилища скачивается только при промахе.
+    """
+    if width is None and height is None:
+        raise HTTPException(status_code=400, detail="w or h is required")
+    if width is not None and width not in settings.MEDIA_RESIZE_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"w must be one of {settings.MEDIA_RESIZE_WIDTHS}")
+    if height is not None and height not in settings.MEDIA_RESIZE_HEIGHTS:
+        raise HTTPException(status_code=400, detail=f"h must be one of {settings.MEDIA_RESIZE_HEIGHTS}")
+
+    source = PurePosixPath(media_key(relative_path))
+    mime_type, _ = mimetypes.guess_type(source.name)
+    if mime_type not in ALLOWED_IMAGE_TYPES:
+        raise HTTPException(status_code=400, detail="Resizing is only available for images")
+    source_stat = await storage.stat(str(source))
+    if source_stat is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    out_format = negotiate_image_format(request.headers.get("accept"), fmt)
+    # размер и ETag (mtime) в ключе: заменённый оригинал не отдаст старую копию
+    key = hashlib.sha256(
+        f"{relative_path}|{source_stat.size}|{source_stat.etag}|{width}|{height}|{out_format}".encode()
+    ).hexdigest()
+
+    async def render(destination: Path) -> None:
+        async with storage.materialize(str(source)) as source_path:
+            await run_in_process(resize_image, str(source_path), str(destination), width, height, out_format)
+
+    path, stat_result = await resize_cache.get_or_create(key, out_format, render)
+    return build_file_response(
+        request,
+        path,
+        stat_result,
+        media_cache_control(source),
+        extra_headers=None if fmt else {"Vary": "Accept"},
+    )
@@ -0,0 +1,316 @@
+"""
+Докачиваемые загрузки (протокол в стиле tus 1.0: создание / PATCH части / HEAD смещения).
+
+Клиент на медленном канале создаёт загрузку (POST /uploads/ с Upload-Length и Upload-Metadata),
+затем шлёт файл частями PATCH-запросами с Upload-Offset. После обрыва он спрашивает смещение
+(HEAD) и продолжает с него: полученные байты заново не передаются, а каждый запрос держит
+воркер только на время своей части.
+
+Данные лежат в uploads/.staging/resumable/<id>.part (та же ФС, что и uploads), смещение — размер
+этого файла, описание — рядом в <id>.json. Завершённая загрузка подключается к форме по ID
+(resumed_uploads): файл передаётся в save_uploaded_files жёсткой ссылкой, без копирования,
+и проходит те же проверки, что и файл формы. Загрузка, к которой не обращались
+RESUMABLE_UPLOAD_EXPIRY_HOURS, удаляется.
+
+Состояние хранится на диске узла: при нескольких узлах запросы одной загрузки должны попадать
+на один узел (или каталог uploads должен быть общим).
+"""
+import base64
+import binascii
+import fcntl
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import time
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.requests import ClientDisconnect
+
+from app.core.config import settings
+from app.core.storage import STAGING_ROOT
+from app.core.uploads import ALLOWED_IMAGE_TYPES, ALLOWED_PDF_TYPES, StagedUploadFile
+
+TUS_VERSION = "1.0.0"
+RESUMABLE_ROOT = STAGING_ROOT / "resumable"
+
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_WRITE_BUFFER_SIZE = 1024 * 1024
+_HASH_CHUNK_SIZE = 1024 * 1024
+_PURGE_INTERVAL_SECONDS = 600
+_last_purge = 0.0
+
+
+@dataclass
+class ResumableUpload:
+    id: str
+    filename: str
+    content_type: str
+    length: int
+    sha256: Optional[str] = None  # заполняется, когда получен последний байт
+    head: str = ""                # первые байты (hex) — для проверки сигнатуры без чтения файла
+
+    @property
+    def data_path(self) -> Path:
+        return RESUMABLE_ROOT / f"{self.id}.part"
+
+    @property
+    def meta_path(self) -> Path:
+        return RESUMABLE_ROOT / f"{self.id}.json"
+
+    @property
+    def is_complete(self) -> bool:
+        return self.sha256 is not None
+
+
+def expires_at(mtime: float) -> float:
+    """Загрузка живёт RESUMABLE_UPLOAD_EXPIRY_HOURS с последней записанной части."""
+    return mtime + settings.RESUMABLE_UPLOAD_EXPIRY_HOURS * 3600
+
+
+# ---------------- МЕТАДАННЫЕ ----------------
+def parse_upload_metadata(header: Optional[str]) -> dict[str, str]:
+    """Upload-Metadata: "filename <base64>,filetype <base64>" -> {"filename": ..., "filetype": ...}."""
+    metadata: dict[str, str] = {}
+    for item in (header or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        key, _, value = item.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata value for {key}")
+    return metadata
+
+
+def _write_meta(upload: ResumableUpload) -> None:
+    tmp_path = upload.meta_path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp_path.write_text(json.dumps(asdict(upload)))
+    os.replace(tmp_path, upload.meta_path)
+
+
+def _read_meta(upload_id: str) -> Optional[ResumableUpload]:
+    try:
+        return ResumableUpload(**json.loads((RESUMABLE_ROOT / f"{upload_id}.json").read_text()))
+    except FileNotFoundError:
+        return None
+
+
+def _remove(upload_id: str) -> None:
+    (RESUMABLE_ROOT / f"{upload_id}.json").unlink(missing_ok=True)
+    (RESUMABLE_ROOT / f"{upload_id}.part").unlink(missing_ok=True)
+
+
+def purge_expired_uploads() -> int:
+    """Удаляет загрузки, к которым давно не обращались. Возвращает их число."""
+    if not RESUMABLE_ROOT.exists():
+        return 0
+    now = time.time()
+    removed = 0
+    for entry in os.scandir(RESUMABLE_ROOT):
+        upload_id, _, suffix = entry.name.partition(".")
+        try:
+            if suffix == "json":
+                try:
+                    mtime = os.stat(RESUMABLE_ROOT / f"{upload_id}.part").st_mtime
+                except FileNotFoundError:
+                    mtime = entry.stat().st_mtime
+                if expires_at(mtime) < now:
+                    _remove(upload_id)
+                    removed += 1
+            elif suffix != "part" or not (RESUMABLE_ROOT / f"{upload_id}.json").exists():
+                # .part без описания или временный файл — остаток прерванного создания
+                if expires_at(entry.stat().st_mtime) < now:
+                    Path(entry.path).unlink(missing_ok=True)
+        except FileNotFoundError:
+            continue  # удалён параллельно
+    return removed
+
+
+async def _maybe_purge() -> None:
+    global _last_purge
+    if time.monotonic() - _last_purge < _PURGE_INTERVAL_SECONDS:
+        return
+    _last_purge = time.monotonic()
+    await run_in_threadpool(purge_expired_uploads)
+
+
+# ---------------- ПРОТОКОЛ ----------------
+async def create_upload(length: int, metadata: dict[str, str]) -> ResumableUpload:
+    """Заводит пустую загрузку. Тип и размер проверяются сразу, чтобы не принимать заведомо лишнее."""
+    max_bytes = settings.RESUMABLE_UPLOAD_MAX_MB * 1024 * 1024
+    if length <= 0:
+        raise HTTPException(status_code=400, detail="Upload-Length must be positive")
+    if length > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"Файл слишком большой. Максимум {settings.RESUMABLE_UPLOAD_MAX_MB} МБ"
+        )
+    filename = metadata.get("filename")
+    if not filename:
+        raise HTTPException(status_code=400, detail="Upload-Metadata must contain filename")
+    mime_type, _ = mimetypes.guess_type(filename)
+    if mime_type not in ALLOWED_IMAGE_TYPES | ALLOWED_PDF_TYPES:
+        raise HTTPException(status_code=400, detail=f"Недопустимый формат файла ({mime_type or 'неизвестен'})")
+
+    await _maybe_purge()
+    upload = ResumableUpload(id=uuid.uuid4().hex, filename=filename, content_type=mime_type, length=length)
+
+    def create() -> None:
+        RESUMABLE_ROOT.mkdir(parents=True, exist_ok=True)
+        os.close(os.open(upload.data_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        _write_meta(upload)
+
+    await run_in_threadpool(create)
+    return upload
+
+
+async def get_upload(upload_id: str) -> ResumableUpload:
+    """Загрузка по ID; неизвестная или истёкшая — 404."""
+    if not _UPLOAD_ID_RE.match(upload_id):
+        raise HTTPException(status_code=404, detail="Upload not found")
+    upload = await run_in_threadpool(_read_meta, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    try:
+        mtime = (await run_in_threadpool(os.stat, upload.data_path)).st_mtime
+    except FileNotFoundError:
+        mtime = 0.0
+    if expires_at(mtime) < time.time():
+        await run_in_threadpool(_remove, upload_id)
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+async def upload_offset(upload: ResumableUpload) -> tuple[int, float]:
+    """(смещение, срок истечения) — сколько байт уже получено и до какого времени загрузка хранится."""
+    st = await run_in_threadpool(os.stat, upload.data_path)
+    return st.st_size, expires_at(st.st_mtime)
+
+
+def _open_locked(path: Path) -> int:
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        raise HTTPException(status_code=423, detail="Upload is being written by another request")
+    return fd
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _finish(upload: ResumableUpload) -> None:
+    """Последний байт получен: один проход по файлу для sha256 и сигнатуры, затем метаданные."""
+    hasher = hashlib.sha256()
+    with open(upload.data_path, "rb") as file:
+        head = file.read(16)
+        hasher.update(head)
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    upload.sha256 = hasher.hexdigest()
+    upload.head = head.hex()
+    _write_meta(upload)
+
+
+async def append_chunk(upload: ResumableUpload, offset: int, chunks: AsyncIterator[bytes]) -> int:
+    """
+    Дописывает тело PATCH-запроса с позиции offset (должна совпадать с уже полученным размером — иначе 409).
+    При обрыве соединения полученные байты сохраняются: с них клиент и продолжит. Возвращает новое смещение.
+    """
+    fd = await run_in_threadpool(_open_locked, upload.data_path)
+    try:
+        current = os.fstat(fd).st_size
+        if offset != current:
+            raise HTTPException(status_code=409, detail=f"Upload-Offset mismatch: expected {current}")
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                if current + len(buffer) + len(chunk) > upload.length:
+                    raise HTTPException(status_code=413, detail="Chunk exceeds Upload-Length")
+                buffer += chunk
+                if len(buffer) >= _WRITE_BUFFER_SIZE:
+                    await run_in_threadpool(_write_all, fd, bytes(buffer))
+                    current += len(buffer)
+                    buffer.clear()
+        except ClientDisconnect:
+            pass
+        finally:
+            if buffer:
+                await run_in_threadpool(_write_all, fd, bytes(buffer))
+                current += len(buffer)
+        if current == upload.length and not upload.is_complete:
+            await run_in_threadpool(_finish, upload)
+        return current
+    finally:
+        os.close(fd)  # снимает блокировку
+
+
+async def delete_upload(upload: ResumableUpload) -> None:
+    await run_in_threadpool(_remove, upload.id)
+
+
+# ---------------- ПОДКЛЮЧЕНИЕ К ФОРМАМ ----------------
+class ResumedUploadFile(StagedUploadFile):
+    """
+    Завершённая загрузка в виде файла формы: жёсткая ссылка в staging, хэш и сигнатура уже известны,
+    поэтому при сохранении файл не перечитывается.
+    """
+
+    def __init__(self, upload: ResumableUpload):
+        STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+        self.staged_path = STAGING_ROOT / f"{uuid.uuid4().hex}.part"
+        os.link(upload.data_path, self.staged_path)
+        UploadFile.__init__(
+            self,
+            file=open(self.staged_path, "rb"),
+            size=upload.length,
+            filename=upload.filename,
+            headers=Headers({"content-type": upload.content_type}),
+        )
+        self.head = bytes.fromhex(upload.head)
+        self._digest = upload.sha256
+        self._buffer = bytearray()
+
+    @property
+    def sha256(self) -> str:
+        return self._digest
+
+
+@asynccontextmanager
+async def resumed_uploads(upload_ids: Optional[list[str]]) -> AsyncIterator[list[UploadFile]]:
+    """
+    Завершённые загрузки по ID как UploadFile для save_uploaded_files / save_uploaded_images.
+    Сами загрузки удаляются только при успешном выходе из блока: если запрос упал,
+    клиент может повторить его с теми же ID, ничего не передавая заново.
+    """
+    if not upload_ids:
+        yield []
+        return
+    uploads: list[ResumableUpload] = []
+    files: list[UploadFile] = []
+    try:
+        for upload_id in dict.fromkeys(upload_ids):
+            upload = await get_upload(upload_id)
+            if not upload.is_complete:
+                raise HTTPException(status_code=409, detail=f"Upload {upload_id} is not complete")
+            uploads.append(upload)
+            files.append(await run_in_threadpool(ResumedUploadFile, upload))
+        yield files
+        for upload in uploads:
+            await delete_upload(upload)
+    finally:
+        for file in files:
+            await file.close()
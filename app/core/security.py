@@ -1,6 +1,26 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+from app.core.config import settings
+from app.core.metrics import metrics
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=settings.ARGON2_TIME_COST,
+    argon2__memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+    argon2__parallelism=settings.ARGON2_PARALLELISM,
+)
+
+_hash_pool: Optional[ThreadPoolExecutor] = None
+_pending = 0
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -8,3 +28,80 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверка пароля + новый хэш, если сохранённый посчитан с другими параметрами argon2 (ARGON2_*).
+    Возвращает (пароль верный, новый хэш или None).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# ---------------- ПУЛ ДЛЯ ХЭШИРОВАНИЯ ----------------
+def get_hash_pool() -> ThreadPoolExecutor:
+    """
+    Потоки для argon2: один хэш — десятки миллисекунд CPU и памяти, в event loop это останавливает
+    все запросы воркера. argon2-cffi отпускает GIL, поэтому хватает потоков, процессы не нужны.
+    Размер пула (PASSWORD_HASH_CONCURRENCY) ограничивает, сколько хэшей считается одновременно.
+    """
+    global _hash_pool
+    if _hash_pool is None:
+        _hash_pool = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_CONCURRENCY, thread_name_prefix="argon2"
+        )
+    return _hash_pool
+
+
+def _timed(func: Callable[..., Any], submitted: float, *args) -> Any:
+    started = time.perf_counter()
+    waited = started - submitted
+    metrics.inc("password_hash_queue_seconds", waited)
+    metrics.max("password_hash_queue_max_seconds", waited)
+    try:
+        return func(*args)
+    finally:
+        metrics.inc("password_hash_seconds", time.perf_counter() - started)
+
+
+async def _run_in_hash_pool(func: Callable[..., Any], *args) -> Any:
+    """
+    func(*args) в пуле argon2. Очередь ограничена PASSWORD_HASH_MAX_QUEUE: при наплыве входов
+    лишние запросы сразу получают 503, а не ждут, пока очередь разойдётся.
+    """
+    global _pending
+    if _pending >= settings.PASSWORD_HASH_CONCURRENCY + settings.PASSWORD_HASH_MAX_QUEUE:
+        metrics.inc("password_hash_rejected")
+        raise HTTPException(status_code=503, detail="Too many login attempts, try again later", headers={"Retry-After": "1"})
+    _pending += 1
+    metrics.inc("password_hash_calls")
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            get_hash_pool(), functools.partial(_timed, func, time.perf_counter(), *args)
+        )
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    """hash_password без блокировки event loop."""
+    return await _run_in_hash_pool(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password без блокировки event loop."""
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update без блокировки event loop."""
+    verified, new_hash = await _run_in_hash_pool(verify_and_update, plain_password, hashed_password)
+    if new_hash is not None:
+        metrics.inc("password_rehashed")
+    return verified, new_hash
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=True, cancel_futures=True)
+        _hash_pool = None
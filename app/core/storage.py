@@ -0,0 +1,496 @@
+"""
+Хранилище загруженных файлов.
+
+Ключ файла — тот же относительный путь, что хранится в БД ("uploads/news_images/ab/cd/<sha256>.jpg").
+LocalStorage держит файлы в каталоге проекта (как раньше), S3Storage — в бакете S3-совместимого
+хранилища (AWS S3, MinIO), чтобы несколько узлов API могли работать без общей ФС.
+
+Загрузка всегда сначала пишется локально (staging): имя файла — хэш содержимого, и известно оно
+только после записи. Затем put_file переносит файл в хранилище: локально — жёсткой ссылкой,
+в S3 — потоковой multipart-загрузкой частями из этого файла.
+"""
+import asyncio
+import errno
+import mimetypes
+import os
+import shutil
+import stat
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import AsyncContextManager, AsyncIterator, Optional
+
+import anyio
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+
+# ---------------- КОНФИГУРАЦИЯ ----------------
+BASE_DIR = Path(__file__).resolve().parent.parent.parent  # корень проекта
+UPLOAD_ROOT = BASE_DIR / "uploads"
+UPLOAD_ROOT.mkdir(exist_ok=True, parents=True)
+# Файлы форм, записанные напрямую (app.core.direct_upload), и временные файлы загрузок:
+# та же ФС, что и uploads, — перенос в LocalStorage без копирования
+STAGING_ROOT = UPLOAD_ROOT / ".staging"
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+@dataclass
+class StoredObject:
+    size: int
+    mtime: float  # время последнего изменения (или повторной загрузки того же содержимого), unix-время
+    etag: str     # в кавычках, готов для заголовка ETag
+
+
+def kernel_copy(src_fd: int, dst_fd: int, size: int) -> None:
+    """
+    Копирует size байт средствами ядра (copy_file_range: без передачи данных через userspace,
+    на btrfs/xfs — reflink). Если вызов недоступен (другая ФС, старое ядро) — pread/write блоками.
+    """
+    offset = 0
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            while offset < size:
+                copied = copy_file_range(src_fd, dst_fd, size - offset, offset_src=offset, offset_dst=offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                raise
+    while offset < size:
+        block = os.pread(src_fd, min(1024 * 1024, size - offset), offset)
+        if not block:
+            break
+        os.pwrite(dst_fd, block, offset)
+        offset += len(block)
+
+
+def _has_hidden_part(key: str) -> bool:
+    return any(part.startswith(".") for part in PurePosixPath(key).parts)
+
+
+# ---------------- ИНТЕРФЕЙС ----------------
+class StorageBackend(ABC):
+    """Операции, которые нужны загрузкам, отдаче /media, очереди удаления и сборщику мусора."""
+
+    is_local: bool = False
+
+    @abstractmethod
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None) -> bool:
+        """
+        Переносит локальный файл source в хранилище под ключом key; source после вызова удалён.
+        Ключ уже есть (то же содержимое) — ничего не пишет, но обновляет время изменения,
+        чтобы параллельное освобождение старой ссылки файл не удалило. Возвращает True, если файл новый.
+        """
+
+    @abstractmethod
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        """Метаданные файла или None, если его нет."""
+
+    @abstractmethod
+    def open_range(self, key: str, start: int, length: int) -> AsyncIterator[bytes]:
+        """Поток байт [start, start + length) файла."""
+
+    @abstractmethod
+    async def delete_many(self, keys: list[str]) -> dict[str, Optional[Exception]]:
+        """Удаляет файлы (отсутствующие — не ошибка). Для каждого ключа — None или ошибка."""
+
+    @abstractmethod
+    async def list_prefix(self, prefix: str) -> list[str]:
+        """Ключи, начинающиеся с prefix (в пределах одного каталога — для производных изображений)."""
+
+    @abstractmethod
+    async def list_files(self, after: str, limit: int) -> list[tuple[str, float]]:
+        """
+        Следующие limit файлов uploads после ключа after (в порядке, стабильном для этого хранилища):
+        [(ключ, mtime)]. Служебные файлы (компонент пути начинается с точки) пропускаются.
+        """
+
+    @abstractmethod
+    def materialize(self, key: str) -> AsyncContextManager[Path]:
+        """Локальный путь к содержимому файла на время блока (для Pillow в пуле процессов)."""
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Путь на диске, если файлы хранятся локально; иначе None."""
+        return None
+
+    async def close(self) -> None:
+        pass
+
+
+# ---------------- ЛОКАЛЬНАЯ ФС ----------------
+def _link_into_place(source: Path, destination: Path) -> bool:
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        try:
+            # link, а не rename: атомарно и никогда не перезаписывает существующий файл
+            os.link(source, destination)
+        except FileExistsError:
+            os.utime(destination)
+            return False
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            tmp_path = destination.with_name(f".upload-{uuid.uuid4().hex}.tmp")
+            src_fd = os.open(source, os.O_RDONLY)
+            try:
+                dst_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                try:
+                    kernel_copy(src_fd, dst_fd, os.fstat(src_fd).st_size)
+                finally:
+                    os.close(dst_fd)
+            finally:
+                os.close(src_fd)
+            try:
+                os.link(tmp_path, destination)
+            except FileExistsError:
+                os.utime(destination)
+                return False
+            finally:
+                tmp_path.unlink(missing_ok=True)
+        return True
+    finally:
+        source.unlink(missing_ok=True)
+
+
+def _key(path: str) -> tuple[str, ...]:
+    # сравнение по компонентам пути совпадает с порядком обхода (имена сортируются в каждом каталоге)
+    return tuple(path.split("/"))
+
+
+def _scan(directory: Path, rel: str, after: tuple[str, ...], limit: int, found: list) -> None:
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if not entry.name.startswith(".")),  # .staging, *.tmp
+        key=lambda entry: entry.name,
+    )
+    for entry in entries:
+        if len(found) >= limit:
+            return
+        path = f"{rel}/{entry.name}"
+        key = _key(path)
+        if entry.is_dir(follow_symlinks=False):
+            if key < after[:len(key)]:
+                continue  # поддерево целиком до курсора
+            _scan(Path(entry.path), path, after, limit, found)
+        elif entry.is_file(follow_symlinks=False) and key > after:
+            found.append((path, entry.stat(follow_symlinks=False).st_mtime))
+
+
+class LocalStorage(StorageBackend):
+    """Файлы в каталоге проекта; отдача — sendfile или nginx (X-Accel-Redirect)."""
+
+    is_local = True
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def local_path(self, key: str) -> Path:
+        return self.root / key
+
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None) -> bool:
+        return await run_in_threadpool(_link_into_place, source, self.local_path(key))
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        try:
+            st = await run_in_threadpool(os.stat, self.local_path(key))
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+        return StoredObject(st.st_size, st.st_mtime, f'"{st.st_size:x}-{st.st_mtime_ns:x}"')
+
+    async def open_range(self, key: str, start: int, length: int) -> AsyncIterator[bytes]:
+        remaining = length
+        async with await anyio.open_file(self.local_path(key), "rb") as file:
+            await file.seek(start)
+            while remaining > 0:
+                chunk = await file.read(min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    async def delete_many(self, keys: list[str]) -> dict[str, Optional[Exception]]:
+        def unlink_all() -> dict[str, Optional[Exception]]:
+            results: dict[str, Optional[Exception]] = {}
+            for key in keys:
+                try:
+                    self.local_path(key).unlink(missing_ok=True)
+                    results[key] = None
+                except OSError as e:
+                    results[key] = e
+            return results
+
+        return await run_in_threadpool(unlink_all) if keys else {}
+
+    async def list_prefix(self, prefix: str) -> list[str]:
+        directory, _, name = prefix.rpartition("/")
+
+        def scan() -> list[str]:
+            try:
+                return [
+                    f"{directory}/{entry.name}"
+                    for entry in os.scandir(self.root / directory)
+                    if entry.name.startswith(name) and entry.is_file(follow_symlinks=False)
+                ]
+            except (FileNotFoundError, NotADirectoryError):
+                return []
+
+        return await run_in_threadpool(scan)
+
+    async def list_files(self, after: str, limit: int) -> list[tuple[str, float]]:
+        def scan() -> list[tuple[str, float]]:
+            found: list[tuple[str, float]] = []
+            rel = str(UPLOAD_ROOT.relative_to(self.root))
+            _scan(UPLOAD_ROOT, rel, _key(after) if after else (), limit, found)
+            return found
+
+        return await run_in_threadpool(scan)
+
+    @asynccontextmanager
+    async def materialize(self, key: str) -> AsyncIterator[Path]:
+        yield self.local_path(key)
+
+
+# ---------------- S3 ----------------
+def _error_code(error: Exception) -> Optional[str]:
+    return (getattr(error, "response", None) or {}).get("Error", {}).get("Code")
+
+
+def _read_block(path: Path, offset: int, size: int) -> bytes:
+    with open(path, "rb") as file:
+        return os.pread(file.fileno(), size, offset)
+
+
+class S3Storage(StorageBackend):
+    """
+    Бакет S3-совместимого хранилища через aiobotocore: один клиент на процесс с пулом
+    HTTP-соединений (S3_MAX_POOL_CONNECTIONS). Файлы больше S3_MULTIPART_CHUNK_MB уходят
+    multipart-загрузкой: части читаются из локального файла и отправляются параллельно
+    (не больше S3_MULTIPART_CONCURRENCY частей в памяти одновременно).
+    Для MinIO достаточно указать S3_ENDPOINT_URL — включается адресация path-style.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str],
+        region: str,
+        access_key_id: Optional[str],
+        secret_access_key: Optional[str],
+        part_size: int,
+        part_concurrency: int,
+        max_pool_connections: int,
+    ):
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url
+        self.region = region
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.part_size = part_size
+        self.part_concurrency = part_concurrency
+        self.max_pool_connections = max_pool_connections
+        self._client = None
+        self._exit_stack: Optional[AsyncExitStack] = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self._client is not None:
+            return self._client
+        async with self._lock:
+            if self._client is None:
+                try:
+                    from aiobotocore.config import AioConfig
+                    from aiobotocore.session import get_session
+                except ImportError:
+                    raise RuntimeError("STORAGE_BACKEND=s3 требует пакет aiobotocore")
+                config = AioConfig(
+                    max_pool_connections=self.max_pool_connections,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                    s3={"addressing_style": "path"} if self.endpoint_url else None,
+                )
+                stack = AsyncExitStack()
+                self._client = await stack.enter_async_context(get_session().create_client(
+                    "s3",
+                    region_name=self.region,
+                    endpoint_url=self.endpoint_url,
+                    aws_access_key_id=self.access_key_id,
+                    aws_secret_access_key=self.secret_access_key,
+                    config=config,
+                ))
+                self._exit_stack = stack
+        return self._client
+
+    async def close(self) -> None:
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._client = self._exit_stack = None
+
+    async def put_file(self, source: Path, key: str, content_type: Optional[str] = None) -> bool:
+        content_type = content_type or mimetypes.guess_type(key)[0] or "application/octet-stream"
+        try:
+            client = await self._get_client()
+            if await self.stat(key) is not None:
+                # «touch»: копия объекта в себя обновляет LastModified (grace-период очереди удаления)
+                await client.copy_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    CopySource={"Bucket": self.bucket, "Key": key},
+                    MetadataDirective="REPLACE",
+                    ContentType=content_type,
+                )
+                return False
+            size = (await run_in_threadpool(os.stat, source)).st_size
+            if size <= self.part_size:
+                body = await run_in_threadpool(source.read_bytes)
+                await client.put_object(Bucket=self.bucket, Key=key, Body=body, ContentType=content_type)
+            else:
+                await self._multipart_upload(client, source, key, size, content_type)
+            return True
+        finally:
+            await run_in_threadpool(source.unlink, missing_ok=True)
+
+    async def _multipart_upload(self, client, source: Path, key: str, size: int, content_type: str) -> None:
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(self.part_concurrency)
+
+        async def send_part(number: int, offset: int) -> dict:
+            async with semaphore:
+                body = await run_in_threadpool(_read_block, source, offset, self.part_size)
+                response = await client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body
+                )
+                return {"PartNumber": number, "ETag": response["ETag"]}
+
+        try:
+            # return_exceptions: дожидаемся всех частей, чтобы abort не обогнал ещё идущие загрузки
+            parts = await asyncio.gather(
+                *(send_part(i + 1, offset) for i, offset in enumerate(range(0, size, self.part_size))),
+                return_exceptions=True,
+            )
+            error = next((p for p in parts if isinstance(p, BaseException)), None)
+            if error is not None:
+                raise error
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    async def stat(self, key: str) -> Optional[StoredObject]:
+        client = await self._get_client()
+        try:
+            head = await client.head_object(Bucket=self.bucket, Key=key)
+        except Exception as e:
+            if _error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredObject(head["ContentLength"], head["LastModified"].timestamp(), head["ETag"])
+
+    async def open_range(self, key: str, start: int, length: int) -> AsyncIterator[bytes]:
+        if length <= 0:
+            return
+        client = await self._get_client()
+        response = await client.get_object(
+            Bucket=self.bucket, Key=key, Range=f"bytes={start}-{start + length - 1}"
+        )
+        body = response["Body"]
+        try:
+            async for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    async def delete_many(self, keys: list[str]) -> dict[str, Optional[Exception]]:
+        client = await self._get_client()
+        results: dict[str, Optional[Exception]] = {}
+        for i in range(0, len(keys), 1000):  # лимит DeleteObjects
+            group = keys[i:i + 1000]
+            try:
+                response = await client.delete_objects(
+                    Bucket=self.bucket, Delete={"Objects": [{"Key": key} for key in group], "Quiet": True}
+                )
+            except Exception as e:
+                results.update({key: e for key in group})
+                continue
+            results.update({key: None for key in group})
+            for error in response.get("Errors", []):
+                results[error["Key"]] = OSError(f"{error.get('Code')}: {error.get('Message')}")
+        return results
+
+    async def list_prefix(self, prefix: str) -> list[str]:
+        client = await self._get_client()
+        keys = []
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+        return keys
+
+    async def list_files(self, after: str, limit: int) -> list[tuple[str, float]]:
+        client = await self._get_client()
+        found: list[tuple[str, float]] = []
+        params = {"Bucket": self.bucket, "Prefix": f"{UPLOAD_ROOT.name}/"}
+        if after:
+            params["StartAfter"] = after
+        while len(found) < limit:
+            page = await client.list_objects_v2(MaxKeys=min(1000, limit - len(found)), **params)
+            for item in page.get("Contents", []):
+                if not _has_hidden_part(item["Key"]):
+                    found.append((item["Key"], item["LastModified"].timestamp()))
+            if not page.get("IsTruncated"):
+                break
+            params.pop("StartAfter", None)
+            params["ContinuationToken"] = page["NextContinuationToken"]
+        return found
+
+    @asynccontextmanager
+    async def materialize(self, key: str) -> AsyncIterator[Path]:
+        client = await self._get_client()
+        STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+        directory = Path(await run_in_threadpool(tempfile.mkdtemp, dir=STAGING_ROOT))
+        path = directory / PurePosixPath(key).name
+        try:
+            try:
+                response = await client.get_object(Bucket=self.bucket, Key=key)
+            except Exception as e:
+                if _error_code(e) in ("404", "NoSuchKey", "NotFound"):
+                    raise FileNotFoundError(key)
+                raise
+            body = response["Body"]
+            try:
+                async with await anyio.open_file(path, "wb") as file:
+                    async for chunk in body.iter_chunks(READ_CHUNK_SIZE):
+                        await file.write(chunk)
+            finally:
+                body.close()
+            yield path
+        finally:
+            await run_in_threadpool(shutil.rmtree, directory, True)
+
+
+def _create_storage() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(BASE_DIR)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            part_size=settings.S3_MULTIPART_CHUNK_MB * 1024 * 1024,
+            part_concurrency=settings.S3_MULTIPART_CONCURRENCY,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+        )
+    raise ValueError(f"Неизвестный STORAGE_BACKEND: {settings.STORAGE_BACKEND}")
+
+
+storage = _create_storage()
@@ -0,0 +1,151 @@
+"""
+Сборщик мусора uploads: удаляет файлы, на которые не ссылается ни одна запись.
+
+Обход инкрементальный: хранилище отдаёт файлы по порядку (локально — os.scandir по каталогам
+в порядке имён, поддеревья до курсора не читаются вовсе; в S3 — ListObjectsV2 со StartAfter),
+за один проход — не больше max_files файлов, позиция (путь последнего проверенного файла)
+хранится в maintenance_cursors, и следующий запуск продолжает с неё.
+
+Ссылки проверяются пачкой по полям __file_fields__ моделей: одним UNION ALL по строковым
+колонкам и оператором ?| по JSONB-спискам. Производные изображения (<оригинал>.<w>w.<fmt>)
+и сохранённый исходник (<оригинал>.original.<ext>) живут, пока есть ссылка на оригинал.
+Файлы моложе grace-периода не трогаем: их могла только что сохранить ещё не закоммиченная транзакция.
+"""
+import asyncio
+import time
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import delete, func, select, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, array, insert as pg_insert
+
+from app.core.config import settings
+from app.core.db import AsyncSessionLocal, Base
+from app.core.images import DERIVATIVE_NAME_RE
+from app.core.storage import storage
+from app.models.models import FileDeletion, MaintenanceCursor, StoredFile
+
+CURSOR_NAME = "upload_gc"
+
+
+# ---------------- ПРОИЗВОДНЫЕ ----------------
+def original_path(path: str) -> Optional[str]:
+    """Путь оригинала для производного изображения (или сохранённого исходника), иначе None."""
+    directory, _, name = path.rpartition("/")
+    match = DERIVATIVE_NAME_RE.match(name)
+    return f"{directory}/{match.group(1)}" if match else None
+
+
+# ---------------- ССЫЛКИ ----------------
+def _file_columns():
+    for mapper in Base.registry.mappers:
+        for field in getattr(mapper.class_, "__file_fields__", ()):
+            yield getattr(mapper.class_, field)
+
+
+async def referenced_paths(session, paths: list[str]) -> set[str]:
+    """Какие из paths упоминаются в полях __file_fields__ или уже стоят в очереди удаления."""
+    scalar, lists = [], []
+    for column in _file_columns():
+        (lists if isinstance(column.type, (JSONB, ARRAY)) else scalar).append(column)
+
+    found: set[str] = set()
+    queries = [select(column.label("path")).where(column.in_(paths)) for column in scalar]
+    queries.append(select(FileDeletion.path.label("path")).where(FileDeletion.path.in_(paths)))
+    found.update((await session.execute(union_all(*queries))).scalars())
+
+    wanted = set(paths)
+    for column in lists:
+        result = await session.execute(select(column).where(column.op("?|")(array(paths))))
+        for values in result.scalars():
+            found.update(wanted.intersection(values or ()))
+    return found
+
+
+# ---------------- КУРСОР ----------------
+async def _load_cursor(session) -> str:
+    cursor = await session.get(MaintenanceCursor, CURSOR_NAME)
+    return cursor.value if cursor else ""
+
+
+async def _save_cursor(session, value: str) -> None:
+    stmt = pg_insert(MaintenanceCursor).values(name=CURSOR_NAME, value=value)
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=[MaintenanceCursor.name], set_={"value": stmt.excluded.value, "updated_at": func.now()}
+    ))
+    await session.commit()
+
+
+# ---------------- СБОРКА ----------------
+async def collect_orphaned_uploads(
+    *,
+    dry_run: bool = False,
+    batch_size: int = 500,
+    max_files: int = 10_000,
+    grace_seconds: Optional[float] = None,
+    max_deletes_per_second: Optional[float] = None,
+    reset: bool = False,
+    log=print,
+) -> Counter:
+    """
+    Один инкрементальный проход. Возвращает счётчики: scanned, orphaned, deleted, skipped_recent,
+    completed (1, если обход дошёл до конца и курсор сброшен). В dry-run ничего не удаляет и курсор не двигает.
+    """
+    grace_seconds = settings.UPLOAD_GC_GRACE_HOURS * 3600 if grace_seconds is None else grace_seconds
+    stats: Counter = Counter()
+
+    async with AsyncSessionLocal() as session:
+        cursor = "" if reset else await _load_cursor(session)
+        while stats["scanned"] < max_files:
+            batch = await storage.list_files(cursor, min(batch_size, max_files - stats["scanned"]))
+            if not batch:
+                cursor = ""
+                stats["completed"] = 1
+                break
+            cursor = batch[-1][0]
+            stats["scanned"] += len(batch)
+
+            threshold = time.time() - grace_seconds
+            candidates = []
+            for path, mtime in batch:
+                if mtime > threshold:
+                    stats["skipped_recent"] += 1
+                else:
+                    candidates.append(path)
+            if candidates:
+                owners = {path: original_path(path) or path for path in candidates}
+                referenced = await referenced_paths(session, sorted(set(owners.values())))
+                orphans = [path for path in candidates if owners[path] not in referenced]
+                stats["orphaned"] += len(orphans)
+                await _remove(session, orphans, dry_run, max_deletes_per_second, stats, log)
+
+            if not dry_run:
+                await _save_cursor(session, cursor)
+
+        if not dry_run and stats["completed"]:
+            await _save_cursor(session, cursor)
+    return stats
+
+
+async def _remove(session, orphans: list[str], dry_run: bool, rate: Optional[float], stats: Counter, log) -> None:
+    if not orphans:
+        return
+    if dry_run:
+        for path in orphans:
+            log(f"[dry-run] {path}")
+        return
+    # записи ни одна строка не упоминает — счётчик разошёлся с данными, запись больше не нужна
+    await session.execute(delete(StoredFile).where(StoredFile.path.in_(orphans)))
+    await session.commit()
+    step = max(1, int(rate)) if rate else len(orphans)
+    for i in range(0, len(orphans), step):
+        group = orphans[i:i + step]
+        for path, error in (await storage.delete_many(group)).items():
+            if error is None:
+                stats["deleted"] += 1
+                log(f"удалён {path}")
+            else:
+                stats["failed"] += 1
+                log(f"[Warning] Не удалось удалить {path}: {error}")
+        if rate:
+            await asyncio.sleep(len(group) / rate)
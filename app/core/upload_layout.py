@@ -0,0 +1,241 @@
+"""
+Перенос старых файлов в шардированную раскладку uploads/<sub_dir>/ab/cd/<sha256>.<ext>.
+
+Новые загрузки сразу сохраняются так (app.core.uploads.content_addressed_key); файлы, загруженные
+раньше, лежат плоско (uploads/applications/1700000000.pdf) — каталог с сотнями тысяч записей
+медленно читается, копируется и листается. Перенос онлайн и возобновляемый:
+
+- строки каждой модели с __file_fields__ обходятся пачками по первичному ключу (FOR UPDATE),
+  позиция хранится в maintenance_cursors — прерванный запуск продолжает с неё;
+- файл и его производные изображения копируются под новое имя (локально — жёсткой ссылкой),
+  затем в той же транзакции переписываются путь, метаданные (*_meta) и добавляется
+  перенаправление в upload_redirects;
+- старый путь теряет ссылку, и очередь удаления (app.core.file_deletions) убирает его после commit;
+  если транзакция откатилась, скопированные файлы удаляются (app.core.file_refs).
+
+/media по старому пути отвечает 308 на новый (find_redirect), так что ссылки, сохранённые
+клиентами во время и после переноса, продолжают работать.
+"""
+import hashlib
+import mimetypes
+import os
+import shutil
+import uuid
+from collections import Counter
+from pathlib import Path, PurePosixPath
+from typing import Any, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from starlette.concurrency import run_in_threadpool
+
+from app.core import file_refs  # noqa: F401 — счётчик ссылок и откат скопированных файлов
+from app.core.db import AsyncSessionLocal, Base
+from app.core.storage import STAGING_ROOT, UPLOAD_ROOT, storage
+from app.core.upload_gc import original_path
+from app.core.uploads import content_addressed_key, list_derivatives, sha256_from_path, track_uncommitted_files
+from app.models.models import MaintenanceCursor, UploadRedirect
+
+CURSOR_PREFIX = "upload_layout:"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+# ---------------- РАСКЛАДКА ----------------
+def _sub_dir(path: str) -> Optional[str]:
+    parts = PurePosixPath(path).parts
+    return parts[1] if len(parts) >= 3 and parts[0] == UPLOAD_ROOT.name else None
+
+
+def _is_sharded(path: str) -> bool:
+    """Путь уже в виде uploads/<sub_dir>/ab/cd/<sha256>.<ext>."""
+    sub_dir, digest = _sub_dir(path), sha256_from_path(path)
+    if sub_dir is None or digest is None:
+        return False
+    return content_addressed_key(sub_dir, digest, PurePosixPath(path).name[64:]) == path
+
+
+def _rewrite(value: Any, moved: dict[str, str]) -> Any:
+    """Заменяет перенесённые пути (и пути их производных) в строках и ключах JSON-метаданных."""
+    if isinstance(value, str):
+        owner = value if value in moved else original_path(value)
+        if owner in moved:
+            return moved[owner] + value[len(owner):]
+        return value
+    if isinstance(value, list):
+        return [_rewrite(item, moved) for item in value]
+    if isinstance(value, dict):
+        return {_rewrite(key, moved): _rewrite(item, moved) for key, item in value.items()}
+    return value
+
+
+# ---------------- ФАЙЛЫ ----------------
+def _sha256_of(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def _stage_copy(source: Path, suffix: str) -> Path:
+    """Копия файла в staging для storage.put_file (тот забирает исходник): жёсткая ссылка, если можно."""
+    STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+    staged = STAGING_ROOT / f"{uuid.uuid4().hex}{suffix}.tmp"
+    try:
+        os.link(source, staged)
+    except OSError:
+        shutil.copyfile(source, staged)
+    return staged
+
+
+async def _copy_object(old_key: str, new_key: Optional[str], created: dict[str, float]) -> str:
+    """
+    Копирует файл хранилища под новым ключом (new_key=None — ключ по sha256 содержимого).
+    Возвращает новый ключ; созданные файлы записываются в created для отката.
+    """
+    async with storage.materialize(old_key) as path:
+        if new_key is None:
+            ext = (PurePosixPath(old_key).suffix or ".dat").lower()
+            new_key = content_addressed_key(_sub_dir(old_key), await run_in_threadpool(_sha256_of, path), ext)
+        staged = await run_in_threadpool(_stage_copy, path, PurePosixPath(new_key).suffix)
+        content_type, _ = mimetypes.guess_type(new_key)
+        if await storage.put_file(staged, new_key, content_type):
+            stored = await storage.stat(new_key)
+            if stored is not None:
+                created[new_key] = stored.mtime
+    return new_key
+
+
+async def move_to_sharded(old_key: str, created: dict[str, float]) -> Optional[str]:
+    """Копия старого файла (с производными) в шардированную раскладку; файла нет — None."""
+    if await storage.stat(old_key) is None:
+        return None
+    new_key = await _copy_object(old_key, None, created)
+    for derivative in await list_derivatives(old_key):
+        await _copy_object(derivative, new_key + derivative[len(old_key):], created)
+    return new_key
+
+
+# ---------------- ПЕРЕНОС ----------------
+def _file_fields():
+    for mapper in Base.registry.mappers:
+        for field in getattr(mapper.class_, "__file_fields__", ()):
+            yield mapper.class_, field
+
+
+def _meta_field(cls, field: str) -> Optional[str]:
+    """Колонка метаданных к полю с путём: image_path -> image_meta, gallery -> gallery_meta."""
+    name = f"{field.removesuffix('_path')}_meta"
+    return name if name in cls.__table__.columns else None
+
+
+async def _load_cursor(session, name: str) -> int:
+    cursor = await session.get(MaintenanceCursor, name)
+    return int(cursor.value) if cursor and cursor.value else 0
+
+
+async def _migrate_field(cls, field: str, *, batch_size: int, max_rows: int, dry_run: bool, reset: bool, log) -> Counter:
+    stats: Counter = Counter()
+    cursor_name = f"{CURSOR_PREFIX}{cls.__tablename__}.{field}"
+    pk = cls.__mapper__.primary_key[0]
+    meta_field = _meta_field(cls, field)
+    moved: dict[str, str] = {}
+
+    async with AsyncSessionLocal() as session:
+        last_id = 0 if reset else await _load_cursor(session, cursor_name)
+        while stats["rows"] < max_rows:
+            rows = (await session.execute(
+                select(cls).where(pk > last_id).order_by(pk).limit(batch_size).with_for_update()
+            )).scalars().all()
+            if not rows:
+                stats["completed"] = 1
+                break
+            last_id = getattr(rows[-1], pk.key)
+            stats["rows"] += len(rows)
+
+            created: dict[str, float] = {}
+            redirects: dict[str, str] = {}
+            for row in rows:
+                value = getattr(row, field)
+                paths = value if isinstance(value, list) else [value]
+                for old in paths:
+                    if not old or old in moved or _is_sharded(old) or _sub_dir(old) is None:
+                        continue
+                    if dry_run:
+                        log(f"[dry-run] {old}")
+                        stats["files"] += 1
+                        continue
+                    new = await move_to_sharded(old, created)
+                    if new is None:
+                        stats["missing"] += 1
+                        log(f"[Warning] Нет файла {old}, путь оставлен как есть")
+                        continue
+                    moved[old] = redirects[old] = new
+                    stats["files"] += 1
+                    log(f"{old} -> {new}")
+                if dry_run:
+                    continue
+                new_value = _rewrite(value, moved)
+                if new_value != value:
+                    setattr(row, field, new_value)
+                    if meta_field:
+                        setattr(row, meta_field, _rewrite(getattr(row, meta_field), moved))
+                    stats["updated"] += 1
+
+            if dry_run:
+                await session.rollback()
+                continue
+            if redirects:
+                await session.execute(
+                    pg_insert(UploadRedirect)
+                    .values([{"old_path": old, "new_path": new} for old, new in redirects.items()])
+                    .on_conflict_do_nothing(index_elements=[UploadRedirect.old_path])
+                )
+            stmt = pg_insert(MaintenanceCursor).values(name=cursor_name, value=str(last_id))
+            await session.execute(stmt.on_conflict_do_update(
+                index_elements=[MaintenanceCursor.name], set_={"value": stmt.excluded.value, "updated_at": func.now()}
+            ))
+            track_uncommitted_files(session, created)
+            await session.commit()  # пачка — одна короткая транзакция; старые пути уходят в очередь удаления
+    return stats
+
+
+async def migrate_upload_layout(
+    *,
+    batch_size: int = 100,
+    max_rows: int = 10_000,
+    dry_run: bool = False,
+    reset: bool = False,
+    log=print,
+) -> Counter:
+    """
+    Один проход переноса по всем полям __file_fields__ (не больше max_rows строк на поле).
+    Счётчики: rows, files, updated, missing, fields, completed (сколько полей дошло до конца).
+    """
+    total: Counter = Counter()
+    for cls, field in _file_fields():
+        stats = await _migrate_field(
+            cls, field, batch_size=batch_size, max_rows=max_rows, dry_run=dry_run, reset=reset, log=log
+        )
+        log(f"{cls.__tablename__}.{field}: строк {stats['rows']}, файлов {stats['files']}, "
+            f"обновлено {stats['updated']}{', готово' if stats['completed'] else ''}")
+        total.update(stats)
+        total["fields"] += 1
+    return total
+
+
+# ---------------- ПЕРЕНАПРАВЛЕНИЯ ----------------
+async def find_redirect(key: str) -> Optional[str]:
+    """Новый путь для перенесённого файла или его производной; None — перенаправления нет."""
+    owner = original_path(key)
+    candidates = [key] if owner is None else [key, owner]
+    async with AsyncSessionLocal() as session:
+        found = dict((await session.execute(
+            select(UploadRedirect.old_path, UploadRedirect.new_path).where(UploadRedirect.old_path.in_(candidates))
+        )).all())
+    if key in found:
+        return found[key]
+    if owner in found:
+        return found[owner] + key[len(owner):]
+    return None
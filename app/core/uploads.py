@@ -1,12 +1,34 @@
-import time
+import os
+import re
+import uuid
+import asyncio
+import logging
+import hashlib
 import mimetypes
-from pathlib import Path
+from pathlib import Path, PurePosixPath
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 import aiofiles
-from typing import Optional
+from typing import Awaitable, Callable, Optional, TypeVar
 from pydantic import BaseModel
 
+from app.core.config import settings
+from app.core.storage import STAGING_ROOT, UPLOAD_ROOT, kernel_copy, storage
+from app.core.images import (
+    IMAGE_DERIVATIVE_WIDTHS,
+    IMAGE_DERIVATIVE_FORMATS,
+    IMAGE_OPTIMIZATION_POLICIES,
+    is_derivative_of,
+    optimize_image,
+    original_copy_name,
+    process_image,
+)
+from app.core.metrics import metrics
+from app.core.workers import run_in_process
+
+logger = logging.getLogger(__name__)
+
 UPLOAD_PATH_MAP = {
     "logos": "logo_path",
     "company_logos": "logo_path",
@@ -15,29 +37,172 @@ UPLOAD_PATH_MAP = {
 }
 
 # ---------------- КОНФИГУРАЦИЯ ----------------
-BASE_DIR = Path(__file__).resolve().parent.parent.parent  # корень проекта
-UPLOAD_ROOT = BASE_DIR / "uploads"
-UPLOAD_ROOT.mkdir(exist_ok=True, parents=True)
-
 # MIME-типы и лимиты
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
 ALLOWED_PDF_TYPES = {"application/pdf"}
 IMAGE_MAX_MB = 2
 PDF_MAX_MB = 10
 
+UPLOAD_CHUNK_SIZE = 1024 * 64
+
+_SHA256_NAME_RE = re.compile(r"^([0-9a-f]{64})(\.|$)")
+
+# Сигнатуры содержимого (magic bytes): MIME-тип -> проверка начала файла
+_MAGIC_SIGNATURES = {
+    "image/jpeg": lambda head: head.startswith(b"\xff\xd8\xff"),
+    "image/png": lambda head: head.startswith(b"\x89PNG\r\n\x1a\n"),
+    "image/gif": lambda head: head[:6] in (b"GIF87a", b"GIF89a"),
+    "image/webp": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WEBP",
+    "application/pdf": lambda head: head.startswith(b"%PDF-"),
+}
+
+
 # ---------------- ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ ----------------
-async def _save_file(upload_file: UploadFile, destination: Path) -> None:
-    """Асинхронно сохраняет файл на диск."""
+def sniff_mime_type(head: bytes) -> Optional[str]:
+    """Определяет тип по первым байтам файла; None — формат не из разрешённых."""
+    for mime_type, matches in _MAGIC_SIGNATURES.items():
+        if matches(head):
+            return mime_type
+    return None
+
+
+def _too_large(max_mb: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"Файл слишком большой. Максимум {max_mb} МБ")
+
+
+def _check_signature(head: bytes, declared_type: str) -> None:
+    actual_type = sniff_mime_type(head)
+    if actual_type != declared_type:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Содержимое файла не соответствует расширению "
+                   f"({declared_type}, по содержимому: {actual_type or 'неизвестно'})"
+        )
+
+
+async def _save_file(upload_file: UploadFile, destination: Path, declared_type: str, max_mb: int) -> str:
+    """
+    Потоково сохраняет файл на диск и возвращает sha256 содержимого (считается по ходу записи).
+    Первый блок проверяется по сигнатуре до создания файла; размер считается по мере записи,
+    и запись прерывается, как только превышен лимит.
+    """
+    max_bytes = max_mb * 1024 * 1024
     upload_file.file.seek(0)
+    chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+    _check_signature(chunk, declared_type)
+
+    hasher = hashlib.sha256()
+    written = 0
     async with aiofiles.open(destination, "wb") as buffer:
-        while True:
-            chunk = await upload_file.read(1024 * 64)
-            if not chunk:
-                break
+        while chunk:
+            written += len(chunk)
+            if written > max_bytes:
+                raise _too_large(max_mb)
+            hasher.update(chunk)
             await buffer.write(chunk)
+            chunk = await upload_file.read(UPLOAD_CHUNK_SIZE)
+    return hasher.hexdigest()
+
+
+def _save_from_disk(source, destination: Path, declared_type: str, max_mb: int) -> str:
+    """
+    Сохранение файла, который Starlette уже сбросил во временный файл на диске:
+    одна операция в пуле потоков вместо перехода на каждые 64 КБ. Хэш считается чтением
+    большими блоками (из page cache), а сами данные копирует ядро.
+    """
+    source.flush()
+    src_fd = source.fileno()
+    size = os.fstat(src_fd).st_size
+    if size > max_mb * 1024 * 1024:
+        raise _too_large(max_mb)
+    _check_signature(os.pread(src_fd, 16, 0), declared_type)
+
+    hasher = hashlib.sha256()
+    offset = 0
+    while offset < size:
+        block = os.pread(src_fd, 1024 * 1024, offset)
+        if not block:
+            break
+        hasher.update(block)
+        offset += len(block)
+
+    dst_fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+    try:
+        kernel_copy(src_fd, dst_fd, size)
+    finally:
+        os.close(dst_fd)
+    return hasher.hexdigest()
+
 
-def _validate_file(upload_file: UploadFile, max_mb: int = 2) -> None:
-    """Проверяет MIME-тип и размер файла."""
+class StagedUploadFile(UploadFile):
+    """
+    Файл формы, который при разборе multipart пишется сразу в STAGING_ROOT (на ФС uploads),
+    а не в SpooledTemporaryFile. Попутно считаются sha256, размер и первые байты для
+    проверки сигнатуры, поэтому при сохранении файл не перечитывается, а сразу передаётся
+    хранилищу (локально — жёсткой ссылкой). Запись буферизуется, чтобы не уходить в пул потоков
+    на каждый блок из сети.
+    """
+
+    flush_size = 1024 * 1024
+
+    def __init__(self, filename: Optional[str], headers=None):
+        STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+        self.staged_path = STAGING_ROOT / f"{uuid.uuid4().hex}.part"
+        super().__init__(file=open(self.staged_path, "w+b"), size=0, filename=filename, headers=headers)
+        self.head = b""
+        self._hasher = hashlib.sha256()
+        self._buffer = bytearray()
+
+    @property
+    def sha256(self) -> str:
+        return self._hasher.hexdigest()
+
+    @property
+    def _in_memory(self) -> bool:
+        return False
+
+    async def write(self, data: bytes) -> None:
+        self.size += len(data)
+        self._hasher.update(data)
+        if len(self.head) < 16:
+            self.head += data[:16 - len(self.head)]
+        self._buffer += data
+        if len(self._buffer) >= self.flush_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        if self._buffer:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+            await run_in_threadpool(self.file.write, data)
+
+    async def seek(self, offset: int) -> None:
+        await self._flush()
+        await super().seek(offset)
+
+    async def close(self) -> None:
+        await super().close()
+        # не перенесённый в uploads файл (ошибка валидации, исключение) не должен остаться в staging
+        self.staged_path.unlink(missing_ok=True)
+
+
+def content_addressed_key(sub_dir: str, digest: str, ext: str) -> str:
+    """uploads/<sub_dir>/ab/cd/<sha256><ext> — два уровня шардирования, чтобы каталоги не разрастались."""
+    return f"{UPLOAD_ROOT.name}/{sub_dir}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+
+def sha256_from_path(file_url: str) -> Optional[str]:
+    """sha256 из имени файла, сохранённого по содержимому; для старых имён (unix-время) — None."""
+    match = _SHA256_NAME_RE.match(Path(file_url).name)
+    return match.group(1) if match else None
+
+
+def _validate_file(upload_file: UploadFile, max_mb: int = 2) -> str:
+    """
+    Быстрые проверки без чтения файла: тип по расширению и размер, если он уже известен
+    (Starlette считает его при разборе формы). Возвращает заявленный MIME-тип;
+    содержимое проверяется по сигнатуре при записи (_save_file).
+    """
     mime_type, _ = mimetypes.guess_type(upload_file.filename)
     if mime_type not in ALLOWED_IMAGE_TYPES | ALLOWED_PDF_TYPES:
         raise HTTPException(
@@ -45,64 +210,333 @@ def _validate_file(upload_file: UploadFile, max_mb: int = 2) -> None:
             detail=f"Недопустимый формат файла ({mime_type or 'неизвестен'}). "
                    f"Разрешены: {', '.join(ALLOWED_IMAGE_TYPES | ALLOWED_PDF_TYPES)}"
         )
-    upload_file.file.seek(0, 2)
-    size = upload_file.file.tell()
-    upload_file.file.seek(0)
-    if size > max_mb * 1024 * 1024:
-        raise HTTPException(
-            status_code=413,
-            detail=f"Файл слишком большой. Максимум {max_mb} МБ"
-        )
+    size = getattr(upload_file, "size", None)
+    if size is not None and size > max_mb * 1024 * 1024:
+        raise _too_large(max_mb)
+    return mime_type
 
 # ---------------- ОСНОВНЫЕ ФУНКЦИИ ----------------
-async def save_uploaded_file(upload_file: UploadFile, sub_dir: str, max_mb: int = 2) -> str:
-    """Сохраняет один файл и возвращает относительный путь. Имя файла = unix-время + расширение."""
+async def save_uploaded_file(
+    upload_file: UploadFile, sub_dir: str, max_mb: int = 2, db: Optional[AsyncSession] = None
+) -> str:
+    """
+    Сохраняет один файл и возвращает относительный путь. Имя файла = sha256 содержимого + расширение,
+    поэтому одинаковые файлы хранятся один раз, а имя никогда не указывает на другое содержимое.
+    Когда файл можно удалить, решает счётчик ссылок (app.core.file_refs).
+    С db файл становится частью транзакции: если она не закоммитится, новый файл будет удалён.
+    """
+    created: dict[str, float] = {}
+    file_url = await _save_tracked(upload_file, sub_dir, max_mb, created)
+    track_uncommitted_files(db, created)
+    return file_url
+
+
+async def _optimize_staged(path: Path, sub_dir: str, declared_type: str) -> Optional[tuple[Path, str]]:
+    """
+    Оптимизирует изображение в staging по политике подкаталога (IMAGE_OPTIMIZATION_POLICIES) в пуле процессов.
+    Возвращает (оптимизированный файл в staging, его sha256) или None, если файл остаётся как есть.
+    """
+    policy = IMAGE_OPTIMIZATION_POLICIES.get(sub_dir)
+    if not settings.IMAGE_OPTIMIZATION or policy is None or declared_type not in ALLOWED_IMAGE_TYPES:
+        return None
+    quality = policy["quality"] if settings.IMAGE_RECOMPRESS else None
+    target = STAGING_ROOT / f"{uuid.uuid4().hex}.optimized.tmp"
+    try:
+        report = await run_in_process(optimize_image, str(path), str(target), quality, policy["max_side"])
+    except Exception as e:
+        # не удалось разобрать — сохраняем как загрузили, как и до оптимизации
+        target.unlink(missing_ok=True)
+        logger.warning("Не удалось оптимизировать изображение (%s): %s", sub_dir, e)
+        return None
+
+    metrics.inc("image_optimize_files")
+    metrics.inc("image_optimize_bytes_in", report["bytes_before"])
+    metrics.inc("image_optimize_bytes_saved", report["bytes_before"] - report["bytes_after"])
+    if report["recompressed"]:
+        metrics.inc("image_optimize_recompressed")
+    if report["sha256"] is None:
+        return None
+    return target, report["sha256"]
+
+
+async def _save_upload(
+    upload_file: UploadFile, sub_dir: str, max_mb: int, optimize: bool = False
+) -> tuple[str, list[str]]:
+    """
+    save_uploaded_file + ключи, созданные этим вызовом (пусто — файл уже был по хэшу).
+    С optimize изображение до сохранения проходит _optimize_staged; имя — хэш уже оптимизированного
+    содержимого, исходник остаётся рядом (original_copy_name) только при IMAGE_KEEP_ORIGINALS.
+    """
     if not upload_file:
         raise HTTPException(status_code=400, detail="Файл не передан.")
-    _validate_file(upload_file, max_mb=max_mb)
+    declared_type = _validate_file(upload_file, max_mb=max_mb)
 
-    upload_path = UPLOAD_ROOT / sub_dir
-    upload_path.mkdir(parents=True, exist_ok=True)
-
-    file_ext = Path(upload_file.filename).suffix or ".dat"
-    unix_time = int(time.time())
-    unique_filename = f"{unix_time}{file_ext}"
-    file_path = upload_path / unique_filename
+    file_ext = (Path(upload_file.filename).suffix or ".dat").lower()
+    # временный файл в staging: та же ФС, что и uploads, — в LocalStorage переносится жёсткой ссылкой
+    STAGING_ROOT.mkdir(parents=True, exist_ok=True)
+    tmp_path = STAGING_ROOT / f"{uuid.uuid4().hex}{file_ext}.tmp"
+    leftovers = [tmp_path]
+    created: list[str] = []
 
     try:
-        await _save_file(upload_file, file_path)
+        if isinstance(upload_file, StagedUploadFile):
+            # уже на диске и с посчитанным хэшем — проверки без I/O
+            if upload_file.size > max_mb * 1024 * 1024:
+                raise _too_large(max_mb)
+            _check_signature(upload_file.head, declared_type)
+            await upload_file.seek(0)  # дописывает буфер на диск
+            staged, digest = upload_file.staged_path, upload_file.sha256
+        else:
+            if getattr(upload_file.file, "_rolled", False):
+                digest = await run_in_threadpool(
+                    _save_from_disk, upload_file.file, tmp_path, declared_type, max_mb
+                )
+            else:
+                digest = await _save_file(upload_file, tmp_path, declared_type, max_mb)
+            staged = tmp_path
+
+        original = None
+        optimized = await _optimize_staged(staged, sub_dir, declared_type) if optimize else None
+        if optimized is not None:
+            original, (staged, digest) = staged, optimized
+            leftovers.append(staged)
+
+        key = content_addressed_key(sub_dir, digest, file_ext)
+        if await storage.put_file(staged, key, declared_type):
+            created.append(key)
+        if original is not None:
+            if settings.IMAGE_KEEP_ORIGINALS:
+                original_key = original_copy_name(key)
+                if await storage.put_file(original, original_key, declared_type):
+                    created.append(original_key)
+            else:
+                original.unlink(missing_ok=True)
+    except HTTPException:
+        for path in leftovers:
+            path.unlink(missing_ok=True)
+        raise
     except Exception as e:
+        for path in leftovers:
+            path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Ошибка сохранения файла: {e}")
 
-    return str(file_path.relative_to(BASE_DIR))
+    return key, created
+
+
+# ---------------- НЕСКОЛЬКО ФАЙЛОВ ----------------
+T = TypeVar("T")
+
+
+async def _save_tracked(
+    upload_file: UploadFile, sub_dir: str, max_mb: int, created: dict[str, float], optimize: bool = False
+) -> str:
+    file_url, new_keys = await _save_upload(upload_file, sub_dir, max_mb, optimize)
+    for key in new_keys:
+        stored = await storage.stat(key)
+        if stored is not None:
+            created[key] = stored.mtime
+    return file_url
+
+
+async def discard_created_files(created: dict[str, float]) -> None:
+    """
+    Откат: удаляет файлы, созданные пакетом или транзакцией ({путь: mtime при создании}).
+    Файл, у которого изменился mtime, за это время получил то же содержимое из другого
+    запроса (storage.put_file обновляет mtime) — его не трогаем.
+    """
+    for file_url, mtime in created.items():
+        try:
+            stored = await storage.stat(file_url)
+        except Exception:
+            continue
+        if stored is None or stored.mtime != mtime:
+            continue
+        await delete_uploaded_file(file_url)
+
 
+async def _save_all(
+    upload_files: list[UploadFile],
+    save_one: Callable[[UploadFile, dict[str, float]], Awaitable[T]],
+    concurrency: Optional[int],
+    db: Optional[AsyncSession],
+) -> list[T]:
+    """
+    Сохраняет файлы конкурентно, но не больше concurrency одновременно; порядок результатов = порядок файлов.
+    Всё или ничего: при первой ошибке ещё не начатые файлы пропускаются, уже записанные удаляются,
+    а ошибка пробрасывается дальше.
+    """
+    semaphore = asyncio.Semaphore(concurrency or settings.UPLOAD_CONCURRENCY)
+    created: dict[str, float] = {}
+    failed = False
 
-async def save_uploaded_files(upload_files: list[UploadFile], sub_dir: str, max_mb: int = 2) -> list[str]:
-    """Сохраняет массив файлов и возвращает список относительных путей."""
+    async def run(upload_file: UploadFile):
+        nonlocal failed
+        async with semaphore:
+            if failed:
+                return None
+            try:
+                return await save_one(upload_file, created)
+            except BaseException:
+                failed = True
+                raise
+
+    completed = False
+    try:
+        results = await asyncio.gather(*(run(f) for f in upload_files), return_exceptions=True)
+        error = next((r for r in results if isinstance(r, BaseException)), None)
+        if error is not None:
+            raise error
+        completed = True
+        track_uncommitted_files(db, created)
+        return results
+    finally:
+        if not completed:
+            await discard_created_files(created)
+
+
+async def save_uploaded_files(
+    upload_files: list[UploadFile],
+    sub_dir: str,
+    max_mb: int = 2,
+    concurrency: Optional[int] = None,
+    db: Optional[AsyncSession] = None,
+) -> list[str]:
+    """Сохраняет массив файлов параллельно (всё или ничего) и возвращает список относительных путей."""
     if not upload_files:
         return []
-    saved_paths = []
-    for f in upload_files:
-        path = await save_uploaded_file(f, sub_dir, max_mb=max_mb)
-        saved_paths.append(path)
-    return saved_paths
+
+    async def save_one(upload_file: UploadFile, created: dict[str, float]) -> str:
+        return await _save_tracked(upload_file, sub_dir, max_mb, created)
+
+    return await _save_all(upload_files, save_one, concurrency, db)
+
+async def process_uploaded_image(file_url: str, sub_dir: str) -> dict:
+    """
+    Обрабатывает сохранённое изображение в пуле процессов: размеры, формат, размер в байтах,
+    преобладающий цвет, blurhash и производные (уменьшенные копии в webp/avif).
+    Возвращает метаданные для колонки *_meta.
+    """
+    mime_type, _ = mimetypes.guess_type(file_url)
+    if mime_type not in ALLOWED_IMAGE_TYPES:
+        return {}
+
+    widths = IMAGE_DERIVATIVE_WIDTHS.get(sub_dir, [])
+    parent = PurePosixPath(file_url).parent
+    try:
+        # локально производные пишутся рядом с оригиналом; для удалённого хранилища — во временный каталог
+        async with storage.materialize(file_url) as file_path:
+            meta = await run_in_process(process_image, str(file_path), widths, IMAGE_DERIVATIVE_FORMATS)
+            if not storage.is_local:
+                for v in meta["variants"]:
+                    await storage.put_file(file_path.parent / v["name"], str(parent / v["name"]))
+    except Exception as e:
+        # оригинал уже сохранён — без метаданных страница всё равно работает
+        logger.warning("Не удалось обработать изображение %s: %s", file_url, e)
+        return {}
+
+    meta["variants"] = [
+        {"path": str(parent / v["name"]), "width": v["width"], "height": v["height"], "format": v["format"]}
+        for v in meta["variants"]
+    ]
+    return meta
+
+
+async def save_uploaded_image(
+    upload_file: UploadFile, sub_dir: str, max_mb: int = 2, db: Optional[AsyncSession] = None
+) -> tuple[str, dict]:
+    """
+    Сохраняет изображение (без метаданных и, по политике подкаталога, пережатым) и извлекает
+    его метаданные с производными. Возвращает (путь, метаданные).
+    """
+    created: dict[str, float] = {}
+    file_url = await _save_tracked(upload_file, sub_dir, max_mb, created, optimize=True)
+    track_uncommitted_files(db, created)
+    return file_url, await process_uploaded_image(file_url, sub_dir)
+
+
+async def save_uploaded_images(
+    upload_files: list[UploadFile],
+    sub_dir: str,
+    max_mb: int = 2,
+    concurrency: Optional[int] = None,
+    db: Optional[AsyncSession] = None,
+) -> list[tuple[str, dict]]:
+    """
+    Сохраняет массив изображений с производными параллельно (всё или ничего).
+    Возвращает список (путь, метаданные).
+    """
+    if not upload_files:
+        return []
+
+    async def save_one(upload_file: UploadFile, created: dict[str, float]) -> tuple[str, dict]:
+        file_url = await _save_tracked(upload_file, sub_dir, max_mb, created, optimize=True)
+        return file_url, await process_uploaded_image(file_url, sub_dir)
+
+    return await _save_all(upload_files, save_one, concurrency, db)
+
+
+# ---------------- ФАЙЛЫ И ТРАНЗАКЦИЯ ----------------
+# session.info[UNCOMMITTED_FILES_KEY] = {путь: mtime} — файлы, созданные в ещё не закоммиченной
+# транзакции. После commit они остаются на месте (на них уже ссылается БД), после rollback или
+# закрытия сессии без commit удаляются (обработчики событий — в app.core.file_refs).
+UNCOMMITTED_FILES_KEY = "uncommitted_files"
+
+
+def track_uncommitted_files(db: Optional[AsyncSession], created: dict[str, float]) -> None:
+    if db is not None and created:
+        db.info.setdefault(UNCOMMITTED_FILES_KEY, {}).update(created)
+
+
+async def discard_uncommitted_files(db: AsyncSession) -> None:
+    """Удаляет файлы сессии, чья транзакция так и не закоммитилась (вызывается при закрытии сессии)."""
+    created = db.info.pop(UNCOMMITTED_FILES_KEY, None)
+    if created:
+        await discard_created_files(created)
+
+
+async def list_derivatives(file_url: str) -> list[str]:
+    """
+    Пути производных изображений файла (<путь>.<ширина>w.<формат>) и сохранённого исходника
+    (<путь>.original.<расширение>), которые есть в хранилище.
+    """
+    name = PurePosixPath(file_url).name
+    return [key for key in await storage.list_prefix(f"{file_url}.") if is_derivative_of(name, PurePosixPath(key).name)]
+
+
+async def remove_uploaded_files(file_urls: list[str]) -> dict[str, Optional[Exception]]:
+    """
+    Удаляет файлы вместе с производными изображениями одной пачкой через хранилище;
+    отсутствующий файл — не ошибка. Для каждого пути — None или первая ошибка (её обрабатывает
+    вызывающий: очередь удаления повторяет попытку).
+    """
+    owners: dict[str, str] = {}
+    for file_url in filter(None, file_urls):
+        owners[file_url] = file_url
+        for key in await list_derivatives(file_url):
+            owners[key] = file_url
+
+    errors: dict[str, Optional[Exception]] = {file_url: None for file_url in filter(None, file_urls)}
+    for key, error in (await storage.delete_many(list(owners))).items():
+        if error is not None and errors[owners[key]] is None:
+            errors[owners[key]] = error
+    return errors
+
 
 async def delete_uploaded_file(file_url: str) -> None:
-    """Удаляет один файл безопасно."""
+    """Удаляет один файл (вместе с его производными изображениями), не блокируя цикл событий."""
     if not file_url:
         return
-    file_path = BASE_DIR / file_url
-    if file_path.exists() and file_path.is_file():
-        try:
-            file_path.unlink()
-        except Exception as e:
-            print(f"[Warning] Не удалось удалить файл {file_path}: {e}")
+    try:
+        error = (await remove_uploaded_files([file_url]))[file_url]
+    except Exception as e:
+        error = e
+    if error is not None:
+        logger.warning("Не удалось удалить файл %s: %s", file_url, error)
 
 async def replace_uploaded_file(old_file_url: str, new_file: UploadFile | None, sub_dir: str) -> str:
-    """Заменяет старый файл новым, используя unix-время для нового имени."""
+    """Сохраняет новый файл вместо старого. Старый удаляется после commit, если на него больше нет ссылок."""
     if new_file is None:
         return old_file_url
-    await delete_uploaded_file(old_file_url)
     return await save_uploaded_file(new_file, sub_dir)
 
 async def update_entity(
@@ -115,7 +549,7 @@ async def update_entity(
     sub_dir: Optional[str] = None,
     file_field: Optional[str] = None
 ):
-    """Универсальный метод обновления сущностей с поддержкой файлов и unix-времени в имени."""
+    """Универсальный метод обновления сущностей с поддержкой файлов (имя файла — хэш содержимого)."""
     # --- 1. Подготовка данных для обновления ---
     if isinstance(entity_in, BaseModel):
         updated_data = {k: v for k, v in entity_in.model_dump(exclude_unset=True).items() if v is not None}
@@ -140,15 +574,15 @@ async def update_entity(
         if not hasattr(db_entity, old_path_attr):
             raise ValueError(f"Нет соответствия поля модели для sub_dir='{sub_dir}'")
 
-        # Удаляем старый файл, если есть
-        old_file_path = getattr(db_entity, old_path_attr, None)
-        if old_file_path:
-            await delete_uploaded_file(old_file_path)
-
-        # Сохраняем новый файл с Unix-временем
-        new_file_path = await save_uploaded_file(file, sub_dir=sub_dir)
+        # Сохраняем новый файл (для изображений — с производными);
+        # старый удалится после commit, если на него больше нет ссылок
+        new_file_path, new_file_meta = await save_uploaded_image(file, sub_dir=sub_dir, db=db)
         updated_data[old_path_attr] = new_file_path
 
+        meta_attr = old_path_attr.removesuffix("_path") + "_meta"
+        if meta_attr != old_path_attr and hasattr(db_entity, meta_attr):
+            updated_data[meta_attr] = new_file_meta
+
     # --- 4. Обновляем запись ---
     try:
         updated_entity = await crud_update_func(db, entity_id, updated_data)
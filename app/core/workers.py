@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL = "default"
+PDF_POOL = "pdf"  # разбор PDF: сторонние файлы, могут зависнуть — отдельно от изображений
+
+_process_pools: dict[str, ProcessPoolExecutor] = {}
+
+
+# ---------------- ПУЛЫ ПРОЦЕССОВ ----------------
+def _pool_workers(name: str) -> Optional[int]:
+    if name == PDF_POOL:
+        return max(1, settings.PDF_TEXT_WORKERS)
+    return settings.PROCESS_POOL_WORKERS or None  # 0 — по числу CPU
+
+
+def get_process_pool(name: str = DEFAULT_POOL) -> ProcessPoolExecutor:
+    """
+    Пул процессов для CPU-тяжёлой работы: общий (кодирование изображений и т.п.) или отдельный
+    по имени (PDF_POOL). Создаётся лениво и заново, если предыдущий сломался (BrokenProcessPool —
+    процесс-воркер упал) или был остановлен по таймауту. Процессы запускаются через spawn,
+    чтобы не наследовать event loop, потоки и соединения с БД родителя.
+    """
+    pool = _process_pools.get(name)
+    if pool is None or getattr(pool, "_broken", False):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+        pool = ProcessPoolExecutor(
+            max_workers=_pool_workers(name),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        _process_pools[name] = pool
+    return pool
+
+
+def _discard_pool(name: str, pool: ProcessPoolExecutor, kill: bool = False) -> None:
+    """Убирает пул (следующий вызов создаст новый). kill — завершить процессы, например зависший разбор."""
+    if _process_pools.get(name) is pool:
+        del _process_pools[name]
+    if kill:
+        # у ProcessPoolExecutor нет публичного способа прервать выполняющуюся задачу
+        for process in list((getattr(pool, "_processes", None) or {}).values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run(name: str, call: Callable[[], Any], timeout: Optional[float]) -> Any:
+    pool = get_process_pool(name)
+    loop = asyncio.get_running_loop()
+    try:
+        return await asyncio.wait_for(loop.run_in_executor(pool, call), timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Задача в пуле процессов %s дольше %s с, процессы пула завершены", name, timeout)
+        _discard_pool(name, pool, kill=True)
+        raise
+    except BrokenProcessPool:
+        _discard_pool(name, pool)
+        raise
+
+
+async def run_in_process(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Выполняет func(*args, **kwargs) в общем пуле процессов, не блокируя event loop."""
+    return await _run(DEFAULT_POOL, functools.partial(func, *args, **kwargs), None)
+
+
+async def run_in_pool(name: str, func: Callable[..., Any], *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Выполняет func(*args, **kwargs) в отдельном пуле name. Если задача не уложилась в timeout,
+    поднимает asyncio.TimeoutError и завершает процессы пула: прерывать их задачи больше
+    нечем, а остальные задачи этого пула получат BrokenProcessPool.
+    """
+    return await _run(name, functools.partial(func, *args, **kwargs), timeout)
+
+
+def shutdown_process_pool() -> None:
+    """Останавливает все пулы процессов (при завершении приложения)."""
+    while _process_pools:
+        _, pool = _process_pools.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,215 @@
+"""
+ZIP-архив загруженных файлов, который собирается на лету при отдаче.
+
+Файлы кладутся без сжатия (stored): PDF и изображения уже сжаты, повторное сжатие стоило бы
+CPU и почти ничего не давало. Поэтому раскладка архива известна заранее: размер каждого
+заголовка и каждого файла, а значит, и смещение любого байта. Это даёт Content-Length,
+ETag и докачку по Range — нужный кусок архива строится без чтения всего, что до него.
+Временного архива на диске нет; в памяти — только заголовки, сами файлы читаются
+из хранилища кусками.
+
+CRC32 файла должен быть известен до отдачи (он стоит в локальном заголовке, без data descriptor
+архив читают и потоковые распаковщики). Считается один раз и хранится в stored_files.crc32:
+имя файла — хэш содержимого, так что CRC по этому пути не меняется.
+"""
+import asyncio
+import bisect
+import hashlib
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Optional, Union
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.media import build_stream_response
+from app.core.storage import storage
+from app.models.models import StoredFile
+
+_CRC_CHUNK_SIZE = 1024 * 1024
+_CRC_CONCURRENCY = 4
+
+_ZIP64_LIMIT = 0xFFFFFFFF
+_FLAG_UTF8 = 0x0800
+
+
+@dataclass
+class ZipEntry:
+    name: str                      # путь внутри архива
+    key: str                       # ключ файла в хранилище (путь из БД)
+    modified: datetime
+    size: Optional[int] = None
+    crc32: Optional[int] = None
+
+
+# ---------------- РАЗМЕРЫ И CRC ----------------
+def _crc32_of(path) -> int:
+    crc = 0
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(_CRC_CHUNK_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+async def _compute_crc32(key: str) -> int:
+    async with storage.materialize(key) as path:
+        return await run_in_threadpool(_crc32_of, path)
+
+
+async def resolve_entries(db: AsyncSession, entries: list[ZipEntry]) -> list[ZipEntry]:
+    """
+    Заполняет размер и CRC32 из stored_files; чего там нет — берёт из хранилища и дописывает
+    в stored_files (commit). Файлы, которых нет в хранилище, из архива выпадают.
+    """
+    keys = list({entry.key for entry in entries})
+    known = {
+        path: (size, crc)
+        for path, size, crc in await db.execute(
+            select(StoredFile.path, StoredFile.size, StoredFile.crc32).where(StoredFile.path.in_(keys))
+        )
+    }
+    semaphore = asyncio.Semaphore(_CRC_CONCURRENCY)
+    computed: dict[str, int] = {}
+
+    async def resolve(key: str) -> tuple[Optional[int], Optional[int]]:
+        size, crc = known.get(key, (None, None))
+        if size is None:
+            obj = await storage.stat(key)
+            if obj is None:
+                return None, None
+            size = obj.size
+        if crc is None:
+            async with semaphore:
+                crc = computed[key] = await _compute_crc32(key)
+        return size, crc
+
+    resolved = dict(zip(keys, await asyncio.gather(*(resolve(key) for key in keys))))
+    if computed:
+        await db.execute(
+            update(StoredFile.__table__)
+            .where(StoredFile.path == bindparam("b_path"))
+            .values(crc32=bindparam("b_crc32")),
+            [{"b_path": path, "b_crc32": crc} for path, crc in computed.items()],
+        )
+        await db.commit()
+
+    result = []
+    for entry in entries:
+        entry.size, entry.crc32 = resolved[entry.key]
+        if entry.size is not None:
+            result.append(entry)
+    return result
+
+
+# ---------------- РАСКЛАДКА ----------------
+def _dos_datetime(value: datetime) -> tuple[int, int]:
+    if value.year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    time = (value.hour << 11) | (value.minute << 5) | (value.second // 2)
+    date = ((value.year - 1980) << 9) | (value.month << 5) | value.day
+    return time, date
+
+
+def _local_header(entry: ZipEntry, name: bytes) -> bytes:
+    time, date = _dos_datetime(entry.modified)
+    return struct.pack(
+        "<IHHHHHIIIHH", 0x04034B50, 20, _FLAG_UTF8, 0, time, date,
+        entry.crc32, entry.size, entry.size, len(name), 0,
+    ) + name
+
+
+def _central_header(entry: ZipEntry, name: bytes, offset: int) -> bytes:
+    time, date = _dos_datetime(entry.modified)
+    extra = b""
+    version = 20
+    if offset >= _ZIP64_LIMIT:
+        extra = struct.pack("<HHQ", 0x0001, 8, offset)
+        offset = _ZIP64_LIMIT
+        version = 45
+    return struct.pack(
+        "<IHHHHHHIIIHHHHHII", 0x02014B50, version, version, _FLAG_UTF8, 0, time, date,
+        entry.crc32, entry.size, entry.size, len(name), len(extra), 0, 0, 0, 0, offset,
+    ) + name + extra
+
+
+def _end_records(count: int, cd_offset: int, cd_size: int) -> bytes:
+    records = b""
+    if count >= 0xFFFF or cd_offset >= _ZIP64_LIMIT or cd_size >= _ZIP64_LIMIT:
+        zip64_offset = cd_offset + cd_size
+        records += struct.pack(
+            "<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset,
+        )
+        records += struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1)
+        count, cd_offset, cd_size = min(count, 0xFFFF), min(cd_offset, _ZIP64_LIMIT), min(cd_size, _ZIP64_LIMIT)
+    return records + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+
+
+class ZipStream:
+    """
+    Раскладка архива из готовых записей (с размером и CRC32): список сегментов — байты заголовков
+    или ссылка на файл в хранилище — с их смещениями.
+    """
+
+    def __init__(self, entries: list[ZipEntry]):
+        self._offsets: list[int] = []
+        self._segments: list[Union[bytes, ZipEntry]] = []
+        central = []
+        offset = 0
+        for entry in entries:
+            name = entry.name.encode()
+            central.append(_central_header(entry, name, offset))
+            offset = self._add(offset, _local_header(entry, name))
+            offset = self._add(offset, entry)
+        cd_offset = offset
+        for header in central:
+            offset = self._add(offset, header)
+        offset = self._add(offset, _end_records(len(entries), cd_offset, offset - cd_offset))
+        self.size = offset
+
+        fingerprint = hashlib.sha256()
+        for entry in entries:
+            fingerprint.update(f"{entry.name}\0{entry.key}\0{entry.size}\0{entry.crc32}\0{entry.modified}\0".encode())
+        self.etag = f'"zip-{fingerprint.hexdigest()[:32]}"'
+        self.modified = max((entry.modified for entry in entries), default=None)
+
+    def _add(self, offset: int, segment: Union[bytes, ZipEntry]) -> int:
+        self._offsets.append(offset)
+        self._segments.append(segment)
+        return offset + (len(segment) if isinstance(segment, bytes) else segment.size)
+
+    async def iter_range(self, start: int, length: int) -> AsyncIterator[bytes]:
+        """Байты архива [start, start + length): с нужного сегмента, файлы — кусками из хранилища."""
+        end = start + length
+        index = bisect.bisect_right(self._offsets, start) - 1
+        while start < end and index < len(self._segments):
+            segment = self._segments[index]
+            segment_start = self._offsets[index]
+            segment_size = len(segment) if isinstance(segment, bytes) else segment.size
+            relative = start - segment_start
+            take = min(segment_size - relative, end - start)
+            if isinstance(segment, bytes):
+                yield segment[relative:relative + take]
+            else:
+                async for chunk in storage.open_range(segment.key, relative, take):
+                    yield chunk
+            start += take
+            index += 1
+
+
+def build_zip_response(request: Request, archive: ZipStream, filename: str) -> Response:
+    """Скачивание архива: Content-Length, ETag/If-Range и докачка по Range, HEAD."""
+    return build_stream_response(
+        request,
+        filename,
+        archive.etag,
+        archive.modified.timestamp() if archive.modified else 0,
+        archive.size,
+        "private, no-cache",
+        archive.iter_range,
+        extra_headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
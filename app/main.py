@@ -1,16 +1,45 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 import traceback
-from app.routers import company, news, project, about_gallery, partner, contact, application, vacancy, auth
+from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.body_limit import BodySizeLimitMiddleware
+from app.core.workers import shutdown_process_pool
+from app.core.security import shutdown_hash_pool
+from app.core.file_deletions import start_file_deletion_worker, stop_file_deletion_worker
+from app.core.pdf_text import start_pdf_text_worker, stop_pdf_text_worker
+from app.core.storage import storage
+from app.core import file_refs  # noqa: F401 — регистрирует учёт ссылок на загруженные файлы
+from app.routers import company, news, project, about_gallery, partner, contact, application, vacancy, auth, batch, home, media, metrics, resumable
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_file_deletion_worker()
+    start_pdf_text_worker()
+    yield
+    await stop_pdf_text_worker()
+    await stop_file_deletion_worker()
+    await storage.close()
+    shutdown_process_pool()
+    shutdown_hash_pool()
+
 
 app = FastAPI( 
     title = "Oguzabat API",
     version = "0.1.0",
     debug = True,
+    lifespan = lifespan,
 )
 
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.MAX_REQUEST_BODY_MB * 1024 * 1024)
 
 
 @app.exception_handler(Exception)
@@ -31,4 +60,9 @@ app.include_router(partner.router)
 app.include_router(contact.router)
 app.include_router(application.router)
 app.include_router(vacancy.router)
+app.include_router(batch.router)
+app.include_router(home.router)
+app.include_router(media.router)
+app.include_router(resumable.router)
+app.include_router(metrics.router)
 
@@ -1,9 +1,9 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime, Date, func,
-    ForeignKey, Enum as SQLEnum, Boolean
+    Column, Integer, BigInteger, String, Text, DateTime, Date, func,
+    ForeignKey, Enum as SQLEnum, Boolean, Computed, Index, text
 )
-from sqlalchemy.dialects.postgresql import ARRAY, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from app.core.db import Base
 import enum
 
@@ -17,6 +17,8 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_admin = Column(Boolean, default=False)
+    # увеличивается при смене пароля или роли — ранее выданные токены (claim "ver") перестают действовать
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
@@ -38,9 +40,11 @@ class AboutUsGallery(Base):
 
 class AboutUsImage(Base):
     __tablename__ = "about_us_images"
+    __file_fields__ = ("image_path",)  # поля с путями загруженных файлов — для счётчика ссылок (StoredFile)
 
     id = Column(Integer, primary_key=True, index=True)
     image_path = Column(String, nullable=False)
+    image_meta = Column(JSONB, nullable=False, server_default="{}")  # производные изображения (srcset)
 
     gallery_id = Column(Integer, ForeignKey("about_us_gallery.id", ondelete="CASCADE"))
 
@@ -59,24 +63,28 @@ class SortOrder(str, Enum):
 # ---------- News ----------
 class News(Base):
     __tablename__ = "news"
+    __file_fields__ = ("image_path",)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=False)
     short_description = Column(String)
     full_text = Column(Text)
     image_path = Column(String)
+    image_meta = Column(JSONB, nullable=False, server_default="{}")
     date = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
 
 # ---------- Company ----------
 class Company(Base):
     __tablename__ = "company"
+    __file_fields__ = ("logo_path",)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True)
     email = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text)
     logo_path = Column(String, nullable=True)
+    logo_meta = Column(JSONB, nullable=False, server_default="{}")
     website = Column(String, nullable=False)
     categories = Column(ARRAY(String), nullable=False, server_default="{}")
 
@@ -95,6 +103,7 @@ class ProjectStatus(enum.Enum):
 
 class Project(Base):
     __tablename__ = "projects"
+    __file_fields__ = ("gallery",)  # JSONB-список путей
 
     id = Column(Integer, primary_key=True, index=True)
     company_id = Column(Integer, ForeignKey("company.id"), nullable=False)
@@ -108,6 +117,7 @@ class Project(Base):
     short_description = Column(String, nullable=True)
     full_description = Column(String, nullable=True)
     gallery = Column(JSONB, nullable=False, server_default="[]")
+    gallery_meta = Column(JSONB, nullable=False, server_default="{}")  # {путь изображения: метаданные}
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -118,11 +128,13 @@ class Project(Base):
 # ---------- Partner ----------
 class Partner(Base):
     __tablename__ = "partner"
+    __file_fields__ = ("logo_path",)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
     slogan = Column(String, nullable=False)
     logo_path = Column(String, nullable=False)
+    logo_meta = Column(JSONB, nullable=False, server_default="{}")
     short_description = Column(String, nullable=False)
     tags = Column(ARRAY(String), nullable=False, default=[])
     email = Column(String, nullable=False)
@@ -141,6 +153,7 @@ class EmploymentType(enum.Enum):
 
 class Vacancy(Base):
     __tablename__ = "vacancy"
+    __file_fields__ = ("logo_path",)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String, nullable=False)
@@ -148,6 +161,7 @@ class Vacancy(Base):
     location = Column(String, nullable=True)
     employment_type = Column(SQLEnum(EmploymentType), nullable=False, default=EmploymentType.Contract)
     logo_path = Column(String, nullable=True)
+    logo_meta = Column(JSONB, nullable=False, server_default="{}")
 
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -171,18 +185,32 @@ class Application(Base):
 
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
-    files = relationship("ApplicationFile", back_populates="application")
+    files = relationship("ApplicationFile", back_populates="application", cascade="all, delete-orphan")
     vacancy = relationship("Vacancy", back_populates="application")
 
 
 # ---------- ApplicationFile ----------
 class ApplicationFile(Base):
     __tablename__ = "application_files"
+    __file_fields__ = ("file_url",)
+    __table_args__ = (
+        Index("ix_application_files_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_application_files_text_pending", "id", postgresql_where=text("text_status = 'pending'")),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     application_id = Column(Integer, ForeignKey("application.id", ondelete="CASCADE"))
     file_url = Column(String, nullable=False)
 
+    # текст PDF для поиска по откликам; извлекается в фоне (app.core.pdf_text).
+    # Текст и tsvector большие и нужны только поиску — в обычных запросах не загружаются (deferred)
+    text_status = Column(String(16), nullable=False, default="pending", server_default="pending")  # pending/done/failed/skipped
+    text_content = deferred(Column(Text, nullable=True))
+    page_count = Column(Integer, nullable=True)
+    search_vector = deferred(Column(
+        TSVECTOR, Computed("to_tsvector('simple', coalesce(text_content, ''))", persisted=True)
+    ))
+
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
 
     application = relationship("Application", back_populates="files")
@@ -202,3 +230,60 @@ class ContactForm(Base):
     map_code = Column(Text, nullable=True)
 
     created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), default=func.now())
+
+
+# ---------- StoredFile ----------
+class StoredFile(Base):
+    """
+    Счётчик ссылок на загруженный файл. Одинаковое содержимое хранится один раз
+    (имя — sha256), а удаляется с диска, только когда на него не ссылается ни одна запись.
+    Ведётся автоматически по полям __file_fields__ моделей (app.core.file_refs).
+    """
+    __tablename__ = "stored_files"
+
+    path = Column(String, primary_key=True)  # относительно корня проекта: uploads/<sub_dir>/ab/cd/<sha256>.<ext>
+    sha256 = Column(String(64), nullable=True, index=True)  # None для файлов со старыми именами
+    size = Column(BigInteger, nullable=True)
+    crc32 = Column(BigInteger, nullable=True)  # считается при первой упаковке в ZIP (app.core.zipstream)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class FileDeletion(Base):
+    """
+    Очередь удаления файлов с диска (outbox). Строка добавляется в той же транзакции, где счётчик
+    ссылок в stored_files дошёл до нуля; файл удаляет фоновый воркер (app.core.file_deletions).
+    """
+    __tablename__ = "file_deletions"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, nullable=False, unique=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class MaintenanceCursor(Base):
+    """Позиция, с которой продолжает инкрементальная фоновая задача (например, сборщик мусора uploads)."""
+    __tablename__ = "maintenance_cursors"
+
+    name = Column(String, primary_key=True)
+    value = Column(Text, nullable=False, default="", server_default="")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class UploadRedirect(Base):
+    """
+    Старый путь файла -> новый после переноса в шардированную раскладку (app.core.upload_layout).
+    /media по старому адресу перенаправляет на новый, поэтому сохранённые клиентами ссылки не ломаются.
+    """
+    __tablename__ = "upload_redirects"
+
+    old_path = Column(String, primary_key=True)
+    new_path = Column(String, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
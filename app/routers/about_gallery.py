@@ -4,32 +4,41 @@ from typing import List, Optional
 from app.core.db import get_db
 from app.schemas.schemas import AboutUsGalleryRead
 from app.services import about_gallery_service
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
+from app.core.resumable import resumed_uploads
 
 router = APIRouter(
     prefix="/aboutusgallery",
-    tags=["AboutUsGallery"]
+    tags=["AboutUsGallery"],
+    route_class=DirectUploadRoute,
 )
 
 
 @router.get("/", response_model=AboutUsGalleryRead)
-async def read_gallery(db: AsyncSession = Depends(get_db)):
+async def read_gallery(
+    fields: Optional[frozenset] = Depends(SparseFields(AboutUsGalleryRead)),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Получить единственную запись галереи с вложенными изображениями.
     """
-    gallery = await about_gallery_service.get_aboutusgallery(db)
-    return gallery
+    gallery = await about_gallery_service.get_aboutusgallery(db, fields=fields)
+    return sparse_response(gallery, AboutUsGalleryRead, fields)
 
 
 @router.post("/images/", response_model=AboutUsGalleryRead)
 async def upload_gallery_images(
-    files: List[UploadFile] = File(..., description="Выберите изображения для галереи"),
+    files: Optional[List[UploadFile]] = File(None, description="Выберите изображения для галереи"),
+    upload_ids: Optional[List[str]] = Form(None, description="ID завершённых загрузок /uploads/"),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Загрузить несколько изображений в галерею.
+    Загрузить несколько изображений в галерею (файлами формы и/или по ID докачиваемых загрузок).
     """
     try:
-        images = await about_gallery_service.create_aboutusgallery_images(db, files)
+        async with resumed_uploads(upload_ids) as resumed:
+            images = await about_gallery_service.create_aboutusgallery_images(db, (files or []) + resumed)
         # Возвращаем полную запись галереи с новыми изображениями
         gallery = await about_gallery_service.get_aboutusgallery(db)
         return gallery
@@ -48,6 +57,7 @@ async def update_gallery(
     title: Optional[str] = Form(None),
     description: Optional[str] = Form(None),
     files: Optional[List[UploadFile]] = File(None, description="Новые изображения для галереи"),
+    upload_ids: Optional[List[str]] = Form(None, description="ID завершённых загрузок /uploads/"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -61,9 +71,10 @@ async def update_gallery(
 
     try:
         # Передаем новые файлы прямо в update_about_us_gallery
-        gallery = await about_gallery_service.update_about_us_gallery(
-            db, gallery_id, update_data, files=files
-        )
+        async with resumed_uploads(upload_ids) as resumed:
+            gallery = await about_gallery_service.update_about_us_gallery(
+                db, gallery_id, update_data, files=(files or []) + resumed
+            )
         # Возвращаем обновленную галерею с изображениями
         gallery = await about_gallery_service.get_aboutusgallery(db)
         return gallery
@@ -1,16 +1,20 @@
 # app/api/v1/application_router.py
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, Form, Path, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, Form, Path, File, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
-from app.schemas.schemas import ApplicationCreate, ApplicationUpdate, ApplicationRead
+from app.schemas.schemas import ApplicationCreate, ApplicationUpdate, ApplicationRead, ApplicationSearchResult
 from app.services import application_service as application_crud
 from app.core.db import get_db
 from app.core.deps import get_current_admin_user
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
+from app.core.resumable import resumed_uploads
+from app.core.zipstream import build_zip_response
 
-router = APIRouter(prefix="/applications", tags=["Applications"])
+router = APIRouter(prefix="/applications", tags=["Applications"], route_class=DirectUploadRoute)
 
 
 # ---------------- CREATE ----------------
@@ -23,10 +27,13 @@ async def create_application(
     phone_number: str = Form(...),
     message: Optional[str] = Form(None),
     portfolio_files: Optional[List[UploadFile]] = File(None),
+    portfolio_upload_ids: Optional[List[str]] = Form(None, description="ID завершённых загрузок /uploads/"),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Создать отклик на вакансию. Дата создаётся автоматически в БД.
+    Файлы портфолио можно передать в форме или заранее загрузить через /uploads/ (с докачкой)
+    и передать их ID в portfolio_upload_ids.
     """
     application_in = ApplicationCreate(
         vacancy_id=vacancy_id,
@@ -37,11 +44,12 @@ async def create_application(
         message=message,
     )
     try:
-        created = await application_crud.create_application(
-            db=db,
-            application_in=application_in,
-            files=portfolio_files,
-        )
+        async with resumed_uploads(portfolio_upload_ids) as resumed:
+            created = await application_crud.create_application(
+                db=db,
+                application_in=application_in,
+                files=(portfolio_files or []) + resumed,
+            )
         return created
     except IntegrityError:
         raise HTTPException(status_code=400, detail="Invalid or duplicate application data.")
@@ -53,29 +61,69 @@ async def create_application(
 @router.get("/", response_model=List[ApplicationRead])
 async def list_applications(
     vacancy_id: Optional[int] = None,
+    fields: Optional[frozenset] = Depends(SparseFields(ApplicationRead)),
     db: AsyncSession = Depends(get_db),
     admin_user: dict = Depends(get_current_admin_user),
 ):
     """
     Получить список откликов (опционально отфильтрованных по вакансии).
     """
-    return await application_crud.get_applications(db, vacancy_id)
+    applications = await application_crud.get_applications(db, vacancy_id, fields=fields)
+    return sparse_response(applications, ApplicationRead, fields)
+
+
+# ---------------- SEARCH ----------------
+@router.get("/search", response_model=List[ApplicationSearchResult])
+async def search_applications(
+    q: str = Query(..., min_length=2, max_length=200, description='Запрос: python django, "точная фраза", -php'),
+    vacancy_id: Optional[int] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_db),
+    admin_user: dict = Depends(get_current_admin_user),
+):
+    """
+    Поиск откликов по тексту приложенных PDF (резюме), самые релевантные — первыми.
+    Текст извлекается в фоне после отклика, поэтому только что отправленный отклик
+    может появиться в поиске не сразу (files[].text_status).
+    """
+    hits = await application_crud.search_applications(db, q, vacancy_id, limit=limit, offset=offset)
+    return [
+        ApplicationSearchResult.model_validate(app_obj).model_copy(update={"rank": rank, "snippet": snippet})
+        for app_obj, rank, snippet in hits
+    ]
 
 
 # ---------------- READ ONE ----------------
 @router.get("/{application_id}", response_model=ApplicationRead)
 async def get_application(
     application_id: int = Path(..., gt=0, description="ID отклика"),
+    fields: Optional[frozenset] = Depends(SparseFields(ApplicationRead)),
     db: AsyncSession = Depends(get_db),
     admin_user: dict = Depends(get_current_admin_user),
 ):
     """
     Получить отклик по ID.
     """
-    app_obj = await application_crud.get_application(db, application_id)
+    app_obj = await application_crud.get_application(db, application_id, fields=fields)
     if not app_obj:
         raise HTTPException(status_code=404, detail="Application not found")
-    return app_obj
+    return sparse_response(app_obj, ApplicationRead, fields)
+
+
+# ---------------- FILES ZIP ----------------
+@router.api_route("/{application_id}/files.zip", methods=["GET", "HEAD"])
+async def download_application_files(
+    request: Request,
+    application_id: int = Path(..., gt=0, description="ID отклика"),
+    db: AsyncSession = Depends(get_db),
+    admin_user: dict = Depends(get_current_admin_user),
+):
+    """
+    Все файлы отклика одним ZIP (без сжатия, собирается на лету; поддерживает докачку по Range).
+    """
+    archive = await application_crud.get_application_archive(db, application_id)
+    return build_zip_response(request, archive, f"application-{application_id}.zip")
 
 
 # ---------------- UPDATE ----------------
@@ -3,10 +3,9 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.db import get_db
-from app.services.user_service import create_user, get_user_by_username
+from app.services.user_service import authenticate_user, create_user, get_user_by_username
 from app.core.jwt_token import create_access_token
 from app.schemas.schemas import UserRead, Token
-from app.core.security import verify_password
 from app.core.deps import get_current_admin_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -65,15 +64,15 @@ async def login_for_access_token(
     - `access_token` — JWT токен
     - `token_type` — тип токена (`bearer`)
     """
-    user = await get_user_by_username(db, form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await authenticate_user(db, form_data.username, form_data.password)
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    access_token = create_access_token(subject=user.username)
+    access_token = create_access_token(subject=user.username, version=user.token_version)
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Request, HTTPException
+
+from app.schemas.schemas import BatchRequest, BatchResponse, BatchSubResponse
+from app.core.batch import dispatch_batch, BATCH_MAX_REQUESTS
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(batch_in: BatchRequest, request: Request):
+    """
+    Выполняет несколько GET под-запросов за один HTTP-запрос.
+
+    Под-запросы идут конкурентно через то же приложение (авторизация и валидация
+    как у обычных запросов), каждый со своей сессией БД. Ответы возвращаются
+    в порядке запросов.
+    """
+    if not batch_in.requests:
+        raise HTTPException(status_code=400, detail="Список запросов пуст")
+    if len(batch_in.requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(status_code=400, detail=f"Не больше {BATCH_MAX_REQUESTS} под-запросов")
+
+    results = await dispatch_batch(request.scope, [r.path for r in batch_in.requests])
+
+    return BatchResponse(responses=[
+        BatchSubResponse(id=sub.id, path=sub.path, status=status_code, body=body)
+        for sub, (status_code, body) in zip(batch_in.requests, results)
+    ])
@@ -9,10 +9,13 @@ from app.core.deps import get_current_user
 from app.schemas.schemas import CompanyCreate, CompanyUpdate, CompanyRead
 from app.models.models import Company
 from app.services import company_service as crud_company
-from app.core.uploads import save_uploaded_file, update_entity  # универсальный аплоудер
+from app.core.uploads import save_uploaded_image, update_entity  # универсальный аплоудер
+from app.core.batch import parse_ids
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
 
 
-router = APIRouter(prefix="/companies", tags=["Companies"])
+router = APIRouter(prefix="/companies", tags=["Companies"], route_class=DirectUploadRoute)
 
 
 # ---------------- CREATE ----------------
@@ -32,9 +35,9 @@ async def create_company(
     """
     categories_list = [c.strip() for c in categories.split(",") if c.strip()]
 
-    logo_path = None
+    logo_path, logo_meta = None, None
     if logo:
-        logo_path = await save_uploaded_file(logo, sub_dir="company_logos")
+        logo_path, logo_meta = await save_uploaded_image(logo, sub_dir="company_logos", db=db)
 
     company_in = CompanyCreate(
         name=name,
@@ -42,7 +45,8 @@ async def create_company(
         website=website,
         email=email,
         categories=categories_list,
-        logo_path=logo_path
+        logo_path=logo_path,
+        logo_meta=logo_meta,
     )
 
     try:
@@ -95,12 +99,19 @@ async def update_company(
 
 # ---------------- READ LIST ----------------
 @router.get("/", response_model=List[CompanyRead])
-async def list_companies(db: AsyncSession = Depends(get_db)):
+async def list_companies(
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: Optional[frozenset] = Depends(SparseFields(CompanyRead)),
+    db: AsyncSession = Depends(get_db),
+):
     """
     Возвращает список всех компаний.
+    С ?ids=1,2,3 — только указанные компании одним запросом.
+    С ?fields=id,name,logo_path — только указанные поля (и только они читаются из БД).
     """
     try:
-        return await crud_company.get_companies(db)
+        companies = await crud_company.get_companies(db, ids=ids, fields=fields)
+        return sparse_response(companies, CompanyRead, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения списка компаний: {e}")
 
@@ -109,15 +120,16 @@ async def list_companies(db: AsyncSession = Depends(get_db)):
 @router.get("/{company_id}", response_model=CompanyRead)
 async def get_company(
     company_id: int = Path(..., gt=0),
+    fields: Optional[frozenset] = Depends(SparseFields(CompanyRead)),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Возвращает информацию о компании по ID.
     """
-    company = await crud_company.get_company(db, company_id)
+    company = await crud_company.get_company(db, company_id, fields=fields)
     if not company:
         raise HTTPException(status_code=404, detail="Company not found")
-    return company
+    return sparse_response(company, CompanyRead, fields)
 
 
 # ---------------- DELETE ----------------
@@ -8,6 +8,7 @@ from app.core.deps import get_current_admin_user
 from app.models.models import ContactForm
 from app.schemas.schemas import ContactFormCreate, ContactFormUpdate, ContactFormRead
 from app.services import contact_form_service as contact_crud
+from app.core.fields import SparseFields, sparse_response
 
 router = APIRouter(prefix="/contact", tags=["contact"])
 
@@ -47,12 +48,13 @@ async def create_contact_form(
 
 @router.get("/", response_model=List[ContactFormRead])
 async def get_contact_forms(
+    fields: Optional[frozenset] = Depends(SparseFields(ContactFormRead)),
     db: AsyncSession = Depends(get_db),
     admin_user: dict = Depends(get_current_admin_user)
 ):
     try:
-        items = await contact_crud.get_contact_forms(db)
-        return items
+        items = await contact_crud.get_contact_forms(db, fields=fields)
+        return sparse_response(items, ContactFormRead, fields)
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Database error")
     except Exception as e:
@@ -61,14 +63,15 @@ async def get_contact_forms(
 @router.get("/{contact_id}", response_model=ContactFormRead)
 async def get_contact_form(
     contact_id: int = Path(..., gt=0, example=1, description="Contact Form ID"),
+    fields: Optional[frozenset] = Depends(SparseFields(ContactFormRead)),
     db: AsyncSession = Depends(get_db),
     admin_user: dict = Depends(get_current_admin_user)
 ):
     try:
-        contact = await contact_crud.get_contact_form(db, contact_id)
+        contact = await contact_crud.get_contact_form(db, contact_id, fields=fields)
         if not contact:
             raise HTTPException(status_code=404, detail="Contact form not found")
-        return contact
+        return sparse_response(contact, ContactFormRead, fields)
     except HTTPException:
         # Пробрасываем точные HTTPException (например 404) дальше
         raise
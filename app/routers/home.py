@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Request
+
+from app.schemas.schemas import HomeRead
+from app.services import home_service
+
+router = APIRouter(prefix="/home", tags=["Home"])
+
+
+@router.get("/", response_model=HomeRead)
+async def read_home(request: Request):
+    """
+    Данные главной страницы одним запросом: последние новости, партнёры,
+    избранные проекты, галерея «О нас» и количество вакансий.
+    """
+    payload = await home_service.get_home()
+    return payload.response(request)
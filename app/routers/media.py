@@ -0,0 +1,95 @@
+import time
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Request, Path, Query, HTTPException
+from fastapi.responses import RedirectResponse
+
+from app.core.db import AsyncSessionLocal
+from app.core.images import is_original_copy
+from app.core.deps import get_current_admin_user, get_current_user, oauth2_scheme
+from app.core.media import build_media_response, media_key, media_url, signed_media_url, verify_media_signature, MEDIA_PREFIX
+from app.core.resize import build_resized_response
+from app.core.upload_layout import find_redirect
+
+router = APIRouter(prefix=MEDIA_PREFIX, tags=["Media"])
+
+# Каталоги с персональными данными: не отдаются публично
+PRIVATE_MEDIA_DIRS = {"applications"}
+
+
+async def _require_admin(request: Request) -> None:
+    token = await oauth2_scheme(request)
+    async with AsyncSessionLocal() as db:
+        await get_current_admin_user(await get_current_user(token, db))
+
+
+async def _moved_target(relative_path: str, error: HTTPException) -> str:
+    """Новый путь файла, перенесённого в шардированную раскладку; иначе — исходная ошибка."""
+    if error.status_code != 404:
+        raise error
+    target = await find_redirect(media_key(relative_path))
+    if target is None:
+        raise error
+    return target
+
+
+@router.api_route("/applications/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_private_media(
+    request: Request,
+    file_path: str = Path(..., description="Путь внутри uploads/applications"),
+    exp: Optional[int] = Query(None, description="Срок действия подписанной ссылки (unix-время)"),
+    sig: Optional[str] = Query(None, description="Подпись ссылки (download_url из ApplicationRead)"),
+):
+    """
+    Файлы откликов (резюме, портфолио) — только для администратора: по подписанной ссылке
+    (download_url в ответах /applications/, проверяется без БД) или с токеном администратора.
+    Поддерживает Range, поэтому PDF можно смотреть постранично.
+    """
+    relative_path = f"applications/{file_path}"
+    if sig is None:
+        await _require_admin(request)
+        cache_control = "private, no-cache"
+    else:
+        # ссылка уникальна для срока действия — до его конца файл можно держать в кэше браузера
+        cache_control = f"private, max-age={verify_media_signature(relative_path, exp, sig)}"
+    try:
+        return await build_media_response(request, relative_path, cache_control=cache_control)
+    except HTTPException as error:
+        target = await _moved_target(relative_path, error)
+    # доступ уже проверен: новая подпись с тем же оставшимся сроком (или обычным — для администратора)
+    ttl = None
+    if sig is not None:
+        ttl = exp - int(time.time())
+        if ttl <= 0:  # срок истёк, пока искали файл
+            raise HTTPException(status_code=403, detail="Invalid or expired link")
+    return RedirectResponse(signed_media_url(target, ttl), status_code=308)
+
+
+@router.api_route("/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_media(
+    request: Request,
+    file_path: str = Path(..., description="Путь внутри uploads, например news_images/1700000000.jpg"),
+    w: Optional[int] = Query(None, description="Ширина (из MEDIA_RESIZE_WIDTHS)"),
+    h: Optional[int] = Query(None, description="Высота (из MEDIA_RESIZE_HEIGHTS)"),
+    fmt: Optional[Literal["avif", "webp", "jpeg"]] = Query(None, description="Формат; по умолчанию по Accept"),
+):
+    """
+    Отдаёт загруженный файл: ETag/304, Range (206), долгий кэш для имён по хэшу содержимого.
+    С ?w=/?h= — уменьшенная копия изображения (вписывается в рамку, без увеличения)
+    в формате из ?fmt= или лучшем из Accept (AVIF/WebP/JPEG), из дискового кэша.
+    Файлы, перенесённые в шардированную раскладку (scripts/migrate_upload_layout.py),
+    по старому пути отвечают 308 на новый.
+    """
+    # закрытые каталоги проверяются по нормализованному ключу (media_key отвергает "", "." и "..");
+    # сохранённые исходники изображений (IMAGE_KEEP_ORIGINALS) — с метаданными, наружу не отдаются
+    top_dir = media_key(file_path).split("/")[1]
+    if top_dir in PRIVATE_MEDIA_DIRS or is_original_copy(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        if w is not None or h is not None or fmt is not None:
+            return await build_resized_response(request, file_path, w, h, fmt)
+        return await build_media_response(request, file_path)
+    except HTTPException as error:
+        target = await _moved_target(file_path, error)
+    query = f"?{request.url.query}" if request.url.query else ""
+    return RedirectResponse(f"{media_url(target)}{query}", status_code=308)
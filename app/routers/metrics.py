@@ -0,0 +1,14 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from app.core.deps import get_current_admin_user
+from app.core.metrics import metrics
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/", response_model=Dict[str, float])
+async def read_metrics(admin_user=Depends(get_current_admin_user)):
+    """Счётчики текущего воркера (кэши, фоновые задачи и т.п.)."""
+    return metrics.snapshot()
@@ -10,9 +10,12 @@ from app.core.db import get_db
 from app.core.deps import get_current_user
 from app.schemas.schemas import NewsCreate, NewsUpdate, NewsRead
 from app.services import news_service
-from app.core.uploads import save_uploaded_file
+from app.core.uploads import save_uploaded_image
+from app.core.batch import parse_ids
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
 
-router = APIRouter(prefix="/news", tags=["News"])
+router = APIRouter(prefix="/news", tags=["News"], route_class=DirectUploadRoute)
 
 
 # ---------- CREATE ----------
@@ -28,15 +31,16 @@ async def create_news(
     """
     Создать новость. Дата публикации выставляется автоматически.
     """
-    image_path = None
+    image_path, image_meta = None, None
     if file:
-        image_path = await save_uploaded_file(file, "news_images")
+        image_path, image_meta = await save_uploaded_image(file, "news_images", db=db)
 
     news_in = NewsCreate(
         title=title,
         short_description=short_description,
         full_text=full_text,
-        image_path=image_path
+        image_path=image_path,
+        image_meta=image_meta,
     )
 
     try:
@@ -62,7 +66,7 @@ async def update_news(
     """
     image_path = None
     if file:
-        image_path = await save_uploaded_file(file, "news_images")
+        image_path, image_meta = await save_uploaded_image(file, "news_images", db=db)
 
     news_in = NewsUpdate(
         title=title,
@@ -70,6 +74,8 @@ async def update_news(
         full_text=full_text,
         image_path=image_path
     )
+    if file:
+        news_in.image_meta = image_meta
 
     news = await news_service.update_news(db=db, news_id=news_id, news_in=news_in)
     if not news:
@@ -83,13 +89,18 @@ async def update_news(
 async def list_news(
     search: Optional[str] = None,
     sort: str = "date_desc",
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: Optional[frozenset] = Depends(SparseFields(NewsRead)),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Получить список новостей с поиском и сортировкой.
+    С ?ids=1,2,3 — только указанные новости одним запросом.
+    С ?fields=id,title,date — только указанные поля.
     """
     try:
-        return await news_service.get_news_list(db, search=search, sort=sort)
+        news = await news_service.get_news_list(db, search=search, sort=sort, ids=ids, fields=fields)
+        return sparse_response(news, NewsRead, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения списка новостей: {e}")
 
@@ -98,15 +109,16 @@ async def list_news(
 @router.get("/{news_id}", response_model=NewsRead)
 async def get_news(
     news_id: int = Path(..., gt=0),
+    fields: Optional[frozenset] = Depends(SparseFields(NewsRead)),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Получить одну новость по ID.
     """
-    news = await news_service.get_news(db, news_id)
+    news = await news_service.get_news(db, news_id, fields=fields)
     if not news:
         raise HTTPException(status_code=404, detail="News not found")
-    return news
+    return sparse_response(news, NewsRead, fields)
 
 
 # ---------- DELETE ----------
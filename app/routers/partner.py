@@ -9,8 +9,11 @@ from app.models.models import Partner
 from app.schemas.schemas import PartnerCreate, PartnerUpdate, PartnerRead
 from app.services import partner_service as partner_crud
 from app.core.uploads import save_uploaded_file, update_entity  # универсальный аплоудер
+from app.core.batch import parse_ids
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
 
-router = APIRouter(prefix="/partners", tags=["partners"])
+router = APIRouter(prefix="/partners", tags=["partners"], route_class=DirectUploadRoute)
 
 # ---------------- CREATE ----------------
 @router.post("/", response_model=PartnerRead, status_code=status.HTTP_201_CREATED)
@@ -80,20 +83,29 @@ async def update_partner(
 
 # ---------------- GET LIST ----------------
 @router.get("/", response_model=List[PartnerRead])
-async def list_partners(db: AsyncSession = Depends(get_db)):
+async def list_partners(
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: Optional[frozenset] = Depends(SparseFields(PartnerRead)),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        return await partner_crud.get_partners(db)
+        partners = await partner_crud.get_partners(db, ids=ids, fields=fields)
+        return sparse_response(partners, PartnerRead, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка получения списка партнёров: {e}")
 
 
 # ---------------- GET SINGLE ----------------
 @router.get("/{partner_id}", response_model=PartnerRead)
-async def get_partner(partner_id: int = Path(..., gt=0), db: AsyncSession = Depends(get_db)):
-    partner = await partner_crud.get_partner(db, partner_id)
+async def get_partner(
+    partner_id: int = Path(..., gt=0),
+    fields: Optional[frozenset] = Depends(SparseFields(PartnerRead)),
+    db: AsyncSession = Depends(get_db),
+):
+    partner = await partner_crud.get_partner(db, partner_id, fields=fields)
     if not partner:
         raise HTTPException(status_code=404, detail="Partner not found")
-    return partner
+    return sparse_response(partner, PartnerRead, fields)
 
 
 # ---------------- DELETE ----------------
@@ -16,9 +16,13 @@ from app.core.db import get_db
 from app.core.deps import get_current_admin_user
 from app.schemas.schemas import ProjectCreate, ProjectUpdate, ProjectRead, ProjectStatus
 from app.services import project_service
-from app.core.uploads import save_uploaded_file
+from app.core.uploads import save_uploaded_images
+from app.core.batch import parse_ids
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
+from app.core.resumable import resumed_uploads
 
-router = APIRouter(prefix="/projects", tags=["projects"])
+router = APIRouter(prefix="/projects", tags=["projects"], route_class=DirectUploadRoute)
 
 
 # ---------- CREATE ----------
@@ -32,6 +36,7 @@ async def create_project(
     short_description: Optional[str] = Form(None),
     full_description: Optional[str] = Form(None),
     gallery_files: Optional[List[UploadFile]] = File(None),
+    gallery_upload_ids: Optional[List[str]] = Form(None, description="ID завершённых загрузок /uploads/"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_admin_user),
 ):
@@ -40,24 +45,27 @@ async def create_project(
     Дата открытия (`opened_date`) выставляется автоматически в модели.
     """
     gallery_paths: List[str] = []
-
-    # ✅ Асинхронное сохранение файлов (в отличие от вашей версии)
-    if gallery_files:
-        for file in gallery_files:
-            path = await save_uploaded_file(file, "projects")
-            gallery_paths.append(path)
-
-    project_in = ProjectCreate(
-        company_id=company_id,
-        name=name,
-        type=type,
-        location=location,
-        status=status,
-        short_description=short_description,
-        full_description=full_description,
-    )
-
-    project = await project_service.create_project(db, project_in, gallery_paths)
+    gallery_meta: dict = {}
+
+    async with resumed_uploads(gallery_upload_ids) as resumed:
+        # ✅ Асинхронное сохранение файлов (в отличие от вашей версии)
+        gallery_files = (gallery_files or []) + resumed
+        if gallery_files:
+            for path, meta in await save_uploaded_images(gallery_files, "projects", db=db):
+                gallery_paths.append(path)
+                gallery_meta[path] = meta
+
+        project_in = ProjectCreate(
+            company_id=company_id,
+            name=name,
+            type=type,
+            location=location,
+            status=status,
+            short_description=short_description,
+            full_description=full_description,
+        )
+
+        project = await project_service.create_project(db, project_in, gallery_paths, gallery_meta)
     return project
 
 
@@ -65,26 +73,30 @@ async def create_project(
 @router.get("/", response_model=List[ProjectRead])
 async def get_projects(
     company_id: Optional[int] = Query(None, description="ID компании для фильтрации"),
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: Optional[frozenset] = Depends(SparseFields(ProjectRead)),
     db: AsyncSession = Depends(get_db),
 ):
     """
-    Получение всех проектов или фильтрация по company_id.
+    Получение всех проектов или фильтрация по company_id и/или ?ids=1,2,3.
     """
-    return await project_service.get_projects(db, company_id)
+    projects = await project_service.get_projects(db, company_id, ids=ids, fields=fields)
+    return sparse_response(projects, ProjectRead, fields)
 
 
 @router.get("/{project_id}", response_model=ProjectRead)
 async def get_project(
     project_id: int = Path(..., gt=0, description="ID проекта"),
+    fields: Optional[frozenset] = Depends(SparseFields(ProjectRead)),
     db: AsyncSession = Depends(get_db),
 ):
     """
     Получение проекта по ID.
     """
-    project = await project_service.get_project(db, project_id)
+    project = await project_service.get_project(db, project_id, fields=fields)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
-    return project
+    return sparse_response(project, ProjectRead, fields)
 
 
 # ---------- UPDATE ----------
@@ -98,6 +110,7 @@ async def update_project(
     short_description: Optional[str] = Form(None),
     full_description: Optional[str] = Form(None),
     new_gallery_files: Optional[List[UploadFile]] = File(None),
+    new_gallery_upload_ids: Optional[List[str]] = Form(None, description="ID завершённых загрузок /uploads/"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_admin_user),
 ):
@@ -106,25 +119,28 @@ async def update_project(
     Если передана новая галерея, старая будет заменена.
     """
     gallery_paths: Optional[List[str]] = None
-
-    if new_gallery_files:
-        gallery_paths = []
-        for file in new_gallery_files:
-            path = await save_uploaded_file(file, "projects")
-            gallery_paths.append(path)
-
-    project_in = ProjectUpdate(
-        name=name,
-        type=type,
-        location=location,
-        status=status,
-        short_description=short_description,
-        full_description=full_description,
-    )
-
-    updated_project = await project_service.update_project(
-        db, project_id, project_in, gallery_paths
-    )
+    gallery_meta: Optional[dict] = None
+
+    async with resumed_uploads(new_gallery_upload_ids) as resumed:
+        new_gallery_files = (new_gallery_files or []) + resumed
+        if new_gallery_files:
+            gallery_paths, gallery_meta = [], {}
+            for path, meta in await save_uploaded_images(new_gallery_files, "projects", db=db):
+                gallery_paths.append(path)
+                gallery_meta[path] = meta
+
+        project_in = ProjectUpdate(
+            name=name,
+            type=type,
+            location=location,
+            status=status,
+            short_description=short_description,
+            full_description=full_description,
+        )
+
+        updated_project = await project_service.update_project(
+            db, project_id, project_in, gallery_paths, gallery_meta
+        )
     if not updated_project:
         raise HTTPException(status_code=404, detail="Project not found")
 
@@ -0,0 +1,94 @@
+from email.utils import formatdate
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response
+
+from app.core import resumable
+from app.core.config import settings
+
+router = APIRouter(prefix="/uploads", tags=["Uploads"])
+
+
+def _tus_headers(**headers) -> dict:
+    return {"Tus-Resumable": resumable.TUS_VERSION, **headers}
+
+
+def _expires(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+# ---------------- ВОЗМОЖНОСТИ ----------------
+@router.options("/")
+async def upload_options():
+    """Версия протокола, расширения и максимальный размер файла."""
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers(**{
+        "Tus-Version": resumable.TUS_VERSION,
+        "Tus-Extension": "creation,expiration,termination",
+        "Tus-Max-Size": str(settings.RESUMABLE_UPLOAD_MAX_MB * 1024 * 1024),
+    }))
+
+
+# ---------------- CREATE ----------------
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    request: Request,
+    upload_length: int = Header(..., description="Полный размер файла в байтах"),
+    upload_metadata: Optional[str] = Header(None, description='"filename <base64>" — обязательно'),
+):
+    """
+    Создать докачиваемую загрузку. ID из ответа (и из Location) затем передаётся
+    в формы отклика и галерей вместо самого файла.
+    """
+    upload = await resumable.create_upload(upload_length, resumable.parse_upload_metadata(upload_metadata))
+    _, expires_at = await resumable.upload_offset(upload)
+    return JSONResponse(
+        status_code=status.HTTP_201_CREATED,
+        content={"upload_id": upload.id},
+        headers=_tus_headers(**{
+            "Location": str(request.url_for("get_upload_offset", upload_id=upload.id)),
+            "Upload-Expires": _expires(expires_at),
+        }),
+    )
+
+
+# ---------------- OFFSET ----------------
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str):
+    """Сколько байт уже получено — с этого смещения клиент продолжает после обрыва."""
+    upload = await resumable.get_upload(upload_id)
+    offset, expires_at = await resumable.upload_offset(upload)
+    return Response(status_code=status.HTTP_200_OK, headers=_tus_headers(**{
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(upload.length),
+        "Upload-Expires": _expires(expires_at),
+        "Cache-Control": "no-store",
+    }))
+
+
+# ---------------- CHUNK ----------------
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., description="Смещение, с которого начинается эта часть"),
+):
+    """Дописать часть файла (Content-Type: application/offset+octet-stream)."""
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream")
+    upload = await resumable.get_upload(upload_id)
+    offset = await resumable.append_chunk(upload, upload_offset, request.stream())
+    _, expires_at = await resumable.upload_offset(upload)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers(**{
+        "Upload-Offset": str(offset),
+        "Upload-Expires": _expires(expires_at),
+    }))
+
+
+# ---------------- DELETE ----------------
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_upload(upload_id: str):
+    """Отменить загрузку и удалить полученные данные."""
+    upload = await resumable.get_upload(upload_id)
+    await resumable.delete_upload(upload)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_tus_headers())
@@ -6,7 +6,8 @@ from fastapi import (
     Form,
     File,
     UploadFile,
-    Path
+    Path,
+    Request,
 )
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
@@ -23,8 +24,13 @@ from app.services.vacancy_service import (
 from app.core.deps import get_current_admin_user  # если требуется
 from app.core.deps import get_current_user
 from app.schemas.schemas import EmploymentType
+from app.core.batch import parse_ids
+from app.core.fields import SparseFields, sparse_response
+from app.core.direct_upload import DirectUploadRoute
+from app.core.zipstream import build_zip_response
+from app.services.application_service import get_vacancy_archive
 
-router = APIRouter(prefix="/vacancies", tags=["Vacancies"])
+router = APIRouter(prefix="/vacancies", tags=["Vacancies"], route_class=DirectUploadRoute)
 
 
 # --------------------- CREATE ---------------------
@@ -66,14 +72,16 @@ async def create_vacancy_endpoint(
     "/",
     response_model=List[VacancyRead],
     summary="Получить список всех вакансий",
-    description="Возвращает все вакансии без пагинации и фильтрации."
+    description="Возвращает все вакансии без пагинации. С ?ids=1,2,3 — только указанные вакансии одним запросом."
 )
 async def get_all_vacancies(
+    ids: Optional[List[int]] = Depends(parse_ids),
+    fields: Optional[frozenset] = Depends(SparseFields(VacancyRead)),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        vacancies = await get_vacancies(db)
-        return vacancies
+        vacancies = await get_vacancies(db, ids=ids, fields=fields)
+        return sparse_response(vacancies, VacancyRead, fields)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении списка вакансий: {e}")
 
@@ -87,12 +95,31 @@ async def get_all_vacancies(
 )
 async def get_vacancy_by_id(
     vacancy_id: int = Path(..., gt=0, description="ID вакансии"),
+    fields: Optional[frozenset] = Depends(SparseFields(VacancyRead)),
     db: AsyncSession = Depends(get_db)
 ):
-    vacancy = await get_vacancy(db, vacancy_id)
+    vacancy = await get_vacancy(db, vacancy_id, fields=fields)
     if not vacancy:
         raise HTTPException(status_code=404, detail="Vacancy not found")
-    return vacancy
+    return sparse_response(vacancy, VacancyRead, fields)
+
+
+# --------------------- APPLICATIONS ZIP ---------------------
+@router.api_route(
+    "/{vacancy_id}/applications.zip",
+    methods=["GET", "HEAD"],
+    summary="Скачать файлы всех откликов",
+    description="ZIP с файлами всех откликов на вакансию, по папке на отклик. "
+                "Собирается на лету без сжатия, поддерживает докачку по Range. Доступно только администратору."
+)
+async def download_vacancy_applications(
+    request: Request,
+    vacancy_id: int = Path(..., gt=0, description="ID вакансии"),
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_admin_user)
+):
+    archive = await get_vacancy_archive(db, vacancy_id)
+    return build_zip_response(request, archive, f"vacancy-{vacancy_id}-applications.zip")
 
 
 # --------------------- UPDATE ---------------------
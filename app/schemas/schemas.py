@@ -1,8 +1,41 @@
 from __future__ import annotations
-from pydantic import BaseModel, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, computed_field
+from typing import Any, Dict, List, Optional
 from datetime import datetime, date
 from app.models.models import ProjectStatus, EmploymentType
+from app.core.media import media_url, signed_media_url
+
+
+# ---------- Images ----------
+class ImageVariant(BaseModel):
+    path: str
+    width: int
+    height: int
+    format: str
+
+    @computed_field
+    @property
+    def url(self) -> str:
+        return media_url(self.path)
+
+
+class ImageMeta(BaseModel):
+    width: Optional[int] = None
+    height: Optional[int] = None
+    format: Optional[str] = None
+    bytes: Optional[int] = None
+    dominant_color: Optional[str] = None  # "#rrggbb" — фон до загрузки изображения
+    blurhash: Optional[str] = None        # плейсхолдер, https://blurha.sh
+    variants: List[ImageVariant] = []
+
+    @computed_field
+    @property
+    def srcset(self) -> Dict[str, str]:
+        """Готовые значения srcset по форматам: {"webp": "/media/...320w.webp 320w, ..."}."""
+        result: Dict[str, List[str]] = {}
+        for variant in sorted(self.variants, key=lambda v: v.width):
+            result.setdefault(variant.format, []).append(f"{variant.url} {variant.width}w")
+        return {fmt: ", ".join(items) for fmt, items in result.items()}
 
 
 # ---------- XReadMin ----------
@@ -78,6 +111,7 @@ class ProjectRead(ProjectBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
     gallery: List[str] = []
+    gallery_meta: Dict[str, ImageMeta] = {}
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -93,6 +127,7 @@ class NewsBase(BaseModel):
     short_description: Optional[str] = None
     full_text: Optional[str] = None
     image_path: Optional[str] = None
+    image_meta: Optional[Dict[str, Any]] = None
 
 
 class NewsCreate(NewsBase):
@@ -110,6 +145,7 @@ class NewsRead(NewsBase):
     date: datetime  # автоматически из БД
     recommendations: List[NewsRecommendationRead] = []
     image_path: Optional[str] = None
+    image_meta: ImageMeta = ImageMeta()
     model_config = ConfigDict(from_attributes=True)
 
 
@@ -119,6 +155,7 @@ class CompanyBase(BaseModel):
     email: Optional[str] = None
     description: Optional[str] = None
     logo_path: Optional[str] = None
+    logo_meta: Optional[Dict[str, Any]] = None
     website: Optional[str] = None
     categories: List[str] = []
 
@@ -141,10 +178,11 @@ class CompanyRead(CompanyBase):
     name: str
     description: Optional[str] = None
     logo_path: Optional[str] = None
+    logo_meta: ImageMeta = ImageMeta()
     created_at: datetime
     updated_at: Optional[datetime] = None
     vacancies: List[VacancyRead] = []  # <- здесь вакансия с простой ссылкой на компанию
-    projects: Optional[List] = []
+    projects: Optional[List[ProjectRead]] = []
 
 class CompanyReadSimple(BaseModel):
     id: int
@@ -157,6 +195,7 @@ class PartnerBase(BaseModel):
     name: Optional[str] = None
     slogan: Optional[str] = None
     logo_path: Optional[str] = None
+    logo_meta: Optional[Dict[str, Any]] = None
     short_description: Optional[str] = None
     tags: List[str] = []
     email: Optional[str] = None
@@ -176,6 +215,7 @@ class PartnerUpdate(PartnerBase):
 
 class PartnerRead(PartnerBase):
     id: int
+    logo_meta: ImageMeta = ImageMeta()
     created_at: datetime
     updated_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
@@ -207,6 +247,7 @@ class VacancyRead(VacancyBase):
     location: Optional[str] = None
     employment_type: Optional[str] = None
     logo_path: Optional[str] = None
+    logo_meta: ImageMeta = ImageMeta()
     created_at: datetime
     updated_at: Optional[datetime] = None
     company: CompanyReadSimple
@@ -227,9 +268,17 @@ class VacancyReadSimple(BaseModel):
 class ApplicationFileRead(BaseModel):
     id: int
     file_url: str
+    text_status: Optional[str] = None  # разбор PDF для поиска: pending/done/failed/skipped
+    page_count: Optional[int] = None
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def download_url(self) -> Optional[str]:
+        """Подписанная ссылка с ограниченным сроком: скачивание без токена и без запроса в БД."""
+        return signed_media_url(self.file_url)
+
 
 # ---------- Application ----------
 class ApplicationBase(BaseModel):
@@ -267,6 +316,11 @@ class ApplicationRead(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ApplicationSearchResult(ApplicationRead):
+    rank: float = 0.0  # релевантность лучшего файла отклика (ts_rank_cd)
+    snippet: Optional[str] = None  # фрагмент текста с совпадениями: HTML-экранирован, выделены <b>...</b>
+
+
 # ---------- ContactForm ----------
 class ContactFormBase(BaseModel):
     first_name: Optional[str] = None
@@ -306,6 +360,7 @@ class AboutUsImageCreate(AboutUsImageBase):
 
 class AboutUsImageRead(AboutUsImageBase):
     id: int
+    image_meta: ImageMeta = ImageMeta()
     created_at: datetime
 
     class Config:
@@ -334,5 +389,40 @@ class AboutUsGalleryRead(AboutUsGalleryBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+# ---------- Home ----------
+class VacancyCounts(BaseModel):
+    total: int = 0
+    by_employment_type: Dict[str, int] = {}
+
+
+class HomeRead(BaseModel):
+    news: List[NewsRead] = []
+    partners: List[PartnerRead] = []
+    projects: List[ProjectRead] = []
+    gallery: Optional[AboutUsGalleryRead] = None
+    vacancies: VacancyCounts = VacancyCounts()
+
+
+# ---------- Batch ----------
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # произвольный ключ клиента для сопоставления ответа
+    path: str                 # относительный URL, например "/companies/1" или "/projects/?company_id=1"
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest]
+
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    path: str
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
+
+
 CompanyRead.model_rebuild()
 VacancyRead.model_rebuild()
\ No newline at end of file
@@ -7,25 +7,31 @@ from sqlalchemy.orm import selectinload
 
 from app.models.models import AboutUsGallery, AboutUsImage
 from app.schemas.schemas import AboutUsGalleryRead
-from app.core.uploads import save_uploaded_file, delete_uploaded_file, save_uploaded_files
+from app.core.uploads import save_uploaded_images
+from app.core.fields import load_options
 
 GALLERY_SUBDIR = "about_us_gallery"
 MAX_IMAGE_SIZE_MB = 7
 
 # ---------------- CRUD ----------------
-async def get_aboutusgallery(db: AsyncSession) -> AboutUsGallery:
+async def get_aboutusgallery(db: AsyncSession, fields: Optional[set] = None) -> AboutUsGallery:
     """
     Возвращает единственную запись галереи с вложенными изображениями.
     """
-    result = await db.execute(select(AboutUsGallery).options(selectinload(AboutUsGallery.images)))
+    result = await db.execute(
+        select(AboutUsGallery).options(
+            *load_options(AboutUsGallery, fields, default=(selectinload(AboutUsGallery.images),))
+        )
+    )
     gallery = result.scalars().first()
     if not gallery:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="AboutUsGallery not found"
         )
-    # Загрузка изображений
-    await db.refresh(gallery)
+    if not fields:
+        # Загрузка изображений
+        await db.refresh(gallery)
     return gallery
 
 
@@ -42,11 +48,11 @@ async def create_aboutusgallery_images(
     gallery = await get_aboutusgallery(db)
 
     saved_images = []
-    for file in files:
-        path = await save_uploaded_file(file, GALLERY_SUBDIR, max_mb=MAX_IMAGE_SIZE_MB)
+    for path, meta in await save_uploaded_images(files, GALLERY_SUBDIR, max_mb=MAX_IMAGE_SIZE_MB, db=db):
         image = AboutUsImage(
             gallery_id=gallery.id,
-            image_path=path
+            image_path=path,
+            image_meta=meta
         )
         db.add(image)
         saved_images.append(image)
@@ -83,9 +89,9 @@ async def update_about_us_gallery(
     # 3️⃣ Обрабатываем загруженные изображения
     if files:
         try:
-            saved_paths = await save_uploaded_files(files, GALLERY_SUBDIR, max_mb=7)
-            for path in saved_paths:
-                new_image = AboutUsImage(image_path=path, gallery_id=gallery.id)
+            saved_images = await save_uploaded_images(files, GALLERY_SUBDIR, max_mb=7, db=db)
+            for path, meta in saved_images:
+                new_image = AboutUsImage(image_path=path, image_meta=meta, gallery_id=gallery.id)
                 db.add(new_image)
         except HTTPException:
             raise
@@ -107,7 +113,7 @@ async def delete_aboutusgallery_image(
     image_id: int
 ) -> bool:
     """
-    Удаляет изображение из галереи и файл с диска.
+    Удаляет изображение из галереи (файл с диска — после commit, по счётчику ссылок).
     """
     result = await db.execute(select(AboutUsImage).filter(AboutUsImage.id == image_id))
     image = result.scalars().first()
@@ -118,8 +124,7 @@ async def delete_aboutusgallery_image(
         )
 
     try:
-        await delete_uploaded_file(image.image_path)
-        await db.delete(image)
+        await db.delete(image)  # файл удалится после commit, если на него больше нет ссылок
         await db.commit()
     except Exception as e:
         raise HTTPException(
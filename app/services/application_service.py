@@ -1,13 +1,22 @@
+from sqlalchemy import func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, UploadFile
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from datetime import datetime
+from pathlib import PurePosixPath
+import html
+import re
 
 from app.schemas.schemas import ApplicationCreate
-from app.models.models import Application, ApplicationFile
-from app.core.uploads import save_uploaded_file, delete_uploaded_file
+from app.models.models import Application, ApplicationFile, Vacancy
+from app.core.uploads import save_uploaded_files
+from app.core.fields import load_options
+from app.core.pdf_text import HIGHLIGHT_START, HIGHLIGHT_STOP, SEARCH_CONFIG, notify_pdf_text
+from app.core.zipstream import ZipEntry, ZipStream, resolve_entries
+
+_UNSAFE_NAME_RE = re.compile(r'[\\/:*?"<>|\x00-\x1f]+')
 
 
 # ---------------- CREATE ----------------
@@ -26,8 +35,7 @@ async def create_application(
         if files:
             if not isinstance(files, list):
                 files = [files]
-            for file in files:
-                file_url = await save_uploaded_file(file, sub_dir="applications")
+            for file_url in await save_uploaded_files(files, sub_dir="applications", db=db):
                 file_objs.append(ApplicationFile(file_url=file_url))
 
         app_obj = Application(
@@ -37,6 +45,8 @@ async def create_application(
         )
         db.add(app_obj)
         await db.commit()
+        if file_objs:
+            notify_pdf_text()
 
         # Используем selectinload для связанных объектов
         result = await db.execute(
@@ -50,6 +60,10 @@ async def create_application(
         app_obj = result.scalars().first()
         return app_obj
 
+    except HTTPException:
+        # ошибки валидации файлов (400/413) отдаём как есть
+        await db.rollback()
+        raise
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
@@ -58,14 +72,15 @@ async def create_application(
 # ---------------- READ ALL ----------------
 async def get_applications(
     db: AsyncSession,
-    vacancy_id: Optional[int] = None
+    vacancy_id: Optional[int] = None,
+    fields: Optional[set] = None
 ) -> List[Application]:
     stmt = (
         select(Application)
-        .options(
+        .options(*load_options(Application, fields, default=(
             selectinload(Application.files),
             selectinload(Application.vacancy)
-        )
+        )))
         .order_by(Application.created_at.desc())
     )
     if vacancy_id:
@@ -75,18 +90,85 @@ async def get_applications(
     return result.scalars().unique().all()
 
 
+# ---------------- SEARCH ----------------
+def _highlight(headline: str) -> str:
+    """Экранирует фрагмент из PDF (это данные соискателя) и только потом расставляет <b>...</b>."""
+    return html.escape(headline).replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_STOP, "</b>")
+
+
+async def search_applications(
+    db: AsyncSession,
+    query: str,
+    vacancy_id: Optional[int] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Tuple[Application, float, Optional[str]]]:
+    """
+    Поиск откликов по тексту PDF (синтаксис websearch: "python django", -php, "точная фраза").
+    Только по индексу GIN: файлы не читаются. Порядок — по релевантности лучшего файла отклика.
+    Возвращает [(отклик, релевантность, фрагмент с совпадениями)].
+    """
+    ts_query = func.websearch_to_tsquery(SEARCH_CONFIG, query)
+    matches = ApplicationFile.search_vector.op("@@")(ts_query)
+    rank = func.max(func.ts_rank_cd(ApplicationFile.search_vector, ts_query)).label("rank")
+    stmt = (
+        select(Application.id, rank)
+        .join(ApplicationFile, ApplicationFile.application_id == Application.id)
+        .where(matches)
+        .group_by(Application.id)
+        .order_by(rank.desc(), Application.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    if vacancy_id:
+        stmt = stmt.where(Application.vacancy_id == vacancy_id)
+    ranked = (await db.execute(stmt)).all()
+    if not ranked:
+        return []
+    ids = [app_id for app_id, _ in ranked]
+
+    result = await db.execute(
+        select(Application)
+        .where(Application.id.in_(ids))
+        .options(selectinload(Application.files), selectinload(Application.vacancy))
+    )
+    applications = {app_obj.id: app_obj for app_obj in result.scalars()}
+
+    # фрагменты — только для страницы результатов: ts_headline перечитывает текст найденных файлов
+    snippets: dict = {}
+    headlines = await db.execute(
+        select(
+            ApplicationFile.application_id,
+            func.ts_headline(
+                SEARCH_CONFIG,
+                ApplicationFile.text_content,
+                ts_query,
+                f'MaxFragments=2, MaxWords=20, MinWords=5, StartSel="{HIGHLIGHT_START}", StopSel="{HIGHLIGHT_STOP}"',
+            ),
+        )
+        .where(ApplicationFile.application_id.in_(ids), matches)
+        .order_by(ApplicationFile.application_id, func.ts_rank_cd(ApplicationFile.search_vector, ts_query).desc())
+    )
+    for app_id, headline in headlines:
+        if app_id not in snippets and headline is not None:
+            snippets[app_id] = _highlight(headline)
+
+    return [(applications[app_id], score, snippets.get(app_id)) for app_id, score in ranked if app_id in applications]
+
+
 # ---------------- READ ONE ----------------
 async def get_application(
     db: AsyncSession,
-    application_id: int
+    application_id: int,
+    fields: Optional[set] = None
 ) -> Application:
     stmt = (
         select(Application)
         .where(Application.id == application_id)
-        .options(
+        .options(*load_options(Application, fields, default=(
             selectinload(Application.files),
             selectinload(Application.vacancy)
-        )
+        )))
     )
     result = await db.execute(stmt)
     app_obj = result.scalars().first()
@@ -118,12 +200,13 @@ async def update_application(
     if new_files:
         if not isinstance(new_files, list):
             new_files = [new_files]
-        for file in new_files:
-            file_url = await save_uploaded_file(file, sub_dir="applications")
+        for file_url in await save_uploaded_files(new_files, sub_dir="applications", db=db):
             app_obj.files.append(ApplicationFile(file_url=file_url))
 
     try:
         await db.commit()
+        if new_files:
+            notify_pdf_text()
         # Заново загружаем связи
         result = await db.execute(
             select(Application)
@@ -155,10 +238,7 @@ async def delete_application(
     if not app_obj:
         raise HTTPException(status_code=404, detail="Application not found")
 
-    # Удаляем файлы физически
-    for file in app_obj.files:
-        await delete_uploaded_file(file.file_url)
-
+    # файлы удаляются каскадом вместе с записями ApplicationFile и освобождаются по счётчику ссылок
     try:
         await db.delete(app_obj)
         await db.commit()
@@ -167,3 +247,51 @@ async def delete_application(
     except Exception as e:
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Delete failed: {e}")
+
+
+# ---------------- ZIP ----------------
+def _applicant_name(app_obj: Application) -> str:
+    name = _UNSAFE_NAME_RE.sub("_", f"{app_obj.surname}_{app_obj.name}").strip(" ._")
+    return name or "applicant"
+
+
+def _archive_entries(app_obj: Application, folder: str = "") -> List[ZipEntry]:
+    """Файлы отклика в порядке загрузки: <фамилия>_<имя>_01.pdf, ... (имена в архиве не зависят от хэшей)."""
+    prefix = _applicant_name(app_obj)
+    return [
+        ZipEntry(
+            name=f"{folder}{prefix}_{n:02d}{PurePosixPath(file.file_url).suffix}",
+            key=file.file_url,
+            modified=file.created_at,
+        )
+        for n, file in enumerate(sorted(app_obj.files, key=lambda f: f.id), start=1)
+    ]
+
+
+async def get_application_archive(db: AsyncSession, application_id: int) -> ZipStream:
+    """ZIP со всеми файлами отклика."""
+    result = await db.execute(
+        select(Application)
+        .where(Application.id == application_id)
+        .options(selectinload(Application.files))
+    )
+    app_obj = result.scalars().first()
+    if not app_obj:
+        raise HTTPException(status_code=404, detail="Application not found")
+    return ZipStream(await resolve_entries(db, _archive_entries(app_obj)))
+
+
+async def get_vacancy_archive(db: AsyncSession, vacancy_id: int) -> ZipStream:
+    """ZIP с файлами всех откликов на вакансию: по папке на отклик."""
+    if await db.get(Vacancy, vacancy_id) is None:
+        raise HTTPException(status_code=404, detail="Vacancy not found")
+    result = await db.execute(
+        select(Application)
+        .where(Application.vacancy_id == vacancy_id)
+        .options(selectinload(Application.files))
+        .order_by(Application.id)
+    )
+    entries: List[ZipEntry] = []
+    for app_obj in result.scalars().all():
+        entries.extend(_archive_entries(app_obj, folder=f"{app_obj.id}_{_applicant_name(app_obj)}/"))
+    return ZipStream(await resolve_entries(db, entries))
@@ -2,31 +2,30 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
-from sqlalchemy.sql import update
 from fastapi import UploadFile, HTTPException, status
 from typing import List, Optional
 
 from app.models.models import Company
 from app.schemas.schemas import CompanyCreate, CompanyUpdate
-from app.core.uploads import save_uploaded_file, delete_uploaded_file, update_entity
+from app.core.uploads import save_uploaded_image, update_entity
+from app.core.batch import id_in
+from app.core.fields import load_options
 
 
 async def _update_company_dict(db: AsyncSession, entity_id: int, data: dict):
     """
     Обновляет компанию по ID, используя переданные поля.
     Возвращает обновлённый объект Company с проектами и вакансиями.
+    Изменения идут через ORM (а не bulk update), чтобы учитывались ссылки на файлы.
     """
-    query = (
-        update(Company)
-        .where(Company.id == entity_id)
-        .values(**data)
-        .returning(Company)
-    )
-    result = await db.execute(query)
-    updated_company = result.scalar_one_or_none()
+    updated_company = await db.get(Company, entity_id)
     if not updated_company:
         return None
 
+    for key, value in data.items():
+        setattr(updated_company, key, value)
+    await db.commit()
+
     # Подгружаем связи
     await db.refresh(
         updated_company,
@@ -42,13 +41,14 @@ async def create_company(
     logo_file: Optional[UploadFile] = None
 ) -> Company:
     try:
-        logo_path = None
+        logo_path, logo_meta = None, None
         if logo_file:
-            logo_path = await save_uploaded_file(logo_file, "company_logos")
+            logo_path, logo_meta = await save_uploaded_image(logo_file, "company_logos", db=db)
 
         company_data = company_in.dict(exclude_none=True)
         if logo_path:
             company_data["logo_path"] = logo_path
+            company_data["logo_meta"] = logo_meta
         if "categories" not in company_data:
             company_data["categories"] = []
 
@@ -71,14 +71,18 @@ async def create_company(
 
 
 # ---------------- READ ONE ----------------
-async def get_company(db: AsyncSession, company_id: int) -> Optional[Company]:
+async def get_company(
+    db: AsyncSession,
+    company_id: int,
+    fields: Optional[set] = None
+) -> Optional[Company]:
     try:
         result = await db.execute(
             select(Company)
-            .options(
+            .options(*load_options(Company, fields, default=(
                 selectinload(Company.projects),
                 selectinload(Company.vacancies)  # eager loading вакансий
-            )
+            )))
             .where(Company.id == company_id)
         )
         return result.scalars().first()
@@ -89,16 +93,20 @@ async def get_company(db: AsyncSession, company_id: int) -> Optional[Company]:
 # ---------------- READ ALL ----------------
 async def get_companies(
     db: AsyncSession,
-    categories: Optional[List[str]] = None
+    categories: Optional[List[str]] = None,
+    ids: Optional[List[int]] = None,
+    fields: Optional[set] = None
 ) -> List[Company]:
     try:
-        stmt = select(Company).options(
+        stmt = select(Company).options(*load_options(Company, fields, default=(
             selectinload(Company.projects),
             selectinload(Company.vacancies)  # eager loading вакансий
-        )
+        )))
 
         if categories:
             stmt = stmt.where(Company.categories.overlap(categories))
+        if ids:
+            stmt = stmt.where(id_in(Company.id, ids))
 
         stmt = stmt.order_by(Company.created_at.desc())
         result = await db.execute(stmt)
@@ -134,10 +142,7 @@ async def delete_company(db: AsyncSession, company_id: int) -> bool:
         if not db_company:
             return False
 
-        if db_company.logo_path:
-            await delete_uploaded_file(db_company.logo_path)
-
-        await db.delete(db_company)
+        await db.delete(db_company)  # логотип и галереи проектов освобождаются по счётчику ссылок
         await db.commit()
         return True
 
@@ -5,6 +5,7 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from app.models.models import ContactForm
 from app.schemas.schemas import ContactFormCreate, ContactFormUpdate
 from fastapi import HTTPException, status
+from app.core.fields import load_options
 from typing import List, Optional
 
 
@@ -38,12 +39,18 @@ async def create_contact_form(
 
 
 # ---------------- READ ONE ----------------
-async def get_contact_form(db: AsyncSession, contact_form_id: int) -> Optional[ContactForm]:
+async def get_contact_form(
+    db: AsyncSession,
+    contact_form_id: int,
+    fields: Optional[set] = None
+) -> Optional[ContactForm]:
     """
     Получение одной формы по ID.
     Пробрасывает исключения, не оборачивает в HTTPException.
     """
-    result = await db.execute(select(ContactForm).where(ContactForm.id == contact_form_id))
+    result = await db.execute(
+        select(ContactForm).options(*load_options(ContactForm, fields)).where(ContactForm.id == contact_form_id)
+    )
     contact = result.scalars().first()
     if not contact:
         # Сервис возвращает None, чтобы роутер мог сам решать HTTP код
@@ -52,11 +59,11 @@ async def get_contact_form(db: AsyncSession, contact_form_id: int) -> Optional[C
 
 
 # ---------------- READ ALL ----------------
-async def get_contact_forms(db: AsyncSession) -> List[ContactForm]:
+async def get_contact_forms(db: AsyncSession, fields: Optional[set] = None) -> List[ContactForm]:
     """
     Возвращает список всех форм.
     """
-    result = await db.execute(select(ContactForm))
+    result = await db.execute(select(ContactForm).options(*load_options(ContactForm, fields)))
     return result.scalars().all()
 
 
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.db import AsyncSessionLocal
+from app.core.cache import TTLCache, invalidate_on_commit
+from app.core.compression import PrecompressedPayload
+from app.models.models import News, Partner, Project, Company, Vacancy, AboutUsGallery, AboutUsImage
+from app.schemas.schemas import HomeRead
+from app.services import news_service, partner_service, project_service, vacancy_service, about_gallery_service
+
+HOME_NEWS_LIMIT = 6
+HOME_PROJECTS_LIMIT = 6
+HOME_CACHE_TTL = 300  # секунд; страховка для других воркеров, локально кэш сбрасывается по commit
+
+home_cache = TTLCache(maxsize=1, ttl=HOME_CACHE_TTL)
+invalidate_on_commit(home_cache, News, Partner, Project, Company, Vacancy, AboutUsGallery, AboutUsImage)
+
+
+async def _in_own_session(func, *args, **kwargs):
+    """Выполняет запрос сервиса в отдельной сессии из пула, чтобы запросы шли параллельно."""
+    async with AsyncSessionLocal() as session:
+        return await func(session, *args, **kwargs)
+
+
+async def _get_gallery_or_none(db) -> Optional[AboutUsGallery]:
+    try:
+        return await about_gallery_service.get_aboutusgallery(db)
+    except HTTPException as e:
+        if e.status_code == 404:
+            return None
+        raise
+
+
+async def _build_home() -> PrecompressedPayload:
+    news, partners, projects, gallery, vacancy_counts = await asyncio.gather(
+        _in_own_session(news_service.get_news_list, limit=HOME_NEWS_LIMIT),
+        _in_own_session(partner_service.get_partners),
+        _in_own_session(project_service.get_featured_projects, limit=HOME_PROJECTS_LIMIT),
+        _in_own_session(_get_gallery_or_none),
+        _in_own_session(vacancy_service.count_vacancies),
+    )
+    home = HomeRead.model_validate(
+        {
+            "news": news,
+            "partners": partners,
+            "projects": projects,
+            "gallery": gallery,
+            "vacancies": vacancy_counts,
+        },
+        from_attributes=True,
+    )
+    # сжатие (br 11 / gzip 9 на ~100 КБ — сотни мс CPU) — в пуле потоков, один раз на версию
+    return await PrecompressedPayload.build(home.model_dump_json().encode())
+
+
+async def get_home() -> PrecompressedPayload:
+    """
+    Возвращает документ главной страницы.
+    Собирается пятью параллельными запросами и кэшируется до ближайшего изменения данных
+    вместе со сжатыми вариантами (gzip/br считаются один раз на версию документа).
+    """
+    return await home_cache.get_or_create("home", _build_home)
@@ -7,7 +7,9 @@ import traceback
 
 from app.models.models import News
 from app.schemas.schemas import NewsCreate, NewsUpdate
-from app.core.uploads import save_uploaded_file, delete_uploaded_file
+from app.core.uploads import save_uploaded_image
+from app.core.batch import id_in
+from app.core.fields import load_options
 
 # ---------------- CREATE ----------------
 async def create_news(
@@ -20,15 +22,16 @@ async def create_news(
     Дата теперь устанавливается автоматически на уровне БД.
     """
     try:
-        image_path = None
+        image_path, image_meta = None, None
         if file:
-            image_path = await save_uploaded_file(file, sub_dir="news_files")
+            image_path, image_meta = await save_uploaded_image(file, sub_dir="news_files", db=db)
 
         db_news = News(
             title=news_in.title,
             short_description=news_in.short_description,
             full_text=news_in.full_text,
-            image_path=image_path or news_in.image_path
+            image_path=image_path or news_in.image_path,
+            image_meta=image_meta or news_in.image_meta or {}
         )
 
         db.add(db_news)
@@ -49,9 +52,9 @@ async def create_news(
         raise HTTPException(status_code=500, detail="Внутренняя ошибка сервера")
 
 # ---------------- READ ONE ----------------
-async def get_news(db: AsyncSession, news_id: int) -> Optional[News]:
+async def get_news(db: AsyncSession, news_id: int, fields: Optional[set] = None) -> Optional[News]:
     try:
-        result = await db.execute(select(News).where(News.id == news_id))
+        result = await db.execute(select(News).options(*load_options(News, fields)).where(News.id == news_id))
         return result.scalars().first()
     except SQLAlchemyError:
         raise HTTPException(status_code=500, detail="Ошибка базы данных")
@@ -60,21 +63,28 @@ async def get_news(db: AsyncSession, news_id: int) -> Optional[News]:
 async def get_news_list(
     db: AsyncSession,
     search: Optional[str] = None,
-    sort: str = "date_desc"
+    sort: str = "date_desc",
+    ids: Optional[list[int]] = None,
+    limit: Optional[int] = None,
+    fields: Optional[set] = None
 ) -> list[News]:
     try:
-        stmt = select(News)
+        stmt = select(News).options(*load_options(News, fields))
         if search:
             search_term = f"%{search}%"
             stmt = stmt.where(
                 News.title.ilike(search_term) |
                 News.short_description.ilike(search_term)
             )
+        if ids:
+            stmt = stmt.where(id_in(News.id, ids))
 
         if sort not in ["date_asc", "date_desc"]:
             sort = "date_desc"
 
         stmt = stmt.order_by(News.date.asc() if sort == "date_asc" else News.date.desc())
+        if limit:
+            stmt = stmt.limit(limit)
         result = await db.execute(stmt)
         return result.scalars().all()
 
@@ -100,12 +110,8 @@ async def update_news(
             setattr(db_news, field, value)
 
         if file:
-            if db_news.image_path:
-                try:
-                    await delete_uploaded_file(db_news.image_path)
-                except FileNotFoundError:
-                    pass
-            db_news.image_path = await save_uploaded_file(file, sub_dir="news_files")
+            # старый файл удалится после commit, если на него больше нет ссылок
+            db_news.image_path, db_news.image_meta = await save_uploaded_image(file, sub_dir="news_files", db=db)
 
         await db.commit()
         await db.refresh(db_news)
@@ -131,13 +137,7 @@ async def delete_news(db: AsyncSession, news_id: int) -> bool:
         if not db_news:
             return False
 
-        if db_news.image_path:
-            try:
-                await delete_uploaded_file(db_news.image_path)
-            except FileNotFoundError:
-                pass
-
-        await db.delete(db_news)
+        await db.delete(db_news)  # файл изображения освобождается по счётчику ссылок
         await db.commit()
         return True
 
@@ -5,7 +5,9 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 from app.models.models import Partner
 from app.schemas.schemas import PartnerCreate, PartnerUpdate
-from app.core.uploads import save_uploaded_file, delete_uploaded_file
+from app.core.uploads import save_uploaded_image
+from app.core.batch import id_in
+from app.core.fields import load_options
 from fastapi import UploadFile, HTTPException, status
 
 
@@ -22,8 +24,9 @@ async def create_partner(
     try:
         # 1️⃣ Сохраняем логотип, если есть
         if logo_file:
-            logo_path = await save_uploaded_file(logo_file, sub_dir="partners", max_mb=2)
+            logo_path, logo_meta = await save_uploaded_image(logo_file, sub_dir="partners", max_mb=2, db=db)
             partner_in.logo_path = logo_path
+            partner_in.logo_meta = logo_meta
         else:
             partner_in.logo_path = ""
 
@@ -48,12 +51,14 @@ async def create_partner(
 
 
 # ---------------- READ one ----------------
-async def get_partner(db: AsyncSession, partner_id: int) -> Optional[Partner]:
+async def get_partner(db: AsyncSession, partner_id: int, fields: Optional[set] = None) -> Optional[Partner]:
     """
     Возвращает одного партнёра по ID.
     """
     try:
-        result = await db.execute(select(Partner).where(Partner.id == partner_id))
+        result = await db.execute(
+            select(Partner).options(*load_options(Partner, fields)).where(Partner.id == partner_id)
+        )
         return result.scalars().first()
     except SQLAlchemyError as e:
         raise e
@@ -62,15 +67,19 @@ async def get_partner(db: AsyncSession, partner_id: int) -> Optional[Partner]:
 # ---------------- READ all ----------------
 async def get_partners(
     db: AsyncSession,
-    tags: Optional[List[str]] = None
+    tags: Optional[List[str]] = None,
+    ids: Optional[List[int]] = None,
+    fields: Optional[set] = None
 ) -> List[Partner]:
     """
-    Возвращает всех партнёров, при необходимости фильтрует по тегам.
+    Возвращает всех партнёров, при необходимости фильтрует по тегам и списку ID.
     """
     try:
-        stmt = select(Partner)
+        stmt = select(Partner).options(*load_options(Partner, fields))
         if tags:
             stmt = stmt.where(Partner.tags.overlap(tags))
+        if ids:
+            stmt = stmt.where(id_in(Partner.id, ids))
         result = await db.execute(stmt)
         return result.scalars().all()
     except SQLAlchemyError as e:
@@ -111,11 +120,8 @@ async def update_partner(
     # 3️⃣ Обработка нового логотипа
     if logo:
         try:
-            # удаляем старый файл
-            if partner.logo_path:
-                await delete_uploaded_file(partner.logo_path)
-            # сохраняем новый
-            partner.logo_path = await save_uploaded_file(logo, sub_dir=sub_dir, max_mb=2)
+            # сохраняем новый; старый удалится после commit, если на него больше нет ссылок
+            partner.logo_path, partner.logo_meta = await save_uploaded_image(logo, sub_dir=sub_dir, max_mb=2, db=db)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -147,10 +153,7 @@ async def delete_partner(db: AsyncSession, partner_id: int) -> bool:
         if not db_partner:
             return False
 
-        if db_partner.logo_path:
-            await delete_uploaded_file(db_partner.logo_path)
-
-        await db.delete(db_partner)
+        await db.delete(db_partner)  # логотип освобождается по счётчику ссылок
         await db.commit()
         return True
 
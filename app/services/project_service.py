@@ -2,23 +2,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.models import Project
-from app.core.uploads import save_uploaded_file, delete_uploaded_file
+from app.core.batch import id_in
+from app.core.fields import load_options
 from app.schemas.schemas import ProjectCreate, ProjectUpdate
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 # ---------- CREATE ----------
 async def create_project(
     db: AsyncSession,
     project_in: ProjectCreate,
-    gallery_files: Optional[List[str]] = None
+    gallery_files: Optional[List[str]] = None,
+    gallery_meta: Optional[Dict[str, dict]] = None
 ) -> Project:
     """
     Создаёт новый проект. Дата и время устанавливаются автоматически (server_default).
+    gallery_meta — производные изображения галереи по путям файлов.
     """
     project = Project(
         **project_in.dict(),
-        gallery=gallery_files or []  # предотвращает ошибку NoneType
+        gallery=gallery_files or [],  # предотвращает ошибку NoneType
+        gallery_meta=gallery_meta or {}
     )
     db.add(project)
     await db.commit()
@@ -29,14 +33,18 @@ async def create_project(
 # ---------- READ ----------
 async def get_projects(
     db: AsyncSession,
-    company_id: Optional[int] = None
+    company_id: Optional[int] = None,
+    ids: Optional[List[int]] = None,
+    fields: Optional[set] = None
 ) -> List[Project]:
     """
-    Возвращает список всех проектов, опционально фильтруя по компании.
+    Возвращает список всех проектов, опционально фильтруя по компании и/или списку ID.
     """
-    query = select(Project)
+    query = select(Project).options(*load_options(Project, fields))
     if company_id:
         query = query.filter(Project.company_id == company_id)
+    if ids:
+        query = query.filter(id_in(Project.id, ids))
 
     result = await db.execute(query)
     return result.scalars().all()
@@ -44,21 +52,41 @@ async def get_projects(
 
 async def get_project(
     db: AsyncSession,
-    project_id: int
+    project_id: int,
+    fields: Optional[set] = None
 ) -> Optional[Project]:
     """
     Возвращает проект по ID.
     """
-    result = await db.execute(select(Project).filter(Project.id == project_id))
+    result = await db.execute(
+        select(Project).options(*load_options(Project, fields)).filter(Project.id == project_id)
+    )
     return result.scalars().first()
 
 
+async def get_featured_projects(
+    db: AsyncSession,
+    limit: int = 6
+) -> List[Project]:
+    """
+    Возвращает проекты для главной: сначала активные, затем по дате открытия (новые первыми).
+    """
+    query = (
+        select(Project)
+        .order_by((Project.status == "Active").desc(), Project.opened_date.desc(), Project.id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(query)
+    return result.scalars().all()
+
+
 # ---------- UPDATE ----------
 async def update_project(
     db: AsyncSession,
     project_id: int,
     project_in: ProjectUpdate,
-    new_gallery_files: Optional[List[str]] = None
+    new_gallery_files: Optional[List[str]] = None,
+    new_gallery_meta: Optional[Dict[str, dict]] = None
 ) -> Optional[Project]:
     """
     Обновляет данные проекта. Если переданы новые файлы — заменяет галерею.
@@ -72,10 +100,9 @@ async def update_project(
         setattr(project, key, value)
 
     if new_gallery_files is not None:
-        # безопасное удаление старых файлов
-        for old_path in project.gallery or []:
-            await delete_uploaded_file(old_path)
+        # старые файлы удалятся после commit, если на них больше нет ссылок
         project.gallery = new_gallery_files
+        project.gallery_meta = new_gallery_meta or {}
 
     await db.commit()
     await db.refresh(project)
@@ -88,16 +115,12 @@ async def delete_project(
     project_id: int
 ) -> bool:
     """
-    Удаляет проект и связанные файлы галереи.
+    Удаляет проект; файлы галереи освобождаются по счётчику ссылок.
     """
     project = await get_project(db, project_id)
     if not project:
         return False
 
-    # удаляем все файлы галереи
-    for path in project.gallery or []:
-        await delete_uploaded_file(path)
-
     await db.delete(project)
     await db.commit()
     return True
@@ -6,7 +6,28 @@ from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from app.models.models import User
 from app.schemas.schemas import UserCreate, UserRead
 from typing import List, Optional
-from app.core.security import hash_password, verify_password
+from dataclasses import dataclass
+from app.core.cache import TTLCache, invalidate_on_commit
+from app.core.metrics import metrics
+from app.core.security import hash_password_async, verify_and_update_async
+
+USER_CACHE_TTL = 30  # секунд; столько другой воркер может видеть старую роль, локально кэш сбрасывается по commit
+USER_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Снимок пользователя для авторизации запросов: общий для запросов, поэтому не ORM-объект."""
+    id: int
+    username: str
+    email: str
+    is_admin: bool
+    token_version: int
+
+
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+# любое изменение users (update_user, delete_user, смена роли в админке) сбрасывает кэш после commit
+invalidate_on_commit(user_cache, User)
 
 async def create_user(db:AsyncSession,
     username: str,
@@ -14,7 +35,7 @@ async def create_user(db:AsyncSession,
     password: str,
     is_admin: bool = False) -> User:
     try:
-        hashed = hash_password(password)
+        hashed = await hash_password_async(password)
         db_user = User(username=username, email=email, hashed_password=hashed, is_admin=is_admin)
         db.add(db_user)
         await db.commit()
@@ -32,6 +53,26 @@ async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User
     result = await db.execute(select(User).where(User.username == username))
     return result.scalars().first()
 
+async def get_current_user_cached(db: AsyncSession, username: str) -> Optional[CurrentUser]:
+    """
+    Пользователь для проверки токена: из кэша по sub, при промахе — один запрос в БД
+    (одновременные промахи по одному имени ждут один запрос). Несуществующий тоже кэшируется.
+    """
+    async def load() -> Optional[CurrentUser]:
+        metrics.inc("user_cache_misses")
+        user = await get_user_by_username(db, username)
+        if user is None:
+            return None
+        return CurrentUser(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_admin=bool(user.is_admin),
+            token_version=user.token_version or 0,
+        )
+
+    return await user_cache.get_or_create(username, load)
+
 async def get_user(db: AsyncSession, user_id: str) -> Optional[User]:
     result = await db.execute(select(User).where(User.id == user_id))
     return result.scalars().first()
@@ -40,8 +81,13 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> O
     user = await get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_async(password, user.hashed_password)
+    if not verified:
         return None
+    if new_hash is not None:
+        # хэш со старыми параметрами argon2 — заменяем, пока известен пароль
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 async def update_user(db: AsyncSession, user_id: int, **fields) -> Optional[User]:
@@ -51,6 +97,10 @@ async def update_user(db: AsyncSession, user_id: int, **fields) -> Optional[User
         return None
     # Prevent clients from updating created_at
     fields.pop("created_at", None)
+    fields.pop("token_version", None)
+    # смена пароля или роли отзывает выданные токены
+    if "hashed_password" in fields or ("is_admin" in fields and fields["is_admin"] != db_user.is_admin):
+        db_user.token_version = (db_user.token_version or 0) + 1
     for k, v in fields.items():
         setattr(db_user, k, v)
     await db.commit()
@@ -2,6 +2,7 @@
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, UploadFile
@@ -9,7 +10,9 @@ from typing import Optional, List
 
 from app.models.models import Vacancy, Company
 from app.schemas.schemas import VacancyCreate, VacancyUpdate
-from app.core.uploads import save_uploaded_file, delete_uploaded_file
+from app.core.uploads import save_uploaded_image
+from app.core.batch import id_in
+from app.core.fields import load_options
 
 
 # --------------------- CREATE ---------------------
@@ -25,8 +28,9 @@ async def create_vacancy(
         vacancy_data["company_id"] = company_id
 
         if logo:
-            logo_path = await save_uploaded_file(logo, sub_dir="logos", max_mb=max_mb)
+            logo_path, logo_meta = await save_uploaded_image(logo, sub_dir="logos", max_mb=max_mb, db=db)
             vacancy_data["logo_path"] = logo_path
+            vacancy_data["logo_meta"] = logo_meta
 
         db_vacancy = Vacancy(**vacancy_data)
         db.add(db_vacancy)
@@ -46,11 +50,11 @@ async def create_vacancy(
 
 
 # --------------------- READ ONE ---------------------
-async def get_vacancy(db: AsyncSession, vacancy_id: int) -> Optional[Vacancy]:
+async def get_vacancy(db: AsyncSession, vacancy_id: int, fields: Optional[set] = None) -> Optional[Vacancy]:
     try:
         result = await db.execute(
             select(Vacancy)
-            .options(selectinload(Vacancy.company))  # подгружаем компанию
+            .options(*load_options(Vacancy, fields, default=(selectinload(Vacancy.company),)))  # подгружаем компанию
             .where(Vacancy.id == vacancy_id)
         )
         return result.scalars().first()
@@ -59,16 +63,41 @@ async def get_vacancy(db: AsyncSession, vacancy_id: int) -> Optional[Vacancy]:
 
 
 # --------------------- READ ALL ---------------------
-async def get_vacancies(db: AsyncSession) -> List[Vacancy]:
+async def get_vacancies(
+    db: AsyncSession,
+    ids: Optional[List[int]] = None,
+    fields: Optional[set] = None
+) -> List[Vacancy]:
     try:
-        result = await db.execute(
-            select(Vacancy).options(selectinload(Vacancy.company))  # подгружаем компанию
+        stmt = select(Vacancy).options(
+            *load_options(Vacancy, fields, default=(selectinload(Vacancy.company),))  # подгружаем компанию
         )
+        if ids:
+            stmt = stmt.where(id_in(Vacancy.id, ids))
+        result = await db.execute(stmt)
         return result.scalars().all()
     except SQLAlchemyError as e:
         raise HTTPException(status_code=500, detail=f"Ошибка при получении списка вакансий: {e}")
 
 
+# --------------------- COUNTS ---------------------
+async def count_vacancies(db: AsyncSession) -> dict:
+    """
+    Возвращает количество открытых вакансий: всего и по типу занятости (один GROUP BY).
+    """
+    try:
+        result = await db.execute(
+            select(Vacancy.employment_type, func.count(Vacancy.id)).group_by(Vacancy.employment_type)
+        )
+        by_type = {
+            (employment_type.value if employment_type else "Unknown"): count
+            for employment_type, count in result.all()
+        }
+        return {"total": sum(by_type.values()), "by_employment_type": by_type}
+    except SQLAlchemyError as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка при подсчёте вакансий: {e}")
+
+
 # --------------------- UPDATE ---------------------
 async def update_vacancy(
     db: AsyncSession,
@@ -95,10 +124,10 @@ async def update_vacancy(
             setattr(db_vacancy, field, value)
 
         if logo:
-            if getattr(db_vacancy, "logo_path", None):
-                await delete_uploaded_file(db_vacancy.logo_path)
-            logo_path = await save_uploaded_file(logo, sub_dir="logos", max_mb=max_mb)
+            # старый логотип удалится после commit, если на него больше нет ссылок
+            logo_path, logo_meta = await save_uploaded_image(logo, sub_dir="logos", max_mb=max_mb, db=db)
             db_vacancy.logo_path = logo_path
+            db_vacancy.logo_meta = logo_meta
 
         await db.commit()
         await db.refresh(db_vacancy)
@@ -128,10 +157,7 @@ async def delete_vacancy(db: AsyncSession, vacancy_id: int) -> bool:
         if not vacancy:
             raise HTTPException(status_code=404, detail=f"Vacancy with id={vacancy_id} not found")
 
-        if getattr(vacancy, "logo_path", None):
-            await delete_uploaded_file(vacancy.logo_path)
-
-        await db.delete(vacancy)
+        await db.delete(vacancy)  # логотип освобождается по счётчику ссылок
         await db.commit()
         return True
 
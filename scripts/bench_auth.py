@@ -0,0 +1,107 @@
+"""
+Вход под нагрузкой: проверка пароля argon2 прямо в event loop (как было) против пула потоков
+(app.core.security.verify_password_async).
+
+Приложение поднимается в процессе (httpx.ASGITransport), БД не нужна: маршруты только проверяют
+пароль по заранее посчитанному хэшу. Пока идут --logins входов (--concurrency одновременно),
+фоновая задача каждые 5 мс измеряет задержку event loop — насколько позже обещанного
+она просыпается; это время, на которое останавливаются все остальные запросы воркера.
+
+Запуск:
+    python -m scripts.bench_auth --logins 200 --concurrency 16
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Form, HTTPException
+
+from app.core.metrics import metrics
+from app.core.security import hash_password, shutdown_hash_pool, verify_password, verify_password_async
+
+PASSWORD = "correct horse battery staple"
+LAG_INTERVAL = 0.005
+
+
+def _build_app(hashed: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/inline/token")
+    async def inline_login(password: str = Form(...)):
+        if not verify_password(password, hashed):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.post("/pool/token")
+    async def pool_login(password: str = Form(...)):
+        if not await verify_password_async(password, hashed):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    return app
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def _measure_lag(samples: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(time.perf_counter() - started - LAG_INTERVAL)
+
+
+async def _run(client: httpx.AsyncClient, path: str, logins: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def login() -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(path, data={"password": PASSWORD})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    lag: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_measure_lag(lag, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    print(
+        f"{path:<14} {logins / elapsed:7.1f} входов/с  "
+        f"p50={_percentile(latencies, 50) * 1000:7.1f} ms  p99={_percentile(latencies, 99) * 1000:7.1f} ms  "
+        f"задержка loop p99={_percentile(lag, 99) * 1000:6.1f} ms  max={max(lag) * 1000:6.1f} ms"
+    )
+
+
+async def main(logins: int, concurrency: int) -> None:
+    app = _build_app(hash_password(PASSWORD))
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for path in ("/inline/token", "/pool/token"):
+                await client.post(path, data={"password": PASSWORD})  # прогрев
+            await _run(client, "/inline/token", logins, concurrency)
+            await _run(client, "/pool/token", logins, concurrency)
+        calls = metrics.get("password_hash_calls")
+        print(
+            f"пул: ожидание в очереди в среднем {metrics.get('password_hash_queue_seconds') / calls * 1000:.1f} ms, "
+            f"максимум {metrics.get('password_hash_queue_max_seconds') * 1000:.1f} ms"
+        )
+    finally:
+        shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200, help="сколько входов на каждый вариант")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных входов")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.concurrency))
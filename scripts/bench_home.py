@@ -0,0 +1,71 @@
+"""
+Сравнение задержки главной страницы: пять последовательных запросов против одного /home.
+
+Запуск (сервер должен быть поднят):
+    python -m scripts.bench_home --base-url http://localhost:8000 --rounds 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+LEGACY_CALLS = [
+    "/news/",
+    "/partners/",
+    "/projects/",
+    "/aboutusgallery/",
+    "/vacancies/",
+]
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _report(name: str, samples: list[float]) -> None:
+    print(
+        f"{name:<28} mean={statistics.mean(samples):7.1f} ms  "
+        f"p50={_percentile(samples, 50):7.1f} ms  p95={_percentile(samples, 95):7.1f} ms"
+    )
+
+
+async def _time_sequence(client: httpx.AsyncClient) -> float:
+    started = time.perf_counter()
+    for path in LEGACY_CALLS:
+        response = await client.get(path)
+        response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _time_home(client: httpx.AsyncClient) -> float:
+    started = time.perf_counter()
+    response = await client.get("/home/")
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def main(base_url: str, rounds: int) -> None:
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        # прогрев соединений и кэша
+        await _time_sequence(client)
+        await _time_home(client)
+
+        sequence = [await _time_sequence(client) for _ in range(rounds)]
+        home = [await _time_home(client) for _ in range(rounds)]
+
+    print(f"Раундов: {rounds}")
+    _report("5 запросов последовательно", sequence)
+    _report("/home (кэш)", home)
+    print(f"Ускорение по медиане: x{_percentile(sequence, 50) / max(_percentile(home, 50), 1e-6):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.rounds))
@@ -0,0 +1,97 @@
+"""
+Пропускная способность загрузки файлов: обычный разбор формы Starlette (SpooledTemporaryFile +
+копия в uploads) против DirectUploadRoute (запись сразу в uploads/.staging + жёсткая ссылка).
+
+Приложение поднимается в процессе (httpx.ASGITransport), БД не нужна: маршруты только
+сохраняют файлы через save_uploaded_file. Каждый файл уникален, чтобы не срабатывала дедупликация;
+тело уходит блоками по 64 КБ, как его отдаёт uvicorn, а маршруты чередуются, чтобы оба
+варианта одинаково попадали в прогретый/холодный страничный кэш.
+
+Запуск:
+    python -m scripts.bench_uploads --size-mb 10 --files 30
+"""
+import argparse
+import asyncio
+import io
+import os
+import shutil
+import statistics
+import time
+from typing import List
+
+import httpx
+from fastapi import APIRouter, FastAPI, File, UploadFile
+
+from app.core.direct_upload import DirectUploadRoute
+from app.core.uploads import UPLOAD_ROOT, save_uploaded_file
+
+BENCH_SUB_DIR = "_bench_uploads"
+
+
+def _build_app(max_mb: int) -> FastAPI:
+    app = FastAPI()
+    spooled = APIRouter(prefix="/spooled")
+    direct = APIRouter(prefix="/direct", route_class=DirectUploadRoute)
+
+    for router in (spooled, direct):
+        @router.post("/")
+        async def upload(files: List[UploadFile] = File(...)):
+            return [await save_uploaded_file(f, BENCH_SUB_DIR, max_mb=max_mb) for f in files]
+
+        app.include_router(router)
+    return app
+
+
+def _pdf(size: int) -> bytes:
+    return b"%PDF-1.7\n" + os.urandom(size - 9)
+
+
+async def _upload(client: httpx.AsyncClient, path: str, payload: bytes) -> float:
+    started = time.perf_counter()
+    # файловый объект httpx читает блоками по 64 КБ
+    response = await client.post(path, files={"files": ("doc.pdf", io.BytesIO(payload), "application/pdf")})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _report(name: str, samples: list[float], size: int) -> None:
+    mb = size / (1024 * 1024)
+    print(
+        f"{name:<10} p50={_percentile(samples, 50) * 1000:7.1f} ms  "
+        f"p95={_percentile(samples, 95) * 1000:7.1f} ms  "
+        f"throughput={mb * len(samples) / sum(samples):7.1f} MB/s"
+    )
+
+
+async def main(size_mb: int, files: int) -> None:
+    size = size_mb * 1024 * 1024
+    app = _build_app(max_mb=size_mb + 1)
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            await _upload(client, "/spooled/", _pdf(size))  # прогрев
+            await _upload(client, "/direct/", _pdf(size))
+            spooled, direct = [], []
+            for _ in range(files):
+                spooled.append(await _upload(client, "/spooled/", _pdf(size)))
+                direct.append(await _upload(client, "/direct/", _pdf(size)))
+    finally:
+        shutil.rmtree(UPLOAD_ROOT / BENCH_SUB_DIR, ignore_errors=True)
+
+    print(f"Файлов: {files} x {size_mb} МБ")
+    _report("spooled", spooled, size)
+    _report("direct", direct, size)
+    print(f"Ускорение по медиане: x{statistics.median(spooled) / statistics.median(direct):.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=10)
+    parser.add_argument("--files", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.size_mb, args.files))
@@ -0,0 +1,77 @@
+"""
+Подбор параметров argon2id под текущий сервер: сколько проходов (ARGON2_TIME_COST) при заданной
+памяти укладываются в целевое время проверки пароля. Если уже один проход дольше цели,
+память уменьшается вдвое, пока не уложится (но не меньше --min-memory-mib).
+
+Запускать на той же машине (и с той же нагрузкой), где работает API: время проверки — это и задержка
+входа, и CPU, который занимает каждый вход (PASSWORD_HASH_CONCURRENCY потоков одновременно).
+
+Запуск:
+    python -m scripts.calibrate_argon2 --target-ms 250
+    python -m scripts.calibrate_argon2 --target-ms 500 --memory-mib 128 --parallelism 2
+"""
+import argparse
+import statistics
+import time
+
+from passlib.hash import argon2
+
+from app.core.config import settings
+
+PASSWORD = "calibration password"
+MAX_TIME_COST = 32
+
+
+def _verify_ms(time_cost: int, memory_kib: int, parallelism: int, samples: int) -> float:
+    """Медиана времени проверки пароля, мс."""
+    handler = argon2.using(rounds=time_cost, memory_cost=memory_kib, parallelism=parallelism)
+    hashed = handler.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(target_ms: float, memory_kib: int, min_memory_kib: int, parallelism: int, samples: int) -> tuple[int, int, float]:
+    """Наибольший time_cost (и память), при которых проверка не дольше target_ms. Возвращает (t, m, мс)."""
+    while True:
+        elapsed = _verify_ms(1, memory_kib, parallelism, samples)
+        print(f"  t=1  m={memory_kib // 1024} МиБ  p={parallelism}: {elapsed:7.1f} ms")
+        if elapsed <= target_ms or memory_kib // 2 < min_memory_kib:
+            break
+        memory_kib //= 2
+
+    time_cost = 1
+    while time_cost < MAX_TIME_COST:
+        candidate = _verify_ms(time_cost + 1, memory_kib, parallelism, samples)
+        print(f"  t={time_cost + 1:<2} m={memory_kib // 1024} МиБ  p={parallelism}: {candidate:7.1f} ms")
+        if candidate > target_ms:
+            break
+        time_cost, elapsed = time_cost + 1, candidate
+    return time_cost, memory_kib, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250, help="целевое время проверки пароля")
+    parser.add_argument("--memory-mib", type=int, default=settings.ARGON2_MEMORY_COST_KIB // 1024, help="память на хэш")
+    parser.add_argument("--min-memory-mib", type=int, default=19, help="нижняя граница памяти (OWASP: 19 МиБ)")
+    parser.add_argument("--parallelism", type=int, default=settings.ARGON2_PARALLELISM, help="потоков на хэш")
+    parser.add_argument("--samples", type=int, default=5, help="замеров на каждый вариант")
+    args = parser.parse_args()
+
+    print(
+        f"Сейчас: t={settings.ARGON2_TIME_COST} m={settings.ARGON2_MEMORY_COST_KIB // 1024} МиБ "
+        f"p={settings.ARGON2_PARALLELISM}: {_verify_ms(settings.ARGON2_TIME_COST, settings.ARGON2_MEMORY_COST_KIB, settings.ARGON2_PARALLELISM, args.samples):.1f} ms"
+    )
+    time_cost, memory_kib, elapsed = calibrate(
+        args.target_ms, args.memory_mib * 1024, args.min_memory_mib * 1024, args.parallelism, args.samples
+    )
+    if elapsed > args.target_ms:
+        print(f"Цель {args.target_ms:.0f} ms недостижима даже с минимальной памятью, берём самый быстрый вариант.")
+    print(f"\nПроверка пароля: {elapsed:.1f} ms. В .env:")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST_KIB={memory_kib}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
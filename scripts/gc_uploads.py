@@ -0,0 +1,41 @@
+"""
+Сборщик мусора uploads: удаляет файлы, на которые не ссылается ни одна запись (app.core.upload_gc).
+
+Каждый запуск проверяет не больше --max-files файлов и продолжает с места предыдущего,
+поэтому его удобно ставить в cron. Сначала стоит посмотреть, что будет удалено:
+    python -m scripts.gc_uploads --dry-run --max-files 100000
+
+Запуск:
+    python -m scripts.gc_uploads --max-files 10000 --rate 50
+"""
+import argparse
+import asyncio
+
+from app.core.upload_gc import collect_orphaned_uploads
+
+
+async def main(args: argparse.Namespace) -> None:
+    stats = await collect_orphaned_uploads(
+        dry_run=args.dry_run,
+        batch_size=args.batch_size,
+        max_files=args.max_files,
+        grace_seconds=args.grace_hours * 3600 if args.grace_hours is not None else None,
+        max_deletes_per_second=args.rate,
+        reset=args.reset,
+    )
+    print(
+        f"Проверено: {stats['scanned']}, без ссылок: {stats['orphaned']}, удалено: {stats['deleted']}, "
+        f"ошибок: {stats['failed']}, пропущено (моложе grace-периода): {stats['skipped_recent']}"
+    )
+    print("Обход завершён, следующий запуск начнёт сначала." if stats["completed"] else "Обход продолжится со следующего запуска.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="только показать файлы без ссылок")
+    parser.add_argument("--batch-size", type=int, default=500, help="файлов на одну проверку ссылок")
+    parser.add_argument("--max-files", type=int, default=10_000, help="сколько файлов проверить за запуск")
+    parser.add_argument("--grace-hours", type=float, default=None, help="по умолчанию UPLOAD_GC_GRACE_HOURS")
+    parser.add_argument("--rate", type=float, default=None, help="не больше N удалений в секунду")
+    parser.add_argument("--reset", action="store_true", help="начать обход сначала")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,44 @@
+"""
+Перенос старых (плоских) файлов uploads в шардированную раскладку uploads/<sub_dir>/ab/cd/<sha256>.<ext>
+(app.core.upload_layout). Сервис при этом не останавливают: строки обновляются короткими
+транзакциями, старые ссылки /media отвечают 308 на новый путь.
+
+Каждый запуск обрабатывает не больше --max-rows строк на поле и продолжает с места предыдущего.
+Сначала стоит посмотреть, какие файлы будут перенесены:
+    python -m scripts.migrate_upload_layout --dry-run
+
+Запуск:
+    python -m scripts.migrate_upload_layout --batch-size 100 --max-rows 10000
+"""
+import argparse
+import asyncio
+
+from app.core.storage import storage
+from app.core.upload_layout import migrate_upload_layout
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        stats = await migrate_upload_layout(
+            batch_size=args.batch_size,
+            max_rows=args.max_rows,
+            dry_run=args.dry_run,
+            reset=args.reset,
+        )
+    finally:
+        await storage.close()
+    print(
+        f"Строк: {stats['rows']}, файлов {'к переносу' if args.dry_run else 'перенесено'}: {stats['files']}, "
+        f"строк обновлено: {stats['updated']}, файлов не найдено: {stats['missing']}"
+    )
+    if not args.dry_run:
+        print("Все поля пройдены." if stats["completed"] == stats["fields"] else "Перенос продолжится со следующего запуска.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="только показать файлы, которые будут перенесены")
+    parser.add_argument("--batch-size", type=int, default=100, help="строк на одну транзакцию")
+    parser.add_argument("--max-rows", type=int, default=10_000, help="сколько строк каждого поля обработать за запуск")
+    parser.add_argument("--reset", action="store_true", help="начать обход сначала")
+    asyncio.run(main(parser.parse_args()))